@@ -7,7 +7,36 @@ __version__ = "1.0.0"
 __author__ = "Your Name"
 __description__ = "Simulation of restaurant order processing system using special events method"
 
-from models import *
-from simulation import *
-from statistics import *
-from display import *
\ No newline at end of file
+from ._lazy import lazy_exports
+
+__getattr__, __dir__, __all__ = lazy_exports(__name__, {
+    'Order': '.models',
+    'OrderStatus': '.models',
+    'OrderPriority': '.models',
+    'KitchenLine': '.models',
+    'CircularBuffer': '.models',
+    'BufferOperationResult': '.models',
+    'MultiLevelBuffer': '.models',
+    'PlacementDispatcher': '.models',
+    'SelectionDispatcher': '.models',
+    'DispatchResult': '.models',
+    'RejectionResult': '.models',
+    'RoutingPolicy': '.models',
+    'make_routing_policy': '.models',
+    'SpecialEventSimulator': '.simulation',
+    'SimulationMode': '.simulation',
+    'EventCalendar': '.simulation',
+    'Event': '.simulation',
+    'EventType': '.simulation',
+    'run_simulation': '.simulation',
+    'run_replications': '.simulation',
+    'run_sweep': '.simulation',
+    'summarize_replications': '.simulation',
+    'ResultCache': '.simulation',
+    'StatisticsCollector': '.statistics',
+    'SourceStatistics': '.statistics',
+    'mean_confidence_interval': '.statistics',
+    't_quantile': '.statistics',
+    'ConsoleDisplay': '.display',
+    'ReportGenerator': '.display'
+}, submodules=('models', 'simulation', 'statistics', 'display', 'cli'))
\ No newline at end of file
@@ -0,0 +1,28 @@
+import importlib
+
+
+def lazy_exports(package: str, exports: dict, submodules: tuple = ()):
+    """
+    Builds module-level __getattr__ and __dir__ that import a submodule only
+    when one of its names is first accessed.
+    exports maps a public name to the relative module that defines it.
+    """
+    submodules = tuple(submodules)
+    public = list(exports) + list(submodules)
+
+    def __getattr__(name):
+        if name in submodules:
+            return importlib.import_module(f".{name}", package)
+
+        module_name = exports.get(name)
+        if module_name is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+
+        value = getattr(importlib.import_module(module_name, package), name)
+        setattr(importlib.import_module(package), name, value)
+        return value
+
+    def __dir__():
+        return sorted(set(public) | set(vars(importlib.import_module(package))))
+
+    return __getattr__, __dir__, public
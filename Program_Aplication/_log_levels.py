@@ -0,0 +1,3 @@
+"""Levels of the logging module, so models emit events without importing it"""
+DEBUG = 10
+INFO = 20
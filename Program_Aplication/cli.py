@@ -0,0 +1,664 @@
+import argparse
+import os
+import sys
+
+if not __package__:
+    sys.path[0] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+MODEL_OPTIONS = (
+    ("--sources", "num_sources", int, 1, "number of order sources"),
+    ("--kitchens", "num_kitchens", int, 2, "number of kitchen lines"),
+    ("--buffer", "buffer_capacity", int, 5, "buffer capacity"),
+    ("--arrival", "mean_arrival_time", float, 1.0, "mean time between orders, min"),
+    ("--service", "mean_service_time", float, 8.0, "mean cooking time, min"),
+    ("--max-wait", "max_wait_minutes", float, None, "customer patience in the buffer, min (default: customers never abandon)"),
+    ("--profile", "arrival_profile", str, "flat", "arrival intensity profile: flat, daily-peaks; "
+                                                  "comma-separated for one profile per source"),
+    ("--line-service", "line_service_times", str, None, "comma-separated mean cooking time per kitchen line, "
+                                                        "e.g. 5,8,12 (sets the number of kitchens)"),
+    ("--line-law", "line_service_laws", str, None, "service law per line, comma-separated or one for all: "
+                                                   "exponential, erlang-2, deterministic, items"),
+    ("--stations", "prep_stations", int, 2, "items a line prepares in parallel under the items law"),
+    ("--routing", "routing_policy", str, "first-free", "kitchen routing policy: first-free, fastest-free, "
+                                                       "least-recently-used, shortest-expected-completion"),
+    ("--priority-mix", "priority_mix", str, None, "shares of priority classes, e.g. express=0.2,vip=0.05; "
+                                                  "the rest are standard orders (default: one class)"),
+    ("--batch", "batch_size", int, 1, "orders with the same lead dish a free line takes from the buffer at once"),
+    ("--batch-growth", "batch_growth", float, 0.25, "extra cooking time per additional order in a batch, "
+                                                    "as a share of a single order's time"),
+    ("--couriers", "num_couriers", int, None, "couriers delivering cooked orders (default: no delivery stage)"),
+    ("--courier-speed", "courier_speed", float, 20.0, "courier speed, km/h"),
+    ("--courier-capacity", "courier_capacity", int, 1, "orders a courier carries in one trip"),
+    ("--courier-radius", "courier_radius", float, 1.0, "max distance, km, from the first drop of a trip "
+                                                       "to the other orders a courier takes along"),
+    ("--streams", "random_streams", str, "shared", "random streams: shared, or split to give arrivals and each "
+                                                   "order's cooking time streams of their own (common random "
+                                                   "numbers across configurations)"),
+    ("--trace", "arrival_trace", str, None, "replay arrivals from an order log (CSV or binary from "
+                                            "'trace'); replaces the arrival law"),
+)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m Program_Aplication",
+        description="Restaurant delivery SMO simulator - non-interactive entry point"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser(
+        "run", help="run replications of one configuration or of a parameter grid",
+        description="Model options accept several values; every combination is simulated."
+    )
+    add_grid_arguments(run_parser)
+    add_output_arguments(run_parser)
+    run_parser.add_argument("--cache", nargs="?", const="", default=None, metavar="DIR",
+                            help="reuse results of seeded runs stored in DIR "
+                                 "(default ~/.cache/delivery_simulation) and store new ones")
+    run_parser.add_argument("--cache-size", type=float, default=256, help="cache size limit, MB (default 256)")
+    run_parser.add_argument("--metrics-port", type=int, default=None,
+                            help="serve live Prometheus metrics at http://127.0.0.1:PORT/metrics while running")
+    run_parser.add_argument("--event-log", default=None, metavar="PATH",
+                            help="append model events to PATH as JSON lines ('-' for stdout)")
+    run_parser.add_argument("--log-level", choices=("debug", "info"), default="info",
+                            help="info logs completions, rejections, evictions, abandonments and deliveries; "
+                                 "debug adds arrivals, placements and dispatches (default info)")
+    run_parser.add_argument("--antithetic", action="store_true",
+                            help="run every seed twice, on split streams and on their complementary uniforms; "
+                                 "--aggregate then reports paired intervals and the variance reduction "
+                                 "(not with --streams or --precision)")
+    run_parser.set_defaults(handler=command_run)
+
+    cache_parser = commands.add_parser("cache", help="show or clear the result cache")
+    cache_parser.add_argument("--dir", default="", help="cache directory (default ~/.cache/delivery_simulation)")
+    cache_parser.add_argument("--clear", action="store_true", help="delete every cached result")
+    cache_parser.set_defaults(handler=command_cache)
+
+    trace_parser = commands.add_parser("trace", help="convert a CSV order log to the binary trace format")
+    trace_parser.add_argument("csv", help="CSV log with a minutes or timestamp column")
+    trace_parser.add_argument("output", help="binary trace file")
+    trace_parser.set_defaults(handler=command_trace)
+
+    queue_parser = commands.add_parser(
+        "queue", help="resumable sweeps through a work queue file shared by any number of workers")
+    queue_commands = queue_parser.add_subparsers(dest="queue_command", required=True)
+
+    submit_parser = queue_commands.add_parser(
+        "submit", help="add the points of a grid to the queue",
+        description="Points already in the queue are skipped. Without --seed, the base seed drawn for the "
+                    "first submission to the queue is used again.")
+    submit_parser.add_argument("queue", help="queue file")
+    add_grid_arguments(submit_parser)
+    submit_parser.set_defaults(handler=command_queue_submit)
+
+    work_parser = queue_commands.add_parser("work", help="lease and run queue items until none are left")
+    work_parser.add_argument("queue", help="queue file")
+    work_parser.add_argument("--workers", type=int, default=1, help="worker processes on this host")
+    work_parser.add_argument("--lease", type=float, default=600,
+                             help="seconds an item stays leased without renewal; running items renew it "
+                                  "every third of that (default 600)")
+    work_parser.add_argument("--no-wait", action="store_true",
+                             help="exit when nothing is free instead of waiting for expired leases")
+    work_parser.add_argument("--cache", nargs="?", const="", default=None, metavar="DIR",
+                             help="also use the result cache")
+    work_parser.set_defaults(handler=command_queue_work)
+
+    status_parser = queue_commands.add_parser("status", help="show queue progress")
+    status_parser.add_argument("queue", help="queue file")
+    status_parser.add_argument("--retry-failed", action="store_true", help="put failed items back to pending")
+    status_parser.set_defaults(handler=command_queue_status)
+
+    results_parser = queue_commands.add_parser("results", help="write the results of finished items")
+    results_parser.add_argument("queue", help="queue file")
+    add_output_arguments(results_parser)
+    results_parser.set_defaults(handler=command_queue_results)
+
+    rare_parser = commands.add_parser(
+        "rare", help="estimate a very small P_reject by RESTART splitting",
+        description="Splitting spends the simulated events near a full buffer, where rejections happen. "
+                    "Model options accept several values; every combination is estimated.")
+    add_model_arguments(rare_parser)
+    rare_parser.add_argument("--seed", type=int, default=None, help="base seed (default: random)")
+    rare_parser.add_argument("--precision", type=float, default=0.1,
+                             help="target relative half-width of the 90%% interval (default 0.1)")
+    rare_parser.add_argument("--batch-orders", type=int, default=20000,
+                             help="arrivals of the main trajectory per batch (default 20000)")
+    rare_parser.add_argument("--thresholds", type=int, nargs="+", default=None,
+                             help="levels of orders in the system to split at (default: from a pilot run)")
+    rare_parser.add_argument("--splits", type=int, nargs="+", default=None,
+                             help="split factor per threshold")
+    rare_parser.add_argument("--format", choices=("jsonl", "csv"), default="jsonl", help="output format")
+    rare_parser.add_argument("--output", default="-", help="output file (default: stdout)")
+    rare_parser.set_defaults(handler=command_rare)
+
+    plan_parser = commands.add_parser(
+        "plan", help="find the cheapest kitchens and buffer meeting an SLA",
+        description="Searches kitchens x buffer sizes, running each candidate only until it is clearly "
+                    "feasible or infeasible. Other model options take one value each.")
+    add_model_arguments(plan_parser, exclude=("num_kitchens", "buffer_capacity"))
+    plan_parser.add_argument("--max-reject", type=float, required=True, help="SLA: highest P_reject")
+    plan_parser.add_argument("--max-wait-p95", type=float, required=True, help="SLA: highest P95 buffer wait, min")
+    plan_parser.add_argument("--kitchens", type=int, nargs=2, default=[1, 8], metavar=("MIN", "MAX"),
+                             help="range of kitchen lines to search (default 1 8)")
+    plan_parser.add_argument("--buffer", type=int, nargs=2, default=[1, 20], metavar=("MIN", "MAX"),
+                             help="range of buffer sizes to search (default 1 20)")
+    plan_parser.add_argument("--kitchen-cost", type=float, default=10.0, help="cost of a kitchen line (default 10)")
+    plan_parser.add_argument("--buffer-cost", type=float, default=1.0, help="cost of a buffer slot (default 1)")
+    plan_parser.add_argument("--orders", type=int, default=5000,
+                             help="orders per replication after the warm-up (default 5000)")
+    plan_parser.add_argument("--warmup", type=int, default=1000,
+                             help="orders discarded at the start of each replication (default 1000)")
+    plan_parser.add_argument("--confidence", type=float, default=0.95,
+                             help="probability that each verdict is right (default 0.95)")
+    plan_parser.add_argument("--tolerance", type=float, default=0.1,
+                             help="indifference zone as a fraction of each SLA limit (default 0.1)")
+    plan_parser.add_argument("--max-replications", type=int, default=50,
+                             help="replications after which a candidate is left undecided (default 50)")
+    plan_parser.add_argument("--workers", type=int, default=1, help="worker processes")
+    plan_parser.add_argument("--seed", type=int, default=None, help="base seed (default: random)")
+    plan_parser.add_argument("--format", choices=("jsonl", "csv"), default="jsonl", help="output format")
+    plan_parser.add_argument("--output", default="-", help="output file (default: stdout)")
+    plan_parser.set_defaults(handler=command_plan)
+
+    sensitivity_parser = commands.add_parser(
+        "sensitivity", help="derivatives of P_reject and wait per kitchen, buffer slot and arrival minute",
+        description="Paired runs of neighbouring configurations from one warmed-up state with common "
+                    "random numbers. Model options take one value each.")
+    add_model_arguments(sensitivity_parser)
+    sensitivity_parser.add_argument("--seed", type=int, default=None, help="base seed (default: random)")
+    sensitivity_parser.add_argument("--replications", type=int, default=10, help="replications (default 10)")
+    sensitivity_parser.add_argument("--warmup", type=int, default=2000,
+                                    help="orders simulated before the branches split (default 2000)")
+    sensitivity_parser.add_argument("--orders", type=int, default=5000,
+                                    help="orders measured in every branch (default 5000)")
+    sensitivity_parser.add_argument("--arrival-step", type=float, default=0.1,
+                                    help="half-step of the central difference in mean_arrival_time, min "
+                                         "(default 0.1)")
+    sensitivity_parser.add_argument("--format", choices=("jsonl", "csv"), default="jsonl", help="output format")
+    sensitivity_parser.add_argument("--output", default="-", help="output file (default: stdout)")
+    sensitivity_parser.set_defaults(handler=command_sensitivity)
+
+    verify_parser = commands.add_parser(
+        "verify", help="check an optimized engine against the reference simulator",
+        description="Event-by-event comparison on random small configurations, failures shrunk to minimal "
+                    "reproducers, and paired comparison of the metrics of long runs.")
+    verify_parser.add_argument("--engine", default=None, metavar="MODULE:FUNCTION",
+                               help="engine to check (default: the built-in fast engine)")
+    verify_parser.add_argument("--cases", type=int, default=200, help="small configurations (default 200)")
+    verify_parser.add_argument("--seed", type=int, default=0, help="base seed (default 0)")
+    verify_parser.add_argument("--replications", type=int, default=10,
+                               help="seeds per large configuration (default 10)")
+    verify_parser.add_argument("--large-orders", type=int, default=20000,
+                               help="orders per large run (default 20000)")
+    verify_parser.add_argument("--output", default="-", help="output file (default: stdout)")
+    verify_parser.set_defaults(handler=command_verify)
+
+    report_parser = commands.add_parser("report", help="render OР2 graphs from stored results")
+    report_parser.add_argument("results", help="results file in JSON lines format")
+    report_parser.add_argument("--output-dir", default="reports", help="directory for the images")
+    report_parser.add_argument("--image-format", choices=("png", "svg"), default="png")
+    report_parser.add_argument("--workers", type=int, default=None, help="worker processes for large batches")
+    report_parser.set_defaults(handler=command_report)
+
+    return parser
+
+
+class DefaultValues(list):
+    """Default of a model option, told apart from the same values given on the command line"""
+
+
+def add_model_arguments(parser: argparse.ArgumentParser, exclude=()):
+    for option, dest, value_type, default, help_text in MODEL_OPTIONS:
+        if dest in exclude:
+            continue
+        if default is not None:
+            help_text = f"{help_text} (default {default})"
+        parser.add_argument(option, dest=dest, type=value_type, nargs="+",
+                            default=DefaultValues([default]), help=help_text)
+
+
+def add_grid_arguments(parser: argparse.ArgumentParser):
+    add_model_arguments(parser)
+    parser.add_argument("--seed", type=int, default=None,
+                        help="base seed; replication i uses seed + i (default: random)")
+    parser.add_argument("--replications", type=int, default=1, help="replications per configuration")
+    parser.add_argument("--start-hour", type=float, default=0.0,
+                        help="time of day the simulated clock starts at (default 0 = midnight); "
+                             "timestamp traces skip orders logged before it")
+
+    stopping = parser.add_mutually_exclusive_group()
+    stopping.add_argument("--duration", type=float, default=None, help="run length in simulated minutes")
+    stopping.add_argument("--precision", type=float, default=None,
+                          help="target relative precision of P_reject (0.1 = 10%%)")
+    parser.add_argument("--orders", type=int, default=None,
+                        help="number of orders to generate (upper bound with --precision)")
+
+
+def add_output_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--format", choices=("jsonl", "csv"), default="jsonl", help="output format")
+    parser.add_argument("--output", default="-", help="output file (default: stdout)")
+    parser.add_argument("--aggregate", action="store_true",
+                        help="write one summary row per configuration instead of every replication")
+
+
+def random_seed() -> int:
+    import random
+    return random.SystemRandom().randrange(2 ** 31)
+
+
+def build_model_grid(args) -> dict:
+    grid = {dest: getattr(args, dest) for _, dest, _, _, _ in MODEL_OPTIONS if hasattr(args, dest)}
+    if args.line_service_times != [None]:
+        lines = sorted({len(times.split(",")) for times in args.line_service_times})
+        if len(lines) > 1:
+            raise ValueError("--line-service values must all describe the same number of lines")
+        kitchens = getattr(args, "num_kitchens", None)
+        if kitchens is not None and not isinstance(kitchens, DefaultValues) and kitchens != lines:
+            raise ValueError(f"--kitchens {' '.join(map(str, kitchens))} disagrees with --line-service, "
+                             f"which describes {lines[0]} lines")
+        grid["num_kitchens"] = lines
+    for trace in grid.get("arrival_trace") or []:
+        if trace:
+            from Program_Aplication.simulation.trace_arrivals import open_trace
+            try:
+                open_trace(trace)
+            except OSError as error:
+                raise ValueError(f"{trace}: {error.strerror}")
+    return grid
+
+
+def build_grid(args, base_seed=None):
+    """
+    Returns (grid, seeds, stopping) of the grid options, or raises ValueError.
+    Seeds start at --seed, else at base_seed, else at a random seed.
+    """
+    if args.replications < 1:
+        raise ValueError("--replications must be positive")
+
+    if args.seed is not None:
+        base_seed = args.seed
+    elif base_seed is None:
+        base_seed = random_seed()
+    seeds = [base_seed + i for i in range(args.replications)]
+
+    grid = build_model_grid(args)
+    stopping = {"max_orders": args.orders, "duration": args.duration, "precision": args.precision,
+                "start_hour": args.start_hour}
+    return grid, seeds, stopping
+
+
+def write_results(args, result_groups, antithetic: bool = False):
+    """Writes groups of replications of one configuration each, raw or aggregated"""
+    from Program_Aplication.simulation.runner import summarize_replications
+
+    with open_output(args.output) as output:
+        writer = make_writer(args.format, output)
+        for results in result_groups:
+            if args.aggregate:
+                writer.write(summarize_replications(results, antithetic=antithetic))
+            else:
+                for result in results:
+                    writer.write(result)
+        writer.close()
+
+
+def command_run(args) -> int:
+    from Program_Aplication.simulation.runner import expand_grid, run_antithetic_replications, run_replications
+
+    try:
+        grid, seeds, stopping = build_grid(args)
+        if args.antithetic and not isinstance(args.random_streams, DefaultValues):
+            raise ValueError("--antithetic sets the random streams of both runs; drop --streams")
+        if args.antithetic and args.precision is not None:
+            raise ValueError("--antithetic pairs need runs of equal length; use --orders or --duration "
+                             "instead of --precision")
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 2
+
+    cache = None
+    if args.cache is not None:
+        from Program_Aplication.simulation.result_cache import ResultCache
+        cache = ResultCache(args.cache or None, int(args.cache_size * 1024 * 1024))
+        stopping["cache"] = cache
+
+    exporter = None
+    if args.metrics_port is not None:
+        from Program_Aplication.simulation.metrics_exporter import MetricsExporter
+        exporter = MetricsExporter(port=args.metrics_port).start()
+        stopping["exporter"] = exporter
+        print(f"metrics: http://{exporter.host}:{exporter.port}/metrics", file=sys.stderr)
+
+    event_log = None
+    if args.event_log is not None:
+        from Program_Aplication.simulation.event_log import EventLog
+        event_log = EventLog(args.event_log, args.log_level).start()
+        stopping["event_log"] = event_log
+
+    run = run_antithetic_replications if args.antithetic else run_replications
+    try:
+        write_results(args, (run(params, seeds, **stopping) for params in expand_grid(grid)), args.antithetic)
+    finally:
+        if exporter is not None:
+            exporter.stop()
+        if event_log is not None:
+            event_log.close()
+            print(f"event log: {event_log.written} records, {event_log.dropped} dropped", file=sys.stderr)
+
+    if cache is not None:
+        print(f"cache: {cache.hits} hits, {cache.misses} misses ({cache.path})", file=sys.stderr)
+        cache.close()
+    return 0
+
+
+def command_cache(args) -> int:
+    from Program_Aplication.simulation.result_cache import ResultCache
+
+    cache = ResultCache(args.dir or None)
+    if args.clear:
+        cache.clear()
+    info = cache.info()
+    print(f"{info['path']}: {info['entries']} results, {info['bytes'] / 1024:.0f} KB")
+    cache.close()
+    return 0
+
+
+def command_report(args) -> int:
+    from Program_Aplication.display.report_generator import ReportGenerator
+
+    generator = ReportGenerator(output_dir=args.output_dir, image_format=args.image_format,
+                                max_workers=args.workers)
+    results = ReportGenerator.load_results(args.results)
+    paths = generator.render_parameter_report(results)
+    if len(results) == 1:
+        paths += generator.render_history_report(results[0])
+
+    for path in paths:
+        print(path)
+    return 0
+
+
+def command_trace(args) -> int:
+    from Program_Aplication.simulation.trace_arrivals import convert_trace
+
+    try:
+        count = convert_trace(args.csv, args.output)
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 2
+    print(f"{count} orders written to {args.output}")
+    return 0
+
+
+def command_rare(args) -> int:
+    from Program_Aplication.simulation.rare_event import RestartEstimator
+    from Program_Aplication.simulation.runner import expand_grid
+
+    seed = args.seed if args.seed is not None else random_seed()
+    try:
+        grid = build_model_grid(args)
+        estimators = [RestartEstimator(params, args.thresholds, args.splits) for params in expand_grid(grid)]
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 2
+
+    with open_output(args.output) as output:
+        writer = make_writer(args.format, output)
+        for estimator in estimators:
+            writer.write({"params": estimator.params, "seed": seed,
+                          "rare_event": estimator.estimate(seed, args.precision, args.batch_orders)})
+        writer.close()
+    return 0
+
+
+def command_plan(args) -> int:
+    from Program_Aplication.simulation.capacity_planner import CapacityPlanner
+
+    seed = args.seed if args.seed is not None else random_seed()
+    try:
+        grid = build_model_grid(args)
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 2
+    if any(len(values) > 1 for values in grid.values()):
+        print("plan takes one value per model option", file=sys.stderr)
+        return 2
+
+    try:
+        planner = CapacityPlanner(
+            {name: values[0] for name, values in grid.items()}, args.max_reject, args.max_wait_p95,
+            kitchens=range(args.kitchens[0], args.kitchens[1] + 1), buffers=range(args.buffer[0], args.buffer[1] + 1),
+            kitchen_cost=args.kitchen_cost, buffer_cost=args.buffer_cost, orders=args.orders,
+            warmup_orders=args.warmup, confidence=args.confidence, tolerance=args.tolerance,
+            max_replications=args.max_replications, workers=args.workers)
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 2
+
+    plan = planner.plan(seed)
+    chosen = plan["chosen"]
+    if chosen is None:
+        print("no configuration in the search range meets the SLA", file=sys.stderr)
+    else:
+        print(f"chosen: {chosen['num_kitchens']} kitchens, buffer {chosen['buffer_capacity']}; "
+              f"joint confidence {plan['joint_confidence']:.3f}; {plan['events']} events", file=sys.stderr)
+
+    with open_output(args.output) as output:
+        writer = make_writer(args.format, output)
+        writer.write({"seed": seed, "plan": {key: value for key, value in plan.items() if key != "candidates"}})
+        writer.close()
+    return 0
+
+
+def command_sensitivity(args) -> int:
+    import math
+    from Program_Aplication.simulation.sensitivity import SensitivityAnalysis
+
+    seed = args.seed if args.seed is not None else random_seed()
+    try:
+        grid = build_model_grid(args)
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 2
+    if any(len(values) > 1 for values in grid.values()):
+        print("sensitivity takes one value per model option", file=sys.stderr)
+        return 2
+
+    params = {name: values[0] for name, values in grid.items()}
+    try:
+        analysis = SensitivityAnalysis(params, args.warmup, args.orders, args.arrival_step)
+        report = analysis.run([seed + i for i in range(args.replications)])
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 2
+    if report["arrival_difference"] != "central":
+        print(f"mean_arrival_time: {report['arrival_difference']} difference, the arrival law has a kink "
+              f"at a mean of 1.1 between the central neighbours", file=sys.stderr)
+
+    print(f"{'Factor':<18} {'dP_reject':>11} {'+-':>9} {'VR':>6} {'dT_wait':>9} {'+-':>7} {'VR':>6}",
+          file=sys.stderr)
+    for factor, metrics in report["derivatives"].items():
+        line = f"{factor:<18}"
+        for metric, width, digits in (("rejection_rate", 11, 5), ("avg_wait_time", 9, 3)):
+            estimate = metrics[metric]
+            reduction = estimate["variance_reduction"]
+            line += (f" {estimate['derivative']:>{width}.{digits}f} {estimate['half_width']:>{width - 2}.{digits}f}"
+                     f" {reduction if reduction is not None else math.inf:>6.1f}")
+        print(line, file=sys.stderr)
+
+    with open_output(args.output) as output:
+        writer = make_writer(args.format, output)
+        writer.write({"params": params, "seed": seed, "sensitivity": report})
+        writer.close()
+    return 0
+
+
+def command_verify(args) -> int:
+    import importlib
+    from Program_Aplication.simulation.differential import verify_engine
+
+    engine = None
+    if args.engine:
+        module_name, _, function_name = args.engine.partition(":")
+        try:
+            engine = getattr(importlib.import_module(module_name), function_name)
+        except (ImportError, AttributeError) as error:
+            print(f"Cannot load engine {args.engine}: {error}", file=sys.stderr)
+            return 2
+
+    report = verify_engine(engine, args.cases, args.seed, args.replications, args.large_orders)
+    for mismatch in report["mismatches"]:
+        print(f"MISMATCH params={mismatch['params']} seed={mismatch['seed']} max_orders={mismatch['max_orders']}: "
+              f"event {mismatch['index']} is {mismatch['actual']}, the reference has {mismatch['expected']}",
+              file=sys.stderr)
+    print(f"exact: {args.cases} cases, {len(report['mismatches'])} distinct mismatches", file=sys.stderr)
+    for check in report["statistical"]:
+        speedup = check["reference_seconds"] / max(1e-9, check["engine_seconds"])
+        verdict = "agree" if check["agree"] else "DIFFER"
+        differences = ", ".join(f"{name} {metric['difference']:+.3g}+-{metric['half_width']:.3g}"
+                                for name, metric in check["metrics"].items())
+        print(f"statistical {check['params']}: {verdict} ({differences}), {speedup:.1f}x faster", file=sys.stderr)
+
+    with open_output(args.output) as output:
+        writer = make_writer("jsonl", output)
+        writer.write(report)
+        writer.close()
+    return 0 if report["passed"] else 1
+
+
+def command_queue_submit(args) -> int:
+    from Program_Aplication.simulation.work_queue import SweepQueue
+
+    queue = SweepQueue(args.queue)
+    try:
+        # Without --seed, resubmitting must find the points of the first submission
+        base_seed = queue.base_seed(args.seed if args.seed is not None else random_seed())
+        grid, seeds, stopping = build_grid(args, base_seed)
+    except ValueError as error:
+        queue.close()
+        print(error, file=sys.stderr)
+        return 2
+
+    added = queue.submit(grid, seeds, **stopping)
+    progress = queue.progress()
+    queue.close()
+    print(f"{added} items added, {sum(progress.values())} in queue")
+    return 0
+
+
+def command_queue_work(args) -> int:
+    from Program_Aplication.simulation.work_queue import drain_queue
+
+    finished = drain_queue(args.queue, args.workers, args.lease, wait=not args.no_wait, cache_dir=args.cache)
+    print(f"{finished} items finished", file=sys.stderr)
+    return command_queue_status(args)
+
+
+def command_queue_status(args) -> int:
+    from Program_Aplication.simulation.work_queue import SweepQueue
+
+    queue = SweepQueue(args.queue)
+    if getattr(args, "retry_failed", False):
+        print(f"{queue.reset_failed()} failed items reset")
+    progress = queue.progress()
+    queue.close()
+    print(", ".join(f"{status}: {count}" for status, count in progress.items()))
+    return 0 if progress["failed"] == 0 else 1
+
+
+def command_queue_results(args) -> int:
+    import json
+    from Program_Aplication.simulation.work_queue import SweepQueue
+
+    queue = SweepQueue(args.queue)
+    groups = {}
+    for result in queue.results():
+        groups.setdefault(json.dumps(result["params"], sort_keys=True), []).append(result)
+    queue.close()
+
+    write_results(args, groups.values())
+    return 0
+
+
+def open_output(path: str):
+    if path == "-":
+        import contextlib
+        return contextlib.nullcontext(sys.stdout)
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def flatten_record(record: dict, prefix: str = "") -> dict:
+    row = {}
+    for key, value in record.items():
+        if isinstance(value, dict):
+            row.update(flatten_record(value, f"{prefix}{key}."))
+        else:
+            row[f"{prefix}{key}"] = value
+    return row
+
+
+class JsonLinesWriter:
+    """Non-finite values, such as the half-width of a single replication, are written as null"""
+
+    def __init__(self, output):
+        import json
+        from Program_Aplication.display.report_generator import json_safe
+        self.dumps = json.dumps
+        self.json_safe = json_safe
+        self.output = output
+
+    def write(self, record: dict):
+        self.output.write(self.dumps(self.json_safe(record), ensure_ascii=False, allow_nan=False) + "\n")
+        self.output.flush()
+
+    def close(self):
+        pass
+
+
+class CsvWriter:
+    """
+    Rows are written as they come under the header of the first one, so long
+    sweeps do not hold their results in memory. Columns a later row adds (the
+    windows of another arrival profile, say) have no place in that header and
+    are dropped with a warning; such grids want --format jsonl. Raw quantile
+    sketches only make sense in JSON lines and are left out.
+    """
+
+    def __init__(self, output):
+        self.output = output
+        self.writer = None
+        self.columns = set()
+
+    def write(self, record: dict):
+        import csv
+        row = flatten_record({key: value for key, value in record.items() if key != "sketches"})
+        if self.writer is None:
+            self.writer = csv.DictWriter(self.output, fieldnames=list(row), restval="", extrasaction="ignore")
+            self.writer.writeheader()
+            self.columns = set(row)
+        extra = row.keys() - self.columns
+        if extra:
+            print(f"CSV has no columns for {', '.join(sorted(extra))}; they are dropped (use --format jsonl)",
+                  file=sys.stderr)
+            self.columns |= extra
+        self.writer.writerow(row)
+        self.output.flush()
+
+    def close(self):
+        self.output.flush()
+
+
+def make_writer(output_format: str, output):
+    if output_format == "jsonl":
+        return JsonLinesWriter(output)
+    return CsvWriter(output)
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,6 @@
-from .console_display import ConsoleDisplay
+from .._lazy import lazy_exports
 
-__all__ = [
-    'ConsoleDisplay'
-]
\ No newline at end of file
+__getattr__, __dir__, __all__ = lazy_exports(__name__, {
+    'ConsoleDisplay': '.console_display',
+    'ReportGenerator': '.report_generator'
+})
\ No newline at end of file
@@ -203,9 +203,12 @@ class ConsoleDisplay:
         if step_info.get('buffer_operation'):
             print(f"Операция с буфером: {step_info['buffer_operation']}")
 
-    def display_waveform_diagram(self, events_history: list, time_period: int = 10):
+    def display_waveform_diagram(self, events_history, time_period: int = 10,
+                                 start: Optional[datetime] = None, end: Optional[datetime] = None):
         """
         Отображение временной диаграммы (Waveform)
+        events_history - список событий или EventHistory; при заданных start/end
+        показываются события этого окна времени, иначе последние time_period
         """
         print("\nВРЕМЕННАЯ ДИАГРАММА (Waveform)")
         print("─" * 70)
@@ -214,8 +217,23 @@ class ConsoleDisplay:
             print("История событий пуста")
             return
 
+        if hasattr(events_history, "window"):
+            if start is not None or end is not None:
+                events = events_history.window(start, end)
+            else:
+                events = events_history.latest(time_period)
+        else:
+            events = [event for event in events_history
+                      if (start is None or event['time'] >= start) and (end is None or event['time'] <= end)]
+            if start is None and end is None:
+                events = events[-time_period:]
+
+        if not events:
+            print("В выбранном окне событий нет")
+            return
+
         time_slots = {}
-        for event in events_history[-time_period:]:
+        for event in events:
             time_key = event['time'].strftime('%H:%M:%S')
             if time_key not in time_slots:
                 time_slots[time_key] = []
@@ -239,7 +257,8 @@ class ConsoleDisplay:
             'kitchen_complete': f'Готов{order_id}',
             'buffer_add': f'Буфер{order_id}',
             'buffer_remove': f'Выбор{order_id}',
-            'rejection': f'Отказ{order_id}'
+            'rejection': f'Отказ{order_id}',
+            'abandon': f'Уход{order_id}'
         }
 
         return symbols.get(event_type, event_type)
@@ -254,6 +273,9 @@ class ConsoleDisplay:
         print("  [s]     - показать статистику")
         print("  [c]     - показать календарь событий")
         print("  [w]     - показать временную диаграмму")
+        print("  [b]     - шаг назад (повтор от ближайшей контрольной точки)")
+        print("  [u]     - выполнить без вывода до точки останова:")
+        print("            full, reject, idle [N], wait МИН, events N, time ЧЧ:ММ")
         print()
         print("Автоматический режим:")
         print("  Укажите количество заказов для генерации")
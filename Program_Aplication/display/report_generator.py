@@ -0,0 +1,236 @@
+import json
+import math
+import os
+from typing import Any, Dict, List, Optional
+
+
+PARAMETER_LABELS = {
+    'num_sources': 'Число источников',
+    'num_kitchens': 'Число приборов (кухонь)',
+    'buffer_capacity': 'Емкость буфера',
+    'mean_arrival_time': 'Среднее время между заказами, мин',
+    'mean_service_time': 'Среднее время приготовления, мин',
+    'max_wait_minutes': 'Терпение клиента, мин',
+    'batch_size': 'Размер партии',
+    'num_couriers': 'Число курьеров',
+    'courier_capacity': 'Заказов в поездке курьера'
+}
+
+METRIC_LABELS = {
+    'kitchen_utilization': 'Загрузка приборов',
+    'rejection_rate': 'P_reject',
+    'abandonment_rate': 'P_abandon',
+    'avg_wait_time': 'T_wait, мин',
+    'wait_p95': 'T_wait P95, мин',
+    'wait_p99': 'T_wait P99, мин',
+    'throughput_per_hour': 'Заказов в час',
+    'avg_total_time': 'T_total (от заказа до двери), мин',
+    'total_p95': 'T_total P95, мин',
+    'courier_utilization': 'Загрузка курьеров',
+    'system_load': 'ρ'
+}
+
+HISTORY_SERIES = {
+    'utilization': 'Загрузка приборов',
+    'buffer_usage': 'Занято мест в буфере',
+    'wait_time': 'T_wait, мин',
+    'rejections': 'Отказы (накопленно)'
+}
+
+_pyplot = None
+
+
+def _load_pyplot():
+    """Ленивый импорт matplotlib с безоконным бэкендом Agg"""
+    global _pyplot
+    if _pyplot is None:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        _pyplot = plt
+    return _pyplot
+
+
+def json_safe(value):
+    """
+    Замена неконечных чисел (неопределенная полуширина интервала при одном
+    прогоне, бесконечный выигрыш дисперсии) на None: в JSON это null, а не
+    недопустимые Infinity и NaN
+    """
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_safe(item) for item in value]
+    return value
+
+
+def render_charts(charts: List[Dict[str, Any]]) -> List[str]:
+    """
+    Отрисовка пакета графиков в текущем процессе.
+    Каждый график - словарь с заголовком, подписями осей, сериями и путем файла.
+    """
+    plt = _load_pyplot()
+    paths = []
+
+    for chart in charts:
+        figure, axes = plt.subplots(figsize=(8, 5))
+        for label, (xs, ys) in chart['series'].items():
+            axes.plot(xs, ys, marker=chart.get('marker', 'o'), label=label or None)
+
+        axes.set_title(chart['title'])
+        axes.set_xlabel(chart['x_label'])
+        axes.set_ylabel(chart['y_label'])
+        axes.grid(True, alpha=0.3)
+        if len(chart['series']) > 1:
+            axes.legend()
+
+        figure.tight_layout()
+        figure.savefig(chart['path'])
+        plt.close(figure)
+        paths.append(chart['path'])
+
+    return paths
+
+
+class ReportGenerator:
+    """Генерация графиков результатов (OР2) по сохраненным прогонам и сериям прогонов"""
+
+    def __init__(self, output_dir: str = "reports", image_format: str = "png",
+                 max_workers: Optional[int] = None, parallel_threshold: int = 16):
+        if image_format not in ("png", "svg"):
+            raise ValueError(f"Unsupported image format: {image_format}")
+
+        self.output_dir = output_dir
+        self.image_format = image_format
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.parallel_threshold = parallel_threshold
+
+    @staticmethod
+    def load_results(path: str) -> List[Dict[str, Any]]:
+        """Чтение результатов прогонов из файла JSON lines"""
+        results = []
+        with open(path, encoding="utf-8") as results_file:
+            for line in results_file:
+                line = line.strip()
+                if line:
+                    results.append(json.loads(line))
+        return results
+
+    @staticmethod
+    def save_results(results: List[Dict[str, Any]], path: str):
+        """Сохранение результатов прогонов в файл JSON lines"""
+        with open(path, "w", encoding="utf-8") as results_file:
+            for result in results:
+                results_file.write(json.dumps(json_safe(result), ensure_ascii=False, allow_nan=False) + "\n")
+
+    def plan_parameter_charts(self, results: List[Dict[str, Any]],
+                              parameters: Optional[List[str]] = None,
+                              metrics: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Построение описаний графиков "метрика от параметра".
+        Остальные изменяющиеся параметры образуют отдельные серии,
+        повторные прогоны одной точки усредняются.
+        """
+        metrics = metrics or list(METRIC_LABELS)
+        varying = self._varying_parameters(results)
+        parameters = [p for p in (parameters or varying) if p in varying]
+
+        charts = []
+        for parameter in parameters:
+            others = [p for p in varying if p != parameter]
+            for metric in metrics:
+                series = self._collect_series(results, parameter, others, metric)
+                if not series:
+                    continue
+                charts.append({
+                    'title': f"{METRIC_LABELS.get(metric, metric)} от параметра {parameter}",
+                    'x_label': PARAMETER_LABELS.get(parameter, parameter),
+                    'y_label': METRIC_LABELS.get(metric, metric),
+                    'series': series,
+                    'path': self._chart_path(f"{metric}_vs_{parameter}")
+                })
+
+        return charts
+
+    def plan_history_charts(self, result: Dict[str, Any], name: str = "run") -> List[Dict[str, Any]]:
+        """Описания графиков временных рядов одного прогона"""
+        history = result.get('history')
+        if not history:
+            return []
+
+        charts = []
+        for key, label in HISTORY_SERIES.items():
+            values = history.get(key)
+            if not values:
+                continue
+            charts.append({
+                'title': f"{label} во времени",
+                'x_label': 'Модельное время, мин',
+                'y_label': label,
+                'series': {'': (history['time'][:len(values)], values)},
+                'marker': '',
+                'path': self._chart_path(f"{name}_{key}")
+            })
+
+        return charts
+
+    def render(self, charts: List[Dict[str, Any]]) -> List[str]:
+        """
+        Отрисовка графиков. Небольшие пакеты рисуются в текущем процессе,
+        большие делятся на части по числу рабочих процессов.
+        """
+        if not charts:
+            return []
+
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        workers = min(self.max_workers, len(charts))
+        if len(charts) < self.parallel_threshold or workers < 2:
+            return render_charts(charts)
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        chunks = [charts[i::workers] for i in range(workers)]
+        paths = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for chunk_paths in executor.map(render_charts, chunks):
+                paths.extend(chunk_paths)
+        return sorted(paths)
+
+    def render_parameter_report(self, results: List[Dict[str, Any]],
+                                parameters: Optional[List[str]] = None,
+                                metrics: Optional[List[str]] = None) -> List[str]:
+        return self.render(self.plan_parameter_charts(results, parameters, metrics))
+
+    def render_history_report(self, result: Dict[str, Any], name: str = "run") -> List[str]:
+        return self.render(self.plan_history_charts(result, name))
+
+    def _chart_path(self, name: str) -> str:
+        return os.path.join(self.output_dir, f"{name}.{self.image_format}")
+
+    def _varying_parameters(self, results: List[Dict[str, Any]]) -> List[str]:
+        values: Dict[str, set] = {}
+        for result in results:
+            for key, value in result.get('params', {}).items():
+                values.setdefault(key, set()).add(value)
+        return sorted(key for key, seen in values.items() if len(seen) > 1)
+
+    def _collect_series(self, results: List[Dict[str, Any]], parameter: str,
+                        others: List[str], metric: str) -> Dict[str, tuple]:
+        points: Dict[str, Dict[Any, List[float]]] = {}
+
+        for result in results:
+            params = result.get('params', {})
+            value = result.get('metrics', {}).get(metric)
+            if parameter not in params or value is None:
+                continue
+            label = ", ".join(f"{p}={params.get(p)}" for p in others)
+            points.setdefault(label, {}).setdefault(params[parameter], []).append(value)
+
+        series = {}
+        for label, by_x in sorted(points.items()):
+            xs = sorted(by_x)
+            series[label] = (xs, [sum(by_x[x]) / len(by_x[x]) for x in xs])
+        return series
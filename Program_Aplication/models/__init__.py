@@ -1,16 +1,22 @@
-from .order import Order, OrderStatus
-from .kitchen import KitchenLine
-from .buffer import CircularBuffer, BufferOperationResult
-from .dispatcher import PlacementDispatcher, SelectionDispatcher, DispatchResult, RejectionResult
+from .._lazy import lazy_exports
 
-__all__ = [
-    'Order',
-    'OrderStatus',
-    'KitchenLine',
-    'CircularBuffer',
-    'BufferOperationResult',
-    'PlacementDispatcher',
-    'SelectionDispatcher',
-    'DispatchResult',
-    'RejectionResult'
-]
\ No newline at end of file
+__getattr__, __dir__, __all__ = lazy_exports(__name__, {
+    'Order': '.order',
+    'OrderStatus': '.order',
+    'OrderPriority': '.order',
+    'KitchenLine': '.kitchen',
+    'ItemServiceModel': '.service_model',
+    'DeliveryStage': '.delivery',
+    'Courier': '.delivery',
+    'GridIndex': '.delivery',
+    'CircularBuffer': '.buffer',
+    'BufferOperationResult': '.buffer',
+    'MultiLevelBuffer': '.buffer',
+    'PlacementDispatcher': '.dispatcher',
+    'SelectionDispatcher': '.dispatcher',
+    'DispatchResult': '.dispatcher',
+    'RejectionResult': '.dispatcher',
+    'RoutingPolicy': '.routing',
+    'ROUTING_POLICIES': '.routing',
+    'make_routing_policy': '.routing'
+})
\ No newline at end of file
@@ -1,5 +1,7 @@
-from typing import List, Optional, Tuple
-from .order import Order
+import bisect
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+from .order import Order, OrderPriority, OrderStatus
 
 
 class BufferOperationResult:
@@ -14,13 +16,60 @@ class BufferOperationResult:
         return f"Success: {self.success}, Message: {self.message}"
 
 
+class CompatibilityIndex:
+    """
+    FIFO queue of buffered orders per dish, for batch cooking, so taking
+    compatible orders never scans the buffer. The buffer discards orders that
+    leave it otherwise (served, timed out or evicted); they are mostly the
+    oldest of their dish, at the head of its queue, which makes that O(1).
+    """
+
+    def __init__(self):
+        self.queues: Dict[str, Deque[Order]] = {}
+
+    def add(self, order: Order):
+        queue = self.queues.get(order.dish)
+        if queue is None:
+            queue = self.queues[order.dish] = deque()
+        queue.append(order)
+
+    def discard(self, order: Order):
+        queue = self.queues.get(order.dish)
+        if not queue:
+            return
+        if queue[0] is order:
+            queue.popleft()
+        else:
+            try:
+                queue.remove(order)
+            except ValueError:
+                pass
+        if not queue:
+            del self.queues[order.dish]
+
+    def take(self, order: Order, limit: int) -> List[Order]:
+        """Up to limit pending orders with the same dish as order, oldest first"""
+        queue = self.queues.get(order.dish)
+        compatible = []
+        while queue and len(compatible) < limit:
+            candidate = queue.popleft()
+            if candidate is not order and candidate.status == OrderStatus.PENDING:
+                compatible.append(candidate)
+        if queue is not None and not queue:
+            del self.queues[order.dish]
+        return compatible
+
+
 class CircularBuffer:
-    def __init__(self, capacity: int = 20):
+    def __init__(self, capacity: int = 20, batch_index: bool = False):
         self.capacity = capacity
         self.buffer: List[Optional[Order]] = [None] * capacity
+        # Slot of every buffered order by id, so removing a known order does not scan
+        self.slots: Dict[str, int] = {}
         self.pointer = 0
         self.oldest_pointer = 0
         self.count = 0
+        self.batch_index = CompatibilityIndex() if batch_index else None
 
     def add_item(self, order: Order) -> BufferOperationResult:
         if self.is_full():
@@ -28,8 +77,11 @@ class CircularBuffer:
             result = self._find_insertion_position()
             if result[0] != -1:
                 self.buffer[result[0]] = order
+                self.slots[order.order_id] = result[0]
                 self.pointer = (result[0] + 1) % self.capacity
                 self.count += 1
+                if self.batch_index:
+                    self.batch_index.add(order)
                 return BufferOperationResult(
                     success=True,
                     rejected_order=oldest_order,
@@ -41,8 +93,11 @@ class CircularBuffer:
             result = self._find_insertion_position()
             if result[0] != -1:
                 self.buffer[result[0]] = order
+                self.slots[order.order_id] = result[0]
                 self.pointer = (result[0] + 1) % self.capacity
                 self.count += 1
+                if self.batch_index:
+                    self.batch_index.add(order)
                 return BufferOperationResult(
                     success=True,
                     insertion_position=result[0],
@@ -94,15 +149,42 @@ class CircularBuffer:
                     oldest_index = i
 
         if oldest_index != -1:
-            self.buffer[oldest_index] = None
-            self.count -= 1
-            if not self.is_empty():
-                self.oldest_pointer = self._find_next_oldest()
-            else:
-                self.oldest_pointer = 0
+            self._release(oldest_order, oldest_index)
+            self._update_oldest_pointer()
 
         return oldest_order
 
+    def _release(self, order: Order, index: int):
+        self.buffer[index] = None
+        del self.slots[order.order_id]
+        self.count -= 1
+        if self.batch_index:
+            self.batch_index.discard(order)
+
+    def _update_oldest_pointer(self):
+        self.oldest_pointer = self._find_next_oldest() if not self.is_empty() else 0
+
+    def remove_item(self, order: Order) -> bool:
+        index = self.slots.get(order.order_id)
+        if index is None or self.buffer[index] is not order:
+            return False
+        self._release(order, index)
+        self._update_oldest_pointer()
+        return True
+
+    def take_compatible(self, order: Order, limit: int) -> List[Order]:
+        """Removes and returns up to limit buffered orders that can be cooked with order"""
+        if self.batch_index is None or limit < 1:
+            return []
+        compatible = self.batch_index.take(order, limit)
+        for candidate in compatible:
+            index = self.slots.pop(candidate.order_id)
+            self.buffer[index] = None
+            self.count -= 1
+        if compatible:
+            self._update_oldest_pointer()
+        return compatible
+
     def _find_next_oldest(self) -> int:
         oldest_index = -1
         oldest_time = None
@@ -115,6 +197,11 @@ class CircularBuffer:
 
         return oldest_index if oldest_index != -1 else 0
 
+    def grow(self, slots: int = 1):
+        """Adds empty slots after the last one; buffered orders stay where they are"""
+        self.buffer.extend([None] * slots)
+        self.capacity += slots
+
     def is_full(self) -> bool:
         return self.count == self.capacity
 
@@ -131,4 +218,142 @@ class CircularBuffer:
                 status.append(f"[{i}: {order.order_id[:8]}]")
             else:
                 status.append(f"[{i}: EMPTY]")
+        return " | ".join(status)
+
+
+class MultiLevelBuffer:
+    """
+    Buffer shared by several priority classes, one FIFO queue per class.
+
+    Selection takes the oldest order of the highest class and eviction the
+    oldest order of the lowest class, so inside a class the ring placement and
+    the oldest-first rejection of CircularBuffer are kept. A full buffer
+    rejects an arrival whose class is below every buffered order.
+    Removed orders are dropped from the queues lazily, which makes selection
+    and eviction O(1) amortised for a fixed set of classes; the ring pointer
+    finds the next free slot with a bisect over the sorted free slots.
+    """
+
+    def __init__(self, capacity: int = 20, levels=tuple(OrderPriority), batch_index: bool = False):
+        self.capacity = capacity
+        self.buffer: List[Optional[Order]] = [None] * capacity
+        self.free_slots = list(range(capacity))
+        self.slots: Dict[str, int] = {}
+        self.levels = sorted(levels)
+        self.queues: Dict[int, Deque[Order]] = {level: deque() for level in self.levels}
+        self.pointer = 0
+        self.oldest_pointer = 0
+        self.count = 0
+        self.batch_index = CompatibilityIndex() if batch_index else None
+
+    def add_item(self, order: Order) -> BufferOperationResult:
+        if order.priority not in self.queues:
+            raise ValueError(f"Unknown priority class: {order.priority}")
+
+        if not self.is_full():
+            position = self._place(order)
+            return BufferOperationResult(True, message="Order added successfully",
+                                         insertion_position=position)
+
+        victim = self._head(self.levels, reverse=False)
+        if victim.priority > order.priority:
+            return BufferOperationResult(False, rejected_order=order,
+                                         message="Buffer is full of higher-priority orders")
+
+        self._release(victim)
+        if self.batch_index:
+            self.batch_index.discard(victim)
+        position = self._place(order)
+        return BufferOperationResult(
+            success=True,
+            rejected_order=victim,
+            message="Buffer was full, oldest lowest-priority order rejected",
+            insertion_position=position
+        )
+
+    def _head(self, levels, reverse: bool = True) -> Optional[Order]:
+        for level in (reversed(levels) if reverse else levels):
+            queue = self.queues[level]
+            while queue and queue[0].order_id not in self.slots:
+                queue.popleft()
+            if queue:
+                return queue[0]
+        return None
+
+    def _place(self, order: Order) -> int:
+        index = bisect.bisect_left(self.free_slots, self.pointer)
+        if index == len(self.free_slots):
+            index = 0
+        position = self.free_slots.pop(index)
+
+        self.buffer[position] = order
+        self.slots[order.order_id] = position
+        self.queues[order.priority].append(order)
+        if self.batch_index:
+            self.batch_index.add(order)
+        self.count += 1
+        self.pointer = (position + 1) % self.capacity
+        self._update_oldest_pointer()
+        return position
+
+    def _release(self, order: Order):
+        position = self.slots.pop(order.order_id)
+        self.buffer[position] = None
+        bisect.insort(self.free_slots, position)
+        self.count -= 1
+        self._update_oldest_pointer()
+
+    def _update_oldest_pointer(self):
+        next_order = self._head(self.levels)
+        self.oldest_pointer = self.slots[next_order.order_id] if next_order else 0
+
+    def get_oldest_item(self) -> Optional[Order]:
+        """The next order to serve: the oldest one of the highest class"""
+        return self._head(self.levels)
+
+    def remove_oldest_item(self) -> Optional[Order]:
+        next_order = self._head(self.levels)
+        if next_order is not None:
+            self._release(next_order)
+            if self.batch_index:
+                self.batch_index.discard(next_order)
+        return next_order
+
+    def remove_item(self, order: Order) -> bool:
+        if order.order_id not in self.slots:
+            return False
+        self._release(order)
+        if self.batch_index:
+            self.batch_index.discard(order)
+        return True
+
+    def take_compatible(self, order: Order, limit: int) -> List[Order]:
+        if self.batch_index is None or limit < 1:
+            return []
+        compatible = self.batch_index.take(order, limit)
+        for candidate in compatible:
+            self._release(candidate)
+        return compatible
+
+    def grow(self, slots: int = 1):
+        self.free_slots.extend(range(self.capacity, self.capacity + slots))
+        self.buffer.extend([None] * slots)
+        self.capacity += slots
+
+    def is_full(self) -> bool:
+        return self.count == self.capacity
+
+    def is_empty(self) -> bool:
+        return self.count == 0
+
+    def get_buffer_state(self) -> List[Optional[Order]]:
+        return self.buffer.copy()
+
+    def __str__(self):
+        status = []
+        for i, order in enumerate(self.buffer):
+            if order:
+                status.append(f"[{i}: {order.order_id[:8]} {order.priority.name[0]}]")
+            else:
+                status.append(f"[{i}: EMPTY]")
         return " | ".join(status)
\ No newline at end of file
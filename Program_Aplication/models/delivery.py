@@ -0,0 +1,278 @@
+import math
+import zlib
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from .order import Order, OrderStatus, _split_mix
+
+CITY_SIZE_KM = 8.0
+DETOUR_FACTOR = 1.3
+
+
+def address_point(address: str, city_size: float = CITY_SIZE_KM) -> Tuple[float, float]:
+    """Stable coordinates of an address in a square city, in km from its corner"""
+    mixed = _split_mix(zlib.crc32(address.encode("utf-8")))
+    return (mixed & 0xFFFFFFFF) / 2 ** 32 * city_size, (mixed >> 32) / 2 ** 32 * city_size
+
+
+class GridIndex:
+    """
+    Uniform grid over the city for points that come and go: idle couriers and
+    ready orders by destination. Every cell is a dict, so insert and remove
+    are O(1). nearest walks rings of cells outward from the query and stops as
+    soon as no unvisited ring can hold anything closer; within visits only the
+    cells the circle overlaps. With only a few points, when the rings would be
+    mostly empty, nearest scans them directly.
+    """
+
+    SCAN_LIMIT = 32
+
+    def __init__(self, cell_size: float, extent: float = CITY_SIZE_KM):
+        if cell_size <= 0:
+            raise ValueError("Cell size must be positive")
+        self.cell_size = cell_size
+        self.max_ring = int(extent / cell_size) + 1
+        self.ring_offsets = [list(self._ring(ring)) for ring in range(self.max_ring + 1)]
+        self.cells: Dict[Tuple[int, int], Dict[Hashable, Tuple[float, float]]] = {}
+        self.positions: Dict[Hashable, Tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __contains__(self, item) -> bool:
+        return item in self.positions
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def insert(self, item: Hashable, x: float, y: float):
+        cell = self._cell(x, y)
+        self.cells.setdefault(cell, {})[item] = (x, y)
+        self.positions[item] = cell
+
+    def remove(self, item: Hashable) -> bool:
+        cell = self.positions.pop(item, None)
+        if cell is None:
+            return False
+        bucket = self.cells[cell]
+        del bucket[item]
+        if not bucket:
+            del self.cells[cell]
+        return True
+
+    @staticmethod
+    def _ring(ring: int) -> Iterator[Tuple[int, int]]:
+        """Offsets of the cells at Chebyshev distance ring from a cell"""
+        if ring == 0:
+            yield 0, 0
+            return
+        for dx in range(-ring, ring + 1):
+            yield dx, -ring
+            yield dx, ring
+        for dy in range(-ring + 1, ring):
+            yield -ring, dy
+            yield ring, dy
+
+    def nearest(self, x: float, y: float) -> Optional[Hashable]:
+        if not self.positions:
+            return None
+
+        best, best_distance = None, math.inf
+        if len(self.positions) <= self.SCAN_LIMIT:
+            for bucket in self.cells.values():
+                for item, (px, py) in bucket.items():
+                    distance = math.hypot(px - x, py - y)
+                    if distance < best_distance:
+                        best, best_distance = item, distance
+            return best
+
+        cx, cy = self._cell(x, y)
+        cell_size = self.cell_size
+        margin = min(x - cx * cell_size, (cx + 1) * cell_size - x, y - cy * cell_size, (cy + 1) * cell_size - y)
+        cells = self.cells
+        for ring, offsets in enumerate(self.ring_offsets):
+            if ring and best_distance <= (ring - 1) * cell_size + margin:
+                break
+            for dx, dy in offsets:
+                bucket = cells.get((cx + dx, cy + dy))
+                if not bucket:
+                    continue
+                for item, (px, py) in bucket.items():
+                    distance = math.hypot(px - x, py - y)
+                    if distance < best_distance:
+                        best, best_distance = item, distance
+        return best
+
+    def within(self, x: float, y: float, radius: float) -> List[Hashable]:
+        low_x, low_y = self._cell(x - radius, y - radius)
+        high_x, high_y = self._cell(x + radius, y + radius)
+        found = []
+        for cell_x in range(low_x, high_x + 1):
+            for cell_y in range(low_y, high_y + 1):
+                bucket = self.cells.get((cell_x, cell_y))
+                if not bucket:
+                    continue
+                for item, (px, py) in bucket.items():
+                    if math.hypot(px - x, py - y) <= radius:
+                        found.append(item)
+        return found
+
+
+class Courier:
+    def __init__(self, courier_id: int, x: float, y: float):
+        self.courier_id = courier_id
+        self.x = x
+        self.y = y
+        self.is_busy = False
+        self.trip: List[Order] = []
+        self.trip_start: Optional[datetime] = None
+        self.free_time: Optional[datetime] = None
+        self.destination: Tuple[float, float] = (x, y)
+        self.trips = 0
+        self.orders_delivered = 0
+        self.busy_minutes = 0.0
+
+    def __str__(self):
+        return f"Courier {self.courier_id}"
+
+
+class DeliveryStage:
+    """
+    Second queueing stage: couriers take cooked orders from the restaurant to
+    their addresses.
+
+    Ready orders wait in arrival order. The oldest one goes to the idle courier
+    nearest to the restaurant, who also takes up to capacity - 1 other ready
+    orders with destinations within batch_radius of it, oldest first, and drops
+    them along a nearest-neighbour route. A courier waits for the next trip
+    where the last drop was. Both lookups go through grid indexes, so matching
+    stays cheap with thousands of addresses and hundreds of couriers. Travel
+    time is the straight-line distance times DETOUR_FACTOR at speed_kmh; the
+    stage is deterministic and draws no random numbers.
+    """
+
+    def __init__(self, num_couriers: int, speed_kmh: float = 20.0, capacity: int = 1,
+                 batch_radius: float = 1.0, city_size: float = CITY_SIZE_KM,
+                 cell_size: float = 1.0, start_time: Optional[datetime] = None):
+        if num_couriers < 1:
+            raise ValueError("The delivery stage needs at least one courier")
+        if capacity < 1:
+            raise ValueError("Courier capacity must be at least 1")
+        if speed_kmh <= 0:
+            raise ValueError("Courier speed must be positive")
+
+        self.speed_kmh = speed_kmh
+        self.capacity = capacity
+        self.batch_radius = batch_radius
+        self.city_size = city_size
+        self.restaurant = (city_size / 2, city_size / 2)
+        self.start_time = start_time
+
+        self.couriers = [Courier(i, *self.restaurant) for i in range(num_couriers)]
+        self.idle_index = GridIndex(cell_size, city_size)
+        for courier in self.couriers:
+            self.idle_index.insert(courier, courier.x, courier.y)
+
+        self.ready: deque = deque()
+        self.ready_index = GridIndex(cell_size, city_size)
+        self.ready_rank: Dict[Order, int] = {}
+        self.ready_sequence = 0
+        self.points: Dict[str, Tuple[float, float]] = {}
+
+    def point(self, order: Order) -> Tuple[float, float]:
+        address = order.address
+        point = self.points.get(address)
+        if point is None:
+            point = self.points[address] = address_point(address, self.city_size)
+        return point
+
+    def travel_minutes(self, start: Tuple[float, float], end: Tuple[float, float]) -> float:
+        return math.hypot(end[0] - start[0], end[1] - start[1]) * DETOUR_FACTOR / self.speed_kmh * 60
+
+    def order_ready(self, order: Order):
+        self.ready_rank[order] = self.ready_sequence
+        self.ready_sequence += 1
+        self.ready.append(order)
+        self.ready_index.insert(order, *self.point(order))
+
+    def dispatch(self, current_time: datetime) -> List[Courier]:
+        """Starts trips while orders and idle couriers are both waiting; returns the couriers sent out"""
+        started = []
+        while self.ready_rank and len(self.idle_index):
+            head = self.ready.popleft()
+            if head not in self.ready_rank:
+                continue
+
+            courier = self.idle_index.nearest(*self.restaurant)
+            trip = [head] + self._nearby(head, self.capacity - 1)
+            for order in trip:
+                self.ready_index.remove(order)
+                del self.ready_rank[order]
+
+            self._start_trip(courier, trip, current_time)
+            started.append(courier)
+        return started
+
+    def _nearby(self, head: Order, limit: int) -> List[Order]:
+        if limit <= 0 or self.batch_radius <= 0:
+            return []
+        candidates = [order for order in self.ready_index.within(*self.point(head), self.batch_radius)
+                      if order is not head]
+        candidates.sort(key=self.ready_rank.__getitem__)
+        return candidates[:limit]
+
+    def _start_trip(self, courier: Courier, orders: List[Order], current_time: datetime):
+        self.idle_index.remove(courier)
+        position = self.restaurant
+        pickup_time = current_time + timedelta(minutes=self.travel_minutes((courier.x, courier.y), position))
+        for order in orders:
+            order.pickup_time = pickup_time
+
+        minutes = 0.0
+        remaining = list(orders)
+        while remaining:
+            order = min(remaining, key=lambda candidate: self.travel_minutes(position, self.point(candidate)))
+            remaining.remove(order)
+            minutes += self.travel_minutes(position, self.point(order))
+            position = self.point(order)
+            order.delivered_time = pickup_time + timedelta(minutes=minutes)
+
+        courier.is_busy = True
+        courier.trip = orders
+        courier.trip_start = current_time
+        courier.free_time = pickup_time + timedelta(minutes=minutes)
+        courier.destination = position
+
+    def complete_trip(self, courier: Courier) -> List[Order]:
+        orders = courier.trip
+        for order in orders:
+            order.status = OrderStatus.DELIVERED
+
+        courier.busy_minutes += (courier.free_time - courier.trip_start).total_seconds() / 60
+        courier.trips += 1
+        courier.orders_delivered += len(orders)
+        courier.x, courier.y = courier.destination
+        courier.is_busy = False
+        courier.trip = []
+        courier.trip_start = None
+        self.idle_index.insert(courier, courier.x, courier.y)
+        return orders
+
+    def get_utilization(self, current_time: datetime) -> float:
+        if self.start_time is None:
+            return 0.0
+        elapsed = (current_time - self.start_time).total_seconds() / 60
+        if elapsed <= 0:
+            return 0.0
+        busy = sum(courier.busy_minutes for courier in self.couriers)
+        busy += sum((current_time - courier.trip_start).total_seconds() / 60
+                    for courier in self.couriers if courier.is_busy)
+        return busy / (len(self.couriers) * elapsed)
+
+    def get_stats(self, current_time: datetime) -> Dict[str, Any]:
+        trips = sum(courier.trips for courier in self.couriers)
+        return {
+            "courier_utilization": self.get_utilization(current_time),
+            "avg_trip_orders": sum(courier.orders_delivered for courier in self.couriers) / max(1, trips)
+        }
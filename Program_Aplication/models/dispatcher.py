@@ -1,8 +1,9 @@
-from typing import List, Optional, Tuple
+from typing import Callable, List, Optional, Tuple
 from datetime import datetime
-from models.order import Order
-from models.kitchen import KitchenLine
-from models.buffer import CircularBuffer, BufferOperationResult
+from .._log_levels import DEBUG, INFO
+from .order import Order, OrderStatus
+from .kitchen import KitchenLine
+from .buffer import CircularBuffer, BufferOperationResult
 
 
 class DispatchResult:
@@ -23,39 +24,92 @@ class RejectionResult:
 
 
 class PlacementDispatcher:
-    def __init__(self):
+    def __init__(self, verbose: bool = True, routing_policy=None, event_log=None):
         self.stats = {"direct_to_device": 0, "to_buffer": 0, "rejections": 0}
+        self.verbose = verbose
+        self.routing_policy = routing_policy
+        self.event_log = event_log
 
     def process_incoming_order(self, order: Order, buffer: CircularBuffer,
-                               kitchen_lines: List[KitchenLine]) -> Tuple[bool, Optional[KitchenLine]]:
-        free_kitchen = self._find_first_free_kitchen(kitchen_lines)
+                               kitchen_lines: List[KitchenLine],
+                               current_time: Optional[datetime] = None
+                               ) -> Tuple[bool, Optional[KitchenLine], Optional[Order]]:
+        if self.routing_policy is not None:
+            free_kitchen = self.routing_policy.select(current_time, buffer.count)
+        else:
+            free_kitchen = self._find_first_free_kitchen(kitchen_lines)
 
         if free_kitchen is not None:
-            if free_kitchen.assign_order(order):
-                print(f"  Direct to kitchen {free_kitchen.line_id}")
+            if free_kitchen.assign_order(order, current_time):
+                self.kitchen_acquired(free_kitchen, current_time)
+                if self.verbose:
+                    print(f"  Direct to kitchen {free_kitchen.line_id}")
+                if self.event_log is not None:
+                    self.event_log.emit(DEBUG, current_time, "direct", order, kitchen=free_kitchen.line_id)
                 self.stats["direct_to_device"] += 1
-                return True, free_kitchen
+                return True, free_kitchen, None
 
-        print(f"  No free kitchens! All {len(kitchen_lines)} kitchens are busy.")
-        print(f"  Trying to place in buffer... (currently {buffer.count}/{buffer.capacity} occupied)")
+        if self.verbose:
+            if any(kitchen.is_available() for kitchen in kitchen_lines):
+                print(f"  Routing policy holds the order for a busy kitchen")
+            else:
+                print(f"  No free kitchens! All {len(kitchen_lines)} kitchens are busy.")
+            print(f"  Trying to place in buffer... (currently {buffer.count}/{buffer.capacity} occupied)")
 
         buffer_result = buffer.add_item(order)
 
         if buffer_result.success:
-            print(f"  Placed in buffer at position {buffer_result.insertion_position}")
+            if self.verbose:
+                print(f"  Placed in buffer at position {buffer_result.insertion_position}")
+            if self.event_log is not None:
+                self.event_log.emit(DEBUG, current_time, "buffered", order,
+                                    slot=buffer_result.insertion_position)
             self.stats["to_buffer"] += 1
-            return True, None
+            rejected_order = buffer_result.rejected_order
+            if rejected_order is not None:
+                if self.verbose:
+                    print(f"  Buffer was full, oldest order '{rejected_order.order_id[:8]}' rejected")
+                if self.event_log is not None:
+                    self.event_log.emit(INFO, current_time, "evicted", rejected_order, by=order.order_id)
+                rejected_order.status = OrderStatus.REJECTED
+                self.stats["rejections"] += 1
+            return True, None, rejected_order
+        elif buffer_result.rejected_order is order:
+            if self.verbose:
+                print(f"  {buffer_result.message}, order rejected")
+            if self.event_log is not None:
+                self.event_log.emit(INFO, current_time, "rejected", order)
+            order.status = OrderStatus.REJECTED
+            self.stats["rejections"] += 1
+            return False, None, None
         else:
-            print(f"  Buffer full! Capacity: {buffer.capacity}, Occupied: {buffer.count}")
+            if self.verbose:
+                print(f"  Buffer full! Capacity: {buffer.capacity}, Occupied: {buffer.count}")
             rejection_result = self._handle_buffer_full(order, buffer)
 
             if rejection_result.handled:
-                print(f"  Replaced oldest order '{rejection_result.cancelled_order.order_id[:8]}' with new order")
+                if self.verbose:
+                    print(f"  Replaced oldest order '{rejection_result.cancelled_order.order_id[:8]}' with new order")
+                if self.event_log is not None:
+                    self.event_log.emit(INFO, current_time, "evicted", rejection_result.cancelled_order,
+                                        by=order.order_id)
+                rejection_result.cancelled_order.status = OrderStatus.REJECTED
                 self.stats["rejections"] += 1
-                return True, None
+                return True, None, rejection_result.cancelled_order
             else:
-                print(f"  Order rejected completely - cannot handle buffer full situation")
-                return False, None
+                if self.verbose:
+                    print(f"  Order rejected completely - cannot handle buffer full situation")
+                if self.event_log is not None:
+                    self.event_log.emit(INFO, current_time, "rejected", order)
+                return False, None, None
+
+    def kitchen_acquired(self, kitchen: KitchenLine, current_time: Optional[datetime] = None):
+        if self.routing_policy is not None:
+            self.routing_policy.acquire(kitchen, current_time)
+
+    def kitchen_released(self, kitchen: KitchenLine, current_time: Optional[datetime] = None):
+        if self.routing_policy is not None:
+            self.routing_policy.release(kitchen, current_time)
 
     def _find_first_free_kitchen(self, kitchen_lines: List[KitchenLine]) -> Optional[KitchenLine]:
         for kitchen in kitchen_lines:
@@ -80,39 +134,58 @@ class PlacementDispatcher:
 
 
 class SelectionDispatcher:
-    def __init__(self):
+    def __init__(self, on_dispatch: Optional[Callable[[Order, KitchenLine], None]] = None,
+                 batch_size: int = 1, event_log=None):
         self.stats = {"dispatched_from_buffer": 0, "kitchen_assignments": 0}
+        self.on_dispatch = on_dispatch
+        self.batch_size = batch_size
+        self.event_log = event_log
 
     def process_available_kitchens(self, buffer: CircularBuffer,
-                                   kitchen_lines: List[KitchenLine]) -> List[Order]:
+                                   kitchen_lines: List[KitchenLine],
+                                   current_time: Optional[datetime] = None) -> List[Order]:
         completed_orders = []
+        current_time = current_time or datetime.now()
 
         for kitchen in kitchen_lines:
-            if kitchen.is_busy and kitchen.update_status(datetime.now()):
-                completed_order = kitchen.complete_order()
+            if kitchen.is_busy and kitchen.update_status(current_time):
+                completed_order = kitchen.complete_order(current_time)
                 if completed_order:
                     completed_orders.append(completed_order)
                     self.stats["kitchen_assignments"] += 1
 
         for kitchen in kitchen_lines:
             if kitchen.is_available() and not buffer.is_empty():
-                dispatch_result = self._dispatch_from_buffer(buffer, kitchen)
+                dispatch_result = self._dispatch_from_buffer(buffer, kitchen, current_time)
                 if dispatch_result.dispatched:
                     self.stats["dispatched_from_buffer"] += 1
 
         return completed_orders
 
-    def _dispatch_from_buffer(self, buffer: CircularBuffer,
-                              kitchen: KitchenLine) -> DispatchResult:
+    def _dispatch_from_buffer(self, buffer: CircularBuffer, kitchen: KitchenLine,
+                              current_time: Optional[datetime] = None) -> DispatchResult:
         if buffer.is_empty():
             return DispatchResult(False, error_message="Buffer is empty")
 
         oldest_order = buffer.get_oldest_item()
         if oldest_order is None:
             return DispatchResult(False, error_message="No orders in buffer")
-
-        if kitchen.assign_order(oldest_order):
-            buffer.remove_oldest_item()
+        if not kitchen.is_available():
+            return DispatchResult(False, error_message="Kitchen is busy")
+
+        buffer.remove_oldest_item()
+        batch = [oldest_order]
+        if self.batch_size > 1:
+            batch += buffer.take_compatible(oldest_order, self.batch_size - 1)
+
+        if kitchen.assign_batch(batch, current_time):
+            if self.event_log is not None:
+                for order in batch:
+                    self.event_log.emit(DEBUG, current_time, "dispatched", order,
+                                        kitchen=kitchen.line_id, batch=len(batch))
+            if self.on_dispatch:
+                for order in batch:
+                    self.on_dispatch(order, kitchen)
             return DispatchResult(True, assigned_kitchen=kitchen)
 
         return DispatchResult(False, error_message="Failed to assign order to kitchen")
\ No newline at end of file
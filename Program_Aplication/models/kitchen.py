@@ -1,50 +1,112 @@
+import math
 import random
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import List, Optional
 from .order import Order, OrderStatus
 
 
+SERVICE_LAWS = ("exponential", "erlang-2", "deterministic", "items")
+
+
 class KitchenLine:
-    def __init__(self, line_id: int, mean_service_time: float = 10.0):
+    def __init__(self, line_id: int, mean_service_time: float = 10.0, rng: Optional[random.Random] = None,
+                 service_law: str = "exponential", item_model=None, batch_growth: float = 0.25):
+        if service_law not in SERVICE_LAWS:
+            raise ValueError(f"Unknown service law: {service_law}")
+
         self.line_id = line_id
         self.is_busy = False
         self.current_order: Optional[Order] = None
+        self.batch: List[Order] = []
+        self.batch_growth = batch_growth
+        self.batches_served = 0
+        self.batch_orders_served = 0
         self.start_time: Optional[datetime] = None
+        self.completion_time: Optional[datetime] = None
         self.mean_service_time = mean_service_time
+        self.service_law = service_law
+        self.rng = rng or random
+
+        self.item_model = item_model
+        self.item_scale = 1.0
+        if service_law == "items":
+            if item_model is None:
+                from .service_model import ItemServiceModel
+                self.item_model = ItemServiceModel()
+            self.item_scale = mean_service_time / self.item_model.mean_time()
+
+    def assign_order(self, order: Order, current_time: Optional[datetime] = None) -> bool:
+        return self.assign_batch([order], current_time)
 
-    def assign_order(self, order: Order) -> bool:
-        if self.is_busy:
+    def assign_batch(self, orders: List[Order], current_time: Optional[datetime] = None) -> bool:
+        """
+        Cooks the orders together and completes them at once. The first one draws
+        the service time, and each further order adds batch_growth of it.
+        """
+        if self.is_busy or not orders:
             return False
 
-        self.current_order = order
+        self.current_order = orders[0]
+        self.batch = list(orders)
         self.is_busy = True
-        self.start_time = datetime.now()
-        order.status = OrderStatus.COOKING
-        order.start_cooking_time = self.start_time
+        self.start_time = current_time or datetime.now()
+        for order in orders:
+            order.status = OrderStatus.COOKING
+            order.start_cooking_time = self.start_time
 
-        service_time = random.expovariate(1.0 / self.mean_service_time)
+        service_time = self._draw_service_time(orders[0]) * (1 + self.batch_growth * (len(orders) - 1))
         self.completion_time = self.start_time + timedelta(minutes=service_time)
+        self.batches_served += 1
+        self.batch_orders_served += len(orders)
         return True
 
-    def complete_order(self) -> Optional[Order]:
+    def _draw_service_time(self, order: Order) -> float:
+        if order.service_uniforms is not None:
+            return self._service_time_from(order, *order.service_uniforms)
+        if self.service_law == "exponential":
+            return self.rng.expovariate(1.0 / self.mean_service_time)
+        if self.service_law == "erlang-2":
+            rate = 2.0 / self.mean_service_time
+            return self.rng.expovariate(rate) + self.rng.expovariate(rate)
+        if self.service_law == "items":
+            return self.item_scale * self.item_model.sample(order.items, self.rng.random())
+        return self.mean_service_time
+
+    def _service_time_from(self, order: Order, u1: float, u2: float) -> float:
+        """The same laws by inversion of the uniforms the order drew on arrival"""
+        if self.service_law == "exponential":
+            return -math.log(1.0 - u1) * self.mean_service_time
+        if self.service_law == "erlang-2":
+            return -(math.log(1.0 - u1) + math.log(1.0 - u2)) * self.mean_service_time / 2
+        if self.service_law == "items":
+            return self.item_scale * self.item_model.sample(order.items, u1)
+        return self.mean_service_time
+
+    def complete_order(self, current_time: Optional[datetime] = None) -> Optional[Order]:
+        completed_orders = self.complete_batch(current_time)
+        return completed_orders[0] if completed_orders else None
+
+    def complete_batch(self, current_time: Optional[datetime] = None) -> List[Order]:
         if not self.is_busy or not self.current_order:
-            return None
+            return []
 
-        completed_order = self.current_order
-        completed_order.status = OrderStatus.COMPLETED
-        completed_order.completion_time = datetime.now()
+        completed_orders = self.batch
+        for order in completed_orders:
+            order.status = OrderStatus.COMPLETED
+            order.completion_time = current_time or datetime.now()
 
         self.current_order = None
+        self.batch = []
         self.is_busy = False
         self.start_time = None
         self.completion_time = None
 
-        return completed_order
+        return completed_orders
 
-    def get_remaining_time(self) -> Optional[timedelta]:
+    def get_remaining_time(self, current_time: Optional[datetime] = None) -> Optional[timedelta]:
         if not self.completion_time:
             return None
-        return max(timedelta(0), self.completion_time - datetime.now())
+        return max(timedelta(0), self.completion_time - (current_time or datetime.now()))
 
     def is_available(self) -> bool:
         return not self.is_busy
@@ -1,36 +1,141 @@
+import random
 import uuid
 from datetime import datetime, timedelta
-from enum import Enum
-from typing import Optional
+from enum import Enum, IntEnum
+from typing import List, Optional, Tuple
 
 
 class OrderStatus(Enum):
     PENDING = "pending"
     COOKING = "cooking"
     COMPLETED = "completed"
+    DELIVERED = "delivered"
     CANCELLED = "cancelled"
     REJECTED = "rejected"
 
 
+class OrderPriority(IntEnum):
+    STANDARD = 0
+    EXPRESS = 1
+    VIP = 2
+
+
+def parse_priority_mix(mix) -> List[Tuple[OrderPriority, float]]:
+    """
+    Shares of the priority classes from "express=0.2,vip=0.05" or a dict;
+    whatever is left goes to standard orders.
+    """
+    if isinstance(mix, str):
+        mix = dict(part.split("=") for part in mix.split(",") if part)
+
+    shares = {}
+    for name, share in mix.items():
+        priority = name if isinstance(name, OrderPriority) else OrderPriority[str(name).strip().upper()]
+        shares[priority] = float(share)
+    if any(share < 0 for share in shares.values()) or sum(shares.values()) > 1 + 1e-9:
+        raise ValueError("Priority shares must be non-negative and sum to at most 1")
+
+    shares.setdefault(OrderPriority.STANDARD, max(0.0, 1 - sum(shares.values())))
+    return sorted(shares.items())
+
+
+def _split_mix(seed: int) -> int:
+    mask = (1 << 64) - 1
+    z = (seed + 0x9E3779B97F4A7C15) & mask
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & mask
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & mask
+    return z ^ (z >> 31)
+
+
 class Order:
-    def __init__(self, source_id: int, items: list, address: str):
-        self.order_id = str(uuid.uuid4())
+    """
+    Items and address are built on first access from payload_seed unless they
+    are passed in, so orders that nobody inspects never pay for the strings.
+    The item count and the lead dish come from a SplitMix64 hash of the seed,
+    which is much cheaper than seeding a generator, for model features that
+    need only them.
+    """
+
+    def __init__(self, source_id: int, items: Optional[list] = None, address: Optional[str] = None,
+                 order_time: Optional[datetime] = None,
+                 priority: OrderPriority = OrderPriority.STANDARD,
+                 payload_seed: Optional[int] = None, item_count: Optional[int] = None,
+                 order_id: Optional[str] = None):
+        self.order_id = order_id or str(uuid.uuid4())
         self.source_id = source_id
-        self.order_time = datetime.now()
+        self.priority = priority
+        self.order_time = order_time or datetime.now()
         self.status = OrderStatus.PENDING
-        self.items = items
-        self.address = address
+        self.payload_seed = payload_seed
+        self._items = items
+        self._address = address
+        self._item_count = len(items) if items is not None else item_count
         self.start_cooking_time: Optional[datetime] = None
         self.completion_time: Optional[datetime] = None
+        self.pickup_time: Optional[datetime] = None
+        self.delivered_time: Optional[datetime] = None
+        self.timeout_event = None
+        self.service_uniforms: Optional[tuple] = None
+
+    @property
+    def item_count(self) -> int:
+        if self._item_count is None:
+            if self.payload_seed is None:
+                self._item_count = random.randint(1, 3)
+            else:
+                self._item_count = 1 + _split_mix(self.payload_seed) % 3
+        return self._item_count
+
+    @property
+    def dish(self) -> str:
+        """The lead item, which decides what the order can be batch-cooked with"""
+        if self._items is not None:
+            return self._items[0] if self._items else ""
+        if self.payload_seed is None:
+            self._materialize_payload()
+            return self.dish
+        return f"Item_{1 + (_split_mix(self.payload_seed) >> 32) % 10}"
+
+    @property
+    def items(self) -> list:
+        if self._items is None:
+            self._materialize_payload()
+        return self._items
+
+    @items.setter
+    def items(self, items: list):
+        self._items = items
+        self._item_count = len(items)
+
+    @property
+    def address(self) -> str:
+        if self._address is None:
+            self._materialize_payload()
+        return self._address
+
+    @address.setter
+    def address(self, address: str):
+        self._address = address
+
+    def _materialize_payload(self):
+        payload = random.Random(self.payload_seed)
+        if self._items is None and self.payload_seed is None:
+            self._items = [f"Item_{payload.randint(1, 10)}" for _ in range(self.item_count)]
+        elif self._items is None:
+            self._items = [self.dish] + [f"Item_{payload.randint(1, 10)}" for _ in range(self.item_count - 1)]
+        if self._address is None:
+            self._address = f"Address_{payload.randint(1, 100)}"
 
-    def get_waiting_time(self) -> timedelta:
+    def get_waiting_time(self, current_time: Optional[datetime] = None) -> timedelta:
         if self.start_cooking_time:
             return self.start_cooking_time - self.order_time
-        return datetime.now() - self.order_time
+        return (current_time or datetime.now()) - self.order_time
 
-    def is_expired(self, max_wait_minutes: int = 15) -> bool:
-        waiting_time = datetime.now() - self.order_time
+    def is_expired(self, max_wait_minutes: int = 15, current_time: Optional[datetime] = None) -> bool:
+        waiting_time = (current_time or datetime.now()) - self.order_time
         return waiting_time > timedelta(minutes=max_wait_minutes)
 
     def __str__(self):
+        if self.priority:
+            return f"Order {self.order_id[:8]} ({self.priority.name}) from Source {self.source_id}"
         return f"Order {self.order_id[:8]} from Source {self.source_id}"
\ No newline at end of file
@@ -0,0 +1,175 @@
+import heapq
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from .kitchen import KitchenLine
+
+
+class RoutingPolicy:
+    """
+    Device selection discipline backed by a heap of free kitchen lines.
+
+    Lines enter the index on release and are invalidated on acquire through a
+    per-line version counter, so select/acquire/release are O(log k).
+    Subclasses only define the ordering key of a free line.
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self.free_heap: List[Tuple] = []
+        self.versions: Dict[int, int] = {}
+        self.lines: Dict[int, KitchenLine] = {}
+
+    def attach(self, kitchen_lines: List[KitchenLine], current_time: datetime):
+        self.free_heap = []
+        self.versions = {}
+        self.lines = {line.line_id: line for line in kitchen_lines}
+        for line in kitchen_lines:
+            self.versions[line.line_id] = 0
+            if line.is_available():
+                self.release(line, current_time)
+
+    def add_line(self, line: KitchenLine, current_time: datetime):
+        self.lines[line.line_id] = line
+        self.versions[line.line_id] = 0
+        if line.is_available():
+            self.release(line, current_time)
+
+    def free_key(self, line: KitchenLine, current_time: datetime):
+        raise NotImplementedError
+
+    def _valid_free_top(self) -> Optional[KitchenLine]:
+        while self.free_heap:
+            entry = self.free_heap[0]
+            line_id, version = entry[-2], entry[-1]
+            if self.versions[line_id] == version:
+                return self.lines[line_id]
+            heapq.heappop(self.free_heap)
+        return None
+
+    def select(self, current_time: datetime, waiting: int = 0) -> Optional[KitchenLine]:
+        return self._valid_free_top()
+
+    def acquire(self, line: KitchenLine, current_time: datetime):
+        self.versions[line.line_id] += 1
+
+    def release(self, line: KitchenLine, current_time: datetime):
+        self.versions[line.line_id] += 1
+        heapq.heappush(self.free_heap, (self.free_key(line, current_time), line.line_id,
+                                        self.versions[line.line_id]))
+
+
+class FirstFreePolicy(RoutingPolicy):
+    """Д2П2: the free line with the lowest number"""
+
+    name = "first-free"
+
+    def free_key(self, line: KitchenLine, current_time: datetime):
+        return line.line_id
+
+
+class FastestFreePolicy(RoutingPolicy):
+    """The free line with the smallest mean service time"""
+
+    name = "fastest-free"
+
+    def free_key(self, line: KitchenLine, current_time: datetime):
+        return line.mean_service_time
+
+
+class LeastRecentlyUsedPolicy(RoutingPolicy):
+    """The free line that has been idle for the longest time"""
+
+    name = "least-recently-used"
+
+    def free_key(self, line: KitchenLine, current_time: datetime):
+        return current_time
+
+
+class ShortestExpectedCompletionPolicy(FastestFreePolicy):
+    """
+    The line, free or busy, expected to finish the new order first.
+    A busy line is expected to finish its current order one mean service time
+    after it started it (never earlier than now) and the new one a mean service
+    time later; the sampled completion time is not looked at. Busy lines are
+    kept in a heap by that expected completion of the new order, so lines of
+    different speeds compare correctly. A line past its expected finish would
+    finish the new order one mean from now whatever it started, so such
+    overdue lines move to a second heap keyed by their mean; time only moves
+    forward, so they never move back. When a busy line wins and nobody is
+    waiting in the buffer yet, the order goes to the buffer and waits for it
+    instead of taking a slower free line.
+    """
+
+    name = "shortest-expected-completion"
+
+    def __init__(self):
+        super().__init__()
+        self.busy_heap: List[Tuple] = []
+        self.overdue_heap: List[Tuple] = []
+
+    def attach(self, kitchen_lines: List[KitchenLine], current_time: datetime):
+        self.busy_heap = []
+        self.overdue_heap = []
+        super().attach(kitchen_lines, current_time)
+
+    def _busy_minutes(self, current_time: datetime) -> Optional[float]:
+        """Minutes until the first busy line is expected to finish the new order, or None"""
+        busy_heap = self.busy_heap
+        while busy_heap:
+            new_order_completion, line_id, version = busy_heap[0]
+            if self.versions[line_id] != version:
+                heapq.heappop(busy_heap)
+                continue
+            mean = self.lines[line_id].mean_service_time
+            minutes = (new_order_completion - current_time).total_seconds() / 60
+            if minutes > mean:
+                break
+            heapq.heappop(busy_heap)
+            heapq.heappush(self.overdue_heap, (mean, line_id, version))
+
+        overdue_heap = self.overdue_heap
+        while overdue_heap and self.versions[overdue_heap[0][1]] != overdue_heap[0][2]:
+            heapq.heappop(overdue_heap)
+
+        candidates = []
+        if busy_heap:
+            candidates.append((busy_heap[0][0] - current_time).total_seconds() / 60)
+        if overdue_heap:
+            candidates.append(overdue_heap[0][0])
+        return min(candidates) if candidates else None
+
+    def select(self, current_time: datetime, waiting: int = 0) -> Optional[KitchenLine]:
+        free_line = self._valid_free_top()
+        if free_line is None or waiting:
+            return free_line
+
+        busy_minutes = self._busy_minutes(current_time)
+        if busy_minutes is None:
+            return free_line
+        return free_line if free_line.mean_service_time <= busy_minutes else None
+
+    def acquire(self, line: KitchenLine, current_time: datetime):
+        super().acquire(line, current_time)
+        expected_completion = current_time + timedelta(minutes=line.mean_service_time)
+        new_order_completion = expected_completion + timedelta(minutes=line.mean_service_time)
+        heapq.heappush(self.busy_heap, (new_order_completion, line.line_id, self.versions[line.line_id]))
+
+
+ROUTING_POLICIES = {
+    policy.name: policy for policy in (
+        FirstFreePolicy, FastestFreePolicy, LeastRecentlyUsedPolicy, ShortestExpectedCompletionPolicy
+    )
+}
+
+
+def make_routing_policy(policy) -> RoutingPolicy:
+    """Builds a policy from its registered name; policy objects are returned as is"""
+    if policy is None:
+        policy = FirstFreePolicy.name
+    if isinstance(policy, str):
+        if policy not in ROUTING_POLICIES:
+            raise ValueError(f"Unknown routing policy: {policy}")
+        return ROUTING_POLICIES[policy]()
+    return policy
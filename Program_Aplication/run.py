@@ -1,9 +1,11 @@
 import sys
 import os
+from datetime import timedelta
 
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+if not __package__:
+    sys.path[0] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-from simulation.simulator import SpecialEventSimulator, SimulationMode
+from Program_Aplication.simulation.simulator import SpecialEventSimulator, SimulationMode
 
 
 def main():
@@ -28,9 +30,10 @@ def main():
         print("5. Generate final report")
         print("6. Calculate required iterations")
         print("7. Demo scenario (buffer usage)")
-        print("8. Exit")
+        print("8. Result graphs (OР2)")
+        print("9. Exit")
 
-        choice = input("\nSelect option (1-8): ").strip()
+        choice = input("\nSelect option (1-9): ").strip()
 
         if choice == "1":
             run_step_by_step(simulator)
@@ -54,6 +57,9 @@ def main():
             run_demo_scenario()
 
         elif choice == "8":
+            generate_graphs(simulator)
+
+        elif choice == "9":
             print("Thank you for using the Restaurant SMO Simulator!")
             print("IEEE Std 610.12-1990 compliant - Special Events Method")
             break
@@ -63,9 +69,14 @@ def main():
 
 
 def run_step_by_step(simulator):
+    from Program_Aplication.display.console_display import ConsoleDisplay
+    from Program_Aplication.simulation.checkpoints import ReverseStepper
+
+    display = ConsoleDisplay()
+    stepper = ReverseStepper(simulator)
     print("\nSTEP-BY-STEP MODE (Special Events Method)")
     print("Each step processes one special event")
-    print("Press Enter to continue, 'q' to quit")
+    display.display_help()
 
     step_count = 0
     max_steps = input("Enter maximum number of steps (default 20): ").strip()
@@ -77,7 +88,7 @@ def run_step_by_step(simulator):
 
     while step_count < max_steps:
         step_count += 1
-        if not simulator.run_step():
+        if not stepper.step():
             print("No more events in calendar")
             break
 
@@ -85,11 +96,105 @@ def run_step_by_step(simulator):
             print(f"\nStep limit reached ({max_steps} steps)")
             break
 
-        user_input = input("\nPress Enter for next event or 'q' to quit: ")
-        if user_input.lower() == 'q':
+        if not inspect_step(stepper, display):
             break
 
 
+def inspect_step(stepper, display) -> bool:
+    """Handles inspection keys until Enter (next step, True) or 'q' (False)"""
+    simulator = stepper.simulator
+    while True:
+        user_input = input("\n[Enter] next event, [b] back, [s] statistics, [c] calendar, [w] waveform, "
+                           "[u] run until, [q] quit: ")
+        key = user_input.strip().lower()
+        if key == '':
+            return True
+        if key == 'q':
+            return False
+        if key == 's':
+            display.display_detailed_statistics(simulator.stats_collector.get_current_stats(),
+                                                simulator.calculate_system_load())
+        elif key == 'c':
+            display.display_event_calendar(simulator.event_calendar.get_upcoming_events(5))
+        elif key == 'w':
+            show_waveform(simulator, display)
+        elif key == 'b':
+            step_back(stepper)
+        elif key == 'u':
+            run_to_breakpoint(stepper)
+        else:
+            print("Unknown key")
+
+
+def step_back(stepper):
+    simulator = stepper.simulator
+    steps = input("Steps back (Enter = 1): ").strip()
+    try:
+        steps = int(steps) if steps else 1
+    except ValueError:
+        steps = 0
+    if steps < 1:
+        print("Invalid number of steps")
+        return
+
+    wanted = simulator.step_count - steps
+    reached = stepper.back(steps)
+    if reached > wanted:
+        print(f"Rewound to step {reached}, the earliest step still kept")
+    else:
+        print(f"Rewound to step {reached}")
+    simulator.display_current_state()
+
+
+def run_to_breakpoint(stepper):
+    from Program_Aplication.simulation.breakpoints import parse_breakpoint, parse_time_of_day
+
+    simulator = stepper.simulator
+    text = input("Stop at (full | reject | idle [LINE] | wait MIN | events N | time HH:MM), "
+                 "several separated by ',': ")
+    until = None
+    breakpoints = []
+    try:
+        for part in filter(None, (part.strip() for part in text.split(","))):
+            if part.lower().startswith("time "):
+                until = parse_time_of_day(part[5:].strip(), simulator.current_time)
+            else:
+                breakpoints.append(parse_breakpoint(part))
+        if until is None and not breakpoints:
+            print("No breakpoint given")
+            return
+        steps_before = simulator.step_count
+        reason = stepper.run_until(until, breakpoints)
+    except ValueError as e:
+        print(f"Invalid breakpoint: {e}")
+        return
+
+    print(f"\nStopped after {simulator.step_count - steps_before} events: {reason or 'no more events'}")
+    simulator.display_current_state()
+
+
+def show_waveform(simulator, display):
+    history = simulator.event_history
+    if history is None:
+        print("Event history is off for this simulator")
+        return
+
+    window = input("Time window in minutes from the start 'FROM TO' (Enter = last 10 events): ").split()
+    try:
+        bounds = [simulator.start_time + timedelta(minutes=float(value)) for value in window[:2]]
+    except ValueError:
+        print("Invalid window, showing the last 10 events")
+        bounds = []
+
+    if bounds:
+        display.display_waveform_diagram(history, start=bounds[0], end=bounds[1] if len(bounds) > 1 else None)
+    else:
+        display.display_waveform_diagram(history)
+    if history.total_recorded > len(history):
+        oldest = (history.oldest_time() - simulator.start_time).total_seconds() / 60
+        print(f"History keeps the last {history.capacity} events, from minute {oldest:.1f}")
+
+
 def run_automatic_mode(simulator):
     print("\nAUTOMATIC MODE WITH PRECISION CONTROL")
 
@@ -170,7 +275,7 @@ def configure_parameters(simulator):
         if service_time:
             simulator.mean_service_time = float(service_time)
 
-        from simulation.simulator import SpecialEventSimulator
+        from Program_Aplication.simulation.simulator import SpecialEventSimulator
         new_simulator = SpecialEventSimulator(
             num_sources=simulator.num_sources,
             num_kitchens=simulator.num_kitchens,
@@ -216,6 +321,37 @@ def generate_final_report(simulator):
         print("   - Good balance between resources and demand")
 
 
+def generate_graphs(simulator):
+    print("\nRESULT GRAPHS (OР2)")
+
+    from Program_Aplication.display.report_generator import ReportGenerator
+
+    results_path = input("Results file (JSON lines, Enter = current simulation): ").strip()
+    output_dir = input("Output directory (default 'reports'): ").strip() or "reports"
+    image_format = input("Image format png/svg (default png): ").strip().lower() or "png"
+
+    try:
+        generator = ReportGenerator(output_dir=output_dir, image_format=image_format)
+        if results_path:
+            paths = generator.render_parameter_report(ReportGenerator.load_results(results_path))
+        else:
+            paths = generator.render_history_report(simulator.get_results(include_history=True))
+    except (OSError, ValueError) as e:
+        print(f"Cannot generate graphs: {e}")
+        return
+    except ImportError:
+        print("Plotting requires matplotlib (pip install matplotlib)")
+        return
+
+    if not paths:
+        print("Nothing to plot yet: run the simulation or pass results with varying parameters")
+        return
+
+    print(f"Saved {len(paths)} graphs:")
+    for path in paths:
+        print(f"  {path}")
+
+
 def calculate_precision(simulator):
     print("\nPRECISION CALCULATION")
     current_stats = simulator.stats_collector.get_current_stats()
@@ -245,7 +381,7 @@ def run_demo_scenario():
     print("\nDEMO SCENARIO: Testing Buffer Usage and Rejections")
     print("=" * 60)
 
-    from simulation.demo_simulator import DemoSimulator
+    from Program_Aplication.simulation.demo_simulator import DemoSimulator
     demo_simulator = DemoSimulator()
 
     print("Demo parameters:")
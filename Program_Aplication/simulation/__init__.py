@@ -1,10 +1,37 @@
-from .simulator import SpecialEventSimulator, SimulationMode
-from .event_calendar import EventCalendar, Event, EventType
+from .._lazy import lazy_exports
 
-__all__ = [
-    'SpecialEventSimulator',
-    'SimulationMode',
-    'EventCalendar',
-    'Event',
-    'EventType'
-]
\ No newline at end of file
+__getattr__, __dir__, __all__ = lazy_exports(__name__, {
+    'SpecialEventSimulator': '.simulator',
+    'SimulationMode': '.simulator',
+    'EventCalendar': '.event_calendar',
+    'Event': '.event_calendar',
+    'EventType': '.event_calendar',
+    'run_simulation': '.runner',
+    'run_replications': '.runner',
+    'run_antithetic_replications': '.runner',
+    'run_sweep': '.runner',
+    'summarize_replications': '.runner',
+    'ResultCache': '.result_cache',
+    'MetricsExporter': '.metrics_exporter',
+    'EventLog': '.event_log',
+    'EventHistory': '.event_history',
+    'BufferFull': '.breakpoints',
+    'Rejection': '.breakpoints',
+    'KitchenIdle': '.breakpoints',
+    'WaitAbove': '.breakpoints',
+    'parse_breakpoint': '.breakpoints',
+    'ReverseStepper': '.checkpoints',
+    'SweepQueue': '.work_queue',
+    'open_trace': '.trace_arrivals',
+    'convert_trace': '.trace_arrivals',
+    'RestartEstimator': '.rare_event',
+    'estimate_rejection_probability': '.rare_event',
+    'CapacityPlanner': '.capacity_planner',
+    'plan_capacity': '.capacity_planner',
+    'SensitivityAnalysis': '.sensitivity',
+    'sensitivity_report': '.sensitivity',
+    'DifferentialHarness': '.differential',
+    'verify_engine': '.differential',
+    'run_fast': '.fast_engine',
+    'run_queue_sweep': '.work_queue'
+})
\ No newline at end of file
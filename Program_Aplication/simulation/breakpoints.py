@@ -0,0 +1,173 @@
+from datetime import datetime, timedelta
+from typing import Callable
+
+
+class Breakpoint:
+    """
+    Stopping condition of run_until, checked after every event. arm() is
+    called once before the run. Conditions on a state stop when the state is
+    entered, not while it lasts, so a run can go on past a stop.
+    """
+
+    name = "breakpoint"
+
+    def arm(self, simulator):
+        pass
+
+    def hit(self, simulator) -> bool:
+        raise NotImplementedError
+
+    def describe(self, simulator) -> str:
+        return self.name
+
+
+class BufferFull(Breakpoint):
+    name = "buffer full"
+
+    def arm(self, simulator):
+        self.was_full = simulator.buffer.is_full()
+
+    def hit(self, simulator) -> bool:
+        full = simulator.buffer.is_full()
+        entered = full and not self.was_full
+        self.was_full = full
+        return entered
+
+
+class Rejection(Breakpoint):
+    """An order rejected or pushed out of the buffer by the last event"""
+
+    name = "rejection"
+
+    def arm(self, simulator):
+        self.rejected = simulator.stats_collector.rejected_orders
+
+    def hit(self, simulator) -> bool:
+        rejected = simulator.stats_collector.rejected_orders
+        new = rejected > self.rejected
+        self.rejected = rejected
+        return new
+
+
+class KitchenIdle(Breakpoint):
+    """The kitchen line, or any line when line_id is None, becomes free"""
+
+    def __init__(self, line_id=None):
+        self.line_id = line_id
+        self.name = "kitchen idle" if line_id is None else f"kitchen {line_id} idle"
+
+    def _busy(self, simulator):
+        return [kitchen.is_busy for kitchen in simulator.kitchen_lines
+                if self.line_id is None or kitchen.line_id == self.line_id]
+
+    def arm(self, simulator):
+        if self.line_id is not None and not 0 <= self.line_id < len(simulator.kitchen_lines):
+            raise ValueError(f"No kitchen line {self.line_id}")
+        self.busy = self._busy(simulator)
+
+    def hit(self, simulator) -> bool:
+        busy = self._busy(simulator)
+        freed = any(was and not now for was, now in zip(self.busy, busy))
+        self.busy = busy
+        return freed
+
+
+class WaitAbove(Breakpoint):
+    """
+    An order has waited longer than `minutes`: still in the buffer, or taken
+    to a line by the last event. Every buffered order is looked at, since with
+    priority classes the next order to serve is not the one waiting longest;
+    the scan is over the buffer slots, like finding the oldest order, and
+    only while the buffer is not empty. Each order stops a run once: orders
+    already over the limit when the run starts, and orders reported before,
+    are not reported again.
+    """
+
+    def __init__(self, minutes: float):
+        self.limit = timedelta(minutes=minutes)
+        self.name = f"wait above {minutes:g} min"
+        self.order = None
+        self.others = 0
+        self.reported = set()
+
+    def _waiting_too_long(self, simulator) -> list:
+        now = simulator.current_time
+        late = []
+        for kitchen in simulator.kitchen_lines:
+            if kitchen.is_busy and kitchen.start_time == now:
+                late.extend(order for order in kitchen.batch if now - order.order_time > self.limit)
+        if simulator.buffer.count:
+            late.extend(order for order in simulator.buffer.buffer
+                        if order is not None and now - order.order_time > self.limit)
+        return late
+
+    def arm(self, simulator):
+        self.reported.update(order.order_id for order in self._waiting_too_long(simulator))
+
+    def hit(self, simulator) -> bool:
+        late = [order for order in self._waiting_too_long(simulator) if order.order_id not in self.reported]
+        if not late:
+            return False
+        self.order = min(late, key=lambda order: order.order_time)
+        self.others = len(late) - 1
+        self.reported.add(self.order.order_id)
+        return True
+
+    def describe(self, simulator) -> str:
+        waited = (simulator.current_time - self.order.order_time).total_seconds() / 60
+        others = f", {self.others} more over the limit" if self.others else ""
+        return f"{self.name}: order {self.order.order_id[:8]} waited {waited:.1f} min{others}"
+
+
+class EventCount(Breakpoint):
+    def __init__(self, events: int):
+        self.events = events
+        self.name = f"{events} events"
+
+    def arm(self, simulator):
+        self.stop_step = simulator.step_count + self.events
+
+    def hit(self, simulator) -> bool:
+        return simulator.step_count >= self.stop_step
+
+
+class Condition(Breakpoint):
+    """Any predicate of the simulator"""
+
+    def __init__(self, predicate: Callable, name: str = "condition"):
+        self.predicate = predicate
+        self.name = name
+
+    def hit(self, simulator) -> bool:
+        return bool(self.predicate(simulator))
+
+
+def parse_time_of_day(text: str, current_time: datetime) -> datetime:
+    """HH:MM[:SS] after current_time: today, or tomorrow when already past"""
+    parts = [int(part) for part in text.split(":")]
+    if len(parts) not in (2, 3):
+        raise ValueError(f"Expected HH:MM or HH:MM:SS, got {text}")
+    target = current_time.replace(hour=parts[0], minute=parts[1], second=parts[2] if len(parts) == 3 else 0,
+                                  microsecond=0)
+    if target <= current_time:
+        target += timedelta(days=1)
+    return target
+
+
+def parse_breakpoint(text: str) -> Breakpoint:
+    """full | reject | idle [LINE] | wait MINUTES | events N"""
+    words = text.split()
+    if not words:
+        raise ValueError("Empty breakpoint")
+    kind, arguments = words[0].lower(), words[1:]
+    if kind == "full":
+        return BufferFull()
+    if kind in ("reject", "rejection"):
+        return Rejection()
+    if kind == "idle":
+        return KitchenIdle(int(arguments[0]) if arguments else None)
+    if kind == "wait" and len(arguments) == 1:
+        return WaitAbove(float(arguments[0]))
+    if kind == "events" and len(arguments) == 1:
+        return EventCount(int(arguments[0]))
+    raise ValueError(f"Unknown breakpoint: {text}")
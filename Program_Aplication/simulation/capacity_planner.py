@@ -0,0 +1,251 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .runner import run_headless
+from .simulator import SpecialEventSimulator
+from ..statistics.confidence import sample_variance
+from ..statistics.quantile_sketch import LogHistogram
+
+DEFAULT_ORDERS = 5000
+DEFAULT_WARMUP = 1000
+CONSTRAINTS = ("rejection_rate", "wait_p95")
+
+
+def _replicate(task: Tuple[Dict[str, Any], int, int, int]) -> Tuple[float, float, int]:
+    """P_reject and P95 wait of the orders arriving after the warm-up"""
+    params, seed, warmup_orders, orders = task
+    simulator = SpecialEventSimulator(seed=seed, verbose=False, keep_history=False,
+                                      start_time=datetime(2000, 1, 1), **params)
+    collector = simulator.stats_collector
+    run_headless(simulator, warmup_orders)
+    total, rejected = collector.total_orders, collector.rejected_orders
+    collector.wait_sketch = LogHistogram()
+    run_headless(simulator, warmup_orders + orders)
+    rejection_rate = (collector.rejected_orders - rejected) / max(1, collector.total_orders - total)
+    return rejection_rate, collector.wait_sketch.quantile(0.95), simulator.step_count
+
+
+class Candidate:
+    def __init__(self, num_kitchens: int, buffer_capacity: int, cost: float):
+        self.num_kitchens = num_kitchens
+        self.buffer_capacity = buffer_capacity
+        self.cost = cost
+        self.samples: Dict[str, List[float]] = {name: [] for name in CONSTRAINTS}
+        self.variances: Dict[str, float] = {}
+        self.verdicts: Dict[str, Optional[str]] = {name: None for name in CONSTRAINTS}
+        self.orders = 0
+        self.events = 0
+        self.status = "active"
+
+    @property
+    def replications(self) -> int:
+        return len(self.samples["rejection_rate"])
+
+    def summary(self) -> Dict[str, Any]:
+        summary = {"num_kitchens": self.num_kitchens, "buffer_capacity": self.buffer_capacity,
+                   "cost": self.cost, "status": self.status, "replications": self.replications,
+                   "events": self.events}
+        for name in CONSTRAINTS:
+            values = self.samples[name]
+            summary[name] = sum(values) / len(values) if values else None
+            summary[f"{name}_verdict"] = self.verdicts[name]
+        return summary
+
+    def __str__(self):
+        return f"{self.num_kitchens} kitchens, buffer {self.buffer_capacity}"
+
+
+class CapacityPlanner:
+    """
+    Cheapest number of kitchens and buffer size meeting an SLA:
+    P_reject <= max_reject and the P95 buffer wait <= max_wait_p95.
+
+    A fully sequential feasibility check (Batur and Kim) over the integer
+    grid. Each stage samples the `width` cheapest candidates still in play:
+    first min_replications runs, then one more per stage. Replication r of
+    every candidate uses seed + r, so candidates are compared on common random
+    numbers, and each replication measures only the orders arriving after
+    warmup_orders. Every constraint of a candidate is a sequential test with
+    a triangular continuation region: with S^2 the variance of the first
+    min_replications values, the sum of (value - limit) over r replications
+    is compared with +-R(r) = max(0, h^2 S^2 / (2 eps) - eps r / 2). Below -R
+    the constraint is met, above +R it is violated, and since R reaches zero
+    the test ends by r = h^2 S^2 / eps^2. eps is the indifference zone,
+    `tolerance` times the limit. A candidate is feasible once both
+    constraints are met and infeasible once either is violated; either way it
+    gets no more runs. Candidates that cost at least as much as a feasible
+    one can no longer be chosen and are dropped. With monotone=True an
+    infeasible verdict also carries over to the configurations it dominates:
+    fewer kitchens and no more buffer for P_reject, fewer kitchens and no less
+    buffer for the P95 wait. Candidates still undecided at max_replications
+    are reported as such and never chosen.
+
+    h^2 is chosen so each verdict is right with probability `confidence`
+    whenever the true value is outside limit +- eps, however many looks the
+    test takes; values within the zone may be judged either way. The joint
+    confidence of the choice is the Bonferroni bound over the verdicts it
+    rests on. Runs of one stage go to worker processes when workers > 1.
+    """
+
+    def __init__(self, params: Dict[str, Any], max_reject: float, max_wait_p95: float,
+                 kitchens: Iterable[int] = range(1, 9), buffers: Iterable[int] = range(1, 21),
+                 kitchen_cost: float = 10.0, buffer_cost: float = 1.0, orders: int = DEFAULT_ORDERS,
+                 warmup_orders: int = DEFAULT_WARMUP, confidence: float = 0.95, tolerance: float = 0.1,
+                 min_replications: int = 5, max_replications: int = 50,
+                 monotone: bool = True, workers: int = 1, width: Optional[int] = None):
+        if params.get("line_service_times") or params.get("arrival_trace"):
+            raise ValueError("Planning varies the number of identical lines; "
+                             "per-line service times and traces are not supported")
+        if min_replications < 2 or max_replications < min_replications:
+            raise ValueError("Need 2 <= min_replications <= max_replications")
+        if min(buffers) < 1 or min(kitchens) < 1:
+            raise ValueError("Kitchens and buffer sizes must be positive")
+        if not 0.5 < confidence < 1 or tolerance <= 0:
+            raise ValueError("Need 0.5 < confidence < 1 and a positive tolerance")
+        if max_reject <= 0 or max_wait_p95 <= 0:
+            raise ValueError("SLA limits must be positive")
+
+        self.params = {name: value for name, value in params.items()
+                       if name not in ("num_kitchens", "buffer_capacity")}
+        self.limits = {"rejection_rate": max_reject, "wait_p95": max_wait_p95}
+        self.orders = orders
+        self.warmup_orders = warmup_orders
+        self.confidence = confidence
+        self.tolerance = tolerance
+        self.zones = {name: tolerance * limit for name, limit in self.limits.items()}
+        self.h2 = (min_replications - 1) * ((2 * (1 - confidence)) ** (-2 / (min_replications - 1)) - 1)
+        self.min_replications = min_replications
+        self.max_replications = max_replications
+        self.monotone = monotone
+        self.workers = workers
+        self.width = width or max(4, workers)
+        self.candidates = sorted((Candidate(k, b, k * kitchen_cost + b * buffer_cost)
+                                  for k in kitchens for b in buffers),
+                                 key=lambda candidate: (candidate.cost, candidate.num_kitchens))
+
+    def _first_stage_variance(self, name: str, values: List[float]) -> float:
+        variance = sample_variance(values)
+        if name == "rejection_rate":
+            # Rejections are rare in good candidates, and a first stage without any
+            # would end the test at once: no less than the binomial variance at the limit
+            limit = self.limits[name]
+            variance = max(variance, limit * (1 - limit) / self.orders)
+        return variance
+
+    def _decide(self, candidate: Candidate):
+        """Verdicts of the undecided constraints after the latest replication"""
+        r = candidate.replications
+        for name in CONSTRAINTS:
+            if candidate.verdicts[name] is not None:
+                continue
+            values = candidate.samples[name]
+            if name not in candidate.variances:
+                candidate.variances[name] = self._first_stage_variance(name, values)
+            zone = self.zones[name]
+            region = max(0.0, self.h2 * candidate.variances[name] / (2 * zone) - zone * r / 2)
+            excess = sum(values) - r * self.limits[name]
+            if excess <= -region:
+                candidate.verdicts[name] = "met"
+            elif excess >= region:
+                candidate.verdicts[name] = "violated"
+
+    def _implied_infeasible(self, failed: Candidate, metric: str):
+        for candidate in self.candidates:
+            if candidate.status != "active" or candidate.num_kitchens > failed.num_kitchens:
+                continue
+            if metric == "rejection_rate" and candidate.buffer_capacity <= failed.buffer_capacity or \
+                    metric == "wait_p95" and candidate.buffer_capacity >= failed.buffer_capacity:
+                candidate.status = "infeasible (implied)"
+
+    def _drop_costlier(self, cost: float):
+        for candidate in self.candidates:
+            if candidate.status == "active" and candidate.cost >= cost:
+                candidate.status = "dropped"
+
+    def plan(self, seed: int = 0) -> Dict[str, Any]:
+        executor = None
+        if self.workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            executor = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            self._run_stages(seed, executor.map if executor is not None else map)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return self.result()
+
+    def _run_stages(self, seed: int, map_function):
+        while True:
+            active = [candidate for candidate in self.candidates if candidate.status == "active"][:self.width]
+            if not active:
+                return
+
+            tasks, owners = [], []
+            for candidate in active:
+                target = max(self.min_replications, candidate.replications + 1)
+                for replication in range(candidate.replications, target):
+                    params = dict(self.params, num_kitchens=candidate.num_kitchens,
+                                  buffer_capacity=candidate.buffer_capacity)
+                    tasks.append((params, seed + replication, self.warmup_orders, self.orders))
+                    owners.append(candidate)
+
+            for candidate, (rejection_rate, wait_p95, events) in zip(owners, map_function(_replicate, tasks)):
+                candidate.samples["rejection_rate"].append(rejection_rate)
+                candidate.samples["wait_p95"].append(wait_p95)
+                candidate.orders += self.orders
+                candidate.events += events
+
+            for candidate in active:
+                if candidate.status != "active":
+                    continue
+                self._decide(candidate)
+                violated = [name for name in CONSTRAINTS if candidate.verdicts[name] == "violated"]
+                if violated:
+                    candidate.status = "infeasible"
+                    if self.monotone:
+                        for metric in violated:
+                            self._implied_infeasible(candidate, metric)
+                elif all(candidate.verdicts[name] == "met" for name in CONSTRAINTS):
+                    candidate.status = "feasible"
+                    self._drop_costlier(candidate.cost)
+                elif candidate.replications >= self.max_replications:
+                    candidate.status = "undecided"
+
+    def result(self) -> Dict[str, Any]:
+        feasible = [candidate for candidate in self.candidates if candidate.status == "feasible"]
+        chosen = min(feasible, key=lambda candidate: (candidate.cost, candidate.num_kitchens), default=None)
+        sampled = [candidate for candidate in self.candidates if candidate.replications]
+
+        result = {
+            "chosen": None,
+            "confidence": self.confidence,
+            "tolerance": self.tolerance,
+            "warmup_orders": self.warmup_orders,
+            "joint_confidence": None,
+            "events": sum(candidate.events for candidate in self.candidates),
+            "replications": sum(candidate.replications for candidate in self.candidates),
+            "candidates_sampled": len(sampled),
+            "undecided_cheaper": [],
+            "candidates": [candidate.summary() for candidate in sampled]
+        }
+        if chosen is None:
+            return result
+
+        cheaper = [candidate for candidate in sampled if candidate.cost < chosen.cost]
+        result["undecided_cheaper"] = [str(candidate) for candidate in cheaper if candidate.status == "undecided"]
+        # The choice is right if both verdicts of the chosen candidate and the deciding
+        # verdict of every cheaper sampled one are; implied verdicts add nothing
+        decisions = len(CONSTRAINTS) + sum(1 for candidate in cheaper if candidate.status == "infeasible")
+        result["joint_confidence"] = max(0.0, 1 - decisions * (1 - self.confidence))
+
+        chosen_summary = chosen.summary()
+        chosen_summary["params"] = dict(self.params, num_kitchens=chosen.num_kitchens,
+                                        buffer_capacity=chosen.buffer_capacity)
+        result["chosen"] = chosen_summary
+        return result
+
+
+def plan_capacity(params: Dict[str, Any], max_reject: float, max_wait_p95: float,
+                  seed: int = 0, **settings) -> Dict[str, Any]:
+    """Settings go to CapacityPlanner"""
+    return CapacityPlanner(params, max_reject, max_wait_p95, **settings).plan(seed)
@@ -0,0 +1,98 @@
+from collections import deque
+from typing import Deque, Optional, Sequence, Tuple
+
+from .breakpoints import Breakpoint
+from .simulator import SpecialEventSimulator
+
+
+class _CheckpointTaker(Breakpoint):
+    """
+    Never stops a run; takes the stepper's checkpoints on the way and turns the
+    event log back on once the run passes the furthest step already logged
+    """
+
+    def __init__(self, stepper: "ReverseStepper"):
+        self.stepper = stepper
+
+    def hit(self, simulator) -> bool:
+        self.stepper._after_step()
+        return False
+
+
+class ReverseStepper:
+    """
+    Forward and backward stepping of an interactive session.
+
+    Stepping forward through the stepper checkpoints the simulator every
+    `interval` events. Going back restores the latest checkpoint at or before
+    the target step and replays silently up to it; the run is deterministic
+    from a checkpoint (random states, order ids, event order and the position
+    in an arrival trace are all in it), so the replay reproduces the same
+    steps and going back any number of steps re-simulates fewer than
+    `interval` events. Only the last max_checkpoints are kept, so memory is
+    bounded and steps older than the oldest checkpoint are out of reach.
+
+    Events up to the furthest step reached were logged when first run, so
+    the simulator's event log is off while they are replayed, by back() or
+    by stepping forward again after it.
+    """
+
+    def __init__(self, simulator: SpecialEventSimulator, interval: int = 50, max_checkpoints: int = 64):
+        if interval < 1 or max_checkpoints < 1:
+            raise ValueError("Checkpoint interval and count must be positive")
+        self.simulator = simulator
+        self.interval = interval
+        self.checkpoints: Deque[Tuple[int, bytes]] = deque(maxlen=max_checkpoints)
+        self.furthest_step = simulator.step_count
+        self.muted_log = None
+        self._checkpoint()
+
+    def _checkpoint(self):
+        step = self.simulator.step_count
+        if not self.checkpoints or self.checkpoints[-1][0] < step:
+            self.checkpoints.append((step, self.simulator.checkpoint()))
+
+    @property
+    def earliest_step(self) -> int:
+        return self.checkpoints[0][0]
+
+    def _mute_replay(self):
+        # The log is taken off the simulator, not emptied, so checkpoints and
+        # restore() see the same simulator state either way
+        if self.muted_log is None and self.simulator.step_count < self.furthest_step:
+            self.muted_log = self.simulator.event_log
+            self.simulator._set_event_log(None)
+
+    def _after_step(self):
+        step = self.simulator.step_count
+        if step % self.interval == 0:
+            self._checkpoint()
+        if step >= self.furthest_step:
+            self.furthest_step = step
+            if self.muted_log is not None:
+                self.simulator._set_event_log(self.muted_log)
+                self.muted_log = None
+
+    def step(self) -> bool:
+        self._mute_replay()
+        if not self.simulator.run_step():
+            return False
+        self._after_step()
+        return True
+
+    def run_until(self, until=None, breakpoints: Sequence[Breakpoint] = ()) -> Optional[str]:
+        """SpecialEventSimulator.run_until, taking checkpoints on the way"""
+        self._mute_replay()
+        return self.simulator.run_until(until, list(breakpoints) + [_CheckpointTaker(self)])
+
+    def back(self, steps: int = 1) -> int:
+        """Goes back steps events, or to the earliest reachable step; returns the step reached"""
+        target = max(self.earliest_step, self.simulator.step_count - steps)
+        while self.checkpoints[-1][0] > target:
+            self.checkpoints.pop()
+        step, state = self.checkpoints[-1]
+        self.simulator.restore(state)
+        if target > step:
+            self._mute_replay()
+            self.simulator.run_until(target - step)
+        return self.simulator.step_count
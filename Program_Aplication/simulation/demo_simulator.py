@@ -1,11 +1,11 @@
 import random
 from datetime import datetime, timedelta
-from models.order import Order
-from models.kitchen import KitchenLine
-from models.buffer import CircularBuffer
-from models.dispatcher import PlacementDispatcher, SelectionDispatcher
-from simulation.event_calendar import EventCalendar, EventType, Event
-from statistics.stats_collector import StatisticsCollector
+from ..models.order import Order
+from ..models.kitchen import KitchenLine
+from ..models.buffer import CircularBuffer
+from ..models.dispatcher import PlacementDispatcher, SelectionDispatcher
+from .event_calendar import EventCalendar, EventType, Event
+from ..statistics.stats_collector import StatisticsCollector
 
 
 class DemoSimulator:
@@ -21,10 +21,10 @@ class DemoSimulator:
         self.placement_dispatcher = PlacementDispatcher()
         self.selection_dispatcher = SelectionDispatcher()
         self.event_calendar = EventCalendar()
-        self.stats_collector = StatisticsCollector()
 
         self.current_time = datetime.now()
         self.start_time = self.current_time
+        self.stats_collector = StatisticsCollector(self.start_time, self.buffer_capacity)
         self.step_count = 0
         self.total_orders_generated = 0
 
@@ -51,15 +51,15 @@ class DemoSimulator:
     def _handle_order_arrival(self, source_id: int):
         items = [f"Item_{random.randint(1, 10)}" for _ in range(random.randint(1, 3))]
         address = f"Address_{random.randint(1, 100)}"
-        order = Order(source_id, items, address)
+        order = Order(source_id, items, address, self.current_time)
 
         self.total_orders_generated += 1
         self.stats_collector.record_order_arrival(order)
 
         print(f"SPECIAL EVENT: Order arrival - {order}")
 
-        placed, assigned_kitchen = self.placement_dispatcher.process_incoming_order(
-            order, self.buffer, self.kitchen_lines
+        placed, assigned_kitchen, rejected_order = self.placement_dispatcher.process_incoming_order(
+            order, self.buffer, self.kitchen_lines, self.current_time
         )
 
         if placed:
@@ -74,6 +74,10 @@ class DemoSimulator:
             print(f"  ORDER REJECTED - system overloaded!")
             self.stats_collector.record_order_rejected(order)
 
+        if rejected_order is not None:
+            print(f"  OLDEST ORDER REJECTED - {rejected_order}")
+            self.stats_collector.record_order_rejected(rejected_order)
+
         next_arrival = self._generate_next_arrival_time(source_id)
         self._schedule_order_arrival(source_id, next_arrival)
 
@@ -89,13 +93,13 @@ class DemoSimulator:
     def _handle_kitchen_completion(self, kitchen: KitchenLine):
         print(f"SPECIAL EVENT: Kitchen {kitchen.line_id} completion")
 
-        completed_order = kitchen.complete_order()
+        completed_order = kitchen.complete_order(self.current_time)
         if completed_order:
             print(f"  Order completed: {completed_order}")
             self.stats_collector.record_order_completed(completed_order)
 
         completed_orders = self.selection_dispatcher.process_available_kitchens(
-            self.buffer, [kitchen]
+            self.buffer, [kitchen], self.current_time
         )
 
         if kitchen.is_busy:
@@ -132,7 +136,8 @@ class DemoSimulator:
         self.stats_collector.update_system_state(
             self.buffer.count,
             busy_kitchens,
-            self.kitchen_lines
+            self.kitchen_lines,
+            self.current_time
         )
 
         self._display_demo_state()
@@ -145,7 +150,7 @@ class DemoSimulator:
         for kitchen in self.kitchen_lines:
             status = "FREE" if not kitchen.is_busy else "BUSY"
             if kitchen.is_busy:
-                remaining = kitchen.get_remaining_time()
+                remaining = kitchen.get_remaining_time(self.current_time)
                 rem_sec = max(0, remaining.total_seconds()) if remaining else 0
                 print(f"  K{kitchen.line_id}: {status} - {rem_sec:.0f}s remaining")
             else:
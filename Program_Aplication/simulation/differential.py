@@ -0,0 +1,237 @@
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .runner import run_headless
+from .simulator import SpecialEventSimulator
+from ..statistics.confidence import mean_confidence_interval
+
+METRICS = ("rejection_rate", "avg_wait_time", "kitchen_utilization")
+MICROSECOND = timedelta(microseconds=1)
+
+LARGE_CONFIGURATIONS = (
+    {"num_kitchens": 3, "buffer_capacity": 10, "mean_arrival_time": 2.0, "mean_service_time": 6.0},
+    {"num_kitchens": 2, "buffer_capacity": 5, "mean_arrival_time": 1.0, "mean_service_time": 8.0},
+    {"num_sources": 2, "num_kitchens": 4, "buffer_capacity": 20, "mean_arrival_time": 3.0, "mean_service_time": 10.0}
+)
+
+
+class EngineRun:
+    """Outcome of one engine run: final metrics and, when asked for, the event trace"""
+
+    def __init__(self, metrics: Dict[str, float], trace: Optional[List[Tuple]] = None, events: int = 0):
+        self.metrics = metrics
+        self.trace = trace
+        self.events = events
+
+
+class TraceRecorder:
+    """
+    Event log of a simulator kept as a trace in memory: (microseconds since
+    start, event, order number, value). Orders are numbered in arrival order,
+    since their ids are random.
+    """
+
+    def __init__(self):
+        self.trace: List[Tuple] = []
+        self.numbers: Dict[str, int] = {}
+        self.start_time: Optional[datetime] = None
+
+    def attach(self, start_time: datetime, seed: Optional[int] = None):
+        self.start_time = start_time
+
+    def emit(self, level: int, time: datetime, event: str, order, **fields):
+        if order is None:
+            return
+        if event == "arrival":
+            self.numbers[order.order_id] = len(self.numbers)
+        value = fields.get("kitchen", fields.get("slot"))
+        if event == "evicted":
+            value = self.numbers[fields["by"]]
+        self.trace.append(((time - self.start_time) // MICROSECOND, event, self.numbers[order.order_id], value))
+
+
+def run_reference(params: Dict[str, Any], seed: int, max_orders: int, trace: bool = False) -> EngineRun:
+    """The object-based simulator, stopped like a headless run after max_orders arrivals"""
+    recorder = TraceRecorder() if trace else None
+    simulator = SpecialEventSimulator(seed=seed, verbose=False, keep_history=False,
+                                      start_time=datetime(2000, 1, 1), event_log=recorder, **params)
+    run_headless(simulator, max_orders)
+    stats = simulator.stats_collector.get_current_stats()
+    return EngineRun({name: stats[name] for name in METRICS}, recorder.trace if recorder else None,
+                     simulator.step_count)
+
+
+class Mismatch:
+    def __init__(self, params: Dict[str, Any], seed: int, max_orders: int, index: int,
+                 expected: Optional[Tuple], actual: Optional[Tuple]):
+        self.params = params
+        self.seed = seed
+        self.max_orders = max_orders
+        self.index = index
+        self.expected = expected
+        self.actual = actual
+
+    def summary(self) -> Dict[str, Any]:
+        return {"params": self.params, "seed": self.seed, "max_orders": self.max_orders,
+                "index": self.index, "expected": self.expected, "actual": self.actual}
+
+    def __str__(self):
+        return (f"params={self.params} seed={self.seed} max_orders={self.max_orders}: "
+                f"event {self.index} is {self.actual}, the reference has {self.expected}")
+
+
+def small_configuration(rng: random.Random) -> Dict[str, Any]:
+    return {"num_sources": rng.choice((1, 1, 2)),
+            "num_kitchens": rng.randint(1, 4),
+            "buffer_capacity": rng.randint(1, 6),
+            "mean_arrival_time": rng.choice((0.2, 0.5, 1.0, 2.0, 3.0)),
+            "mean_service_time": rng.choice((1.0, 2.0, 5.0, 8.0, 12.0))}
+
+
+class DifferentialHarness:
+    """
+    Checks an optimized engine against the reference simulator.
+
+    An engine is a function (params, seed, max_orders, trace) -> EngineRun
+    that draws its random numbers like the reference with shared streams.
+    check_exact runs random small configurations through both and compares
+    the traces event by event, so any change of semantics shows up: another
+    order evicted under Д10O3, another slot filled under Д1031, another line
+    chosen. A failing case is shrunk to a minimal reproducer: fewer orders,
+    then fewer sources, lines and slots and rounder means, as long as it still
+    fails. check_statistical compares the final metrics of long runs on
+    paired seeds, which also covers engines that consume randomness
+    differently: the metrics agree when the interval of the paired
+    differences contains zero, or the differences are within tolerance.
+    """
+
+    def __init__(self, engine: Optional[Callable[..., EngineRun]] = None,
+                 reference: Callable[..., EngineRun] = run_reference,
+                 confidence: float = 0.99, tolerance: float = 1e-9):
+        if engine is None:
+            from .fast_engine import run_fast
+            engine = run_fast
+        self.engine = engine
+        self.reference = reference
+        self.confidence = confidence
+        self.tolerance = tolerance
+
+    def compare(self, params: Dict[str, Any], seed: int, max_orders: int) -> Optional[Mismatch]:
+        expected = self.reference(params, seed, max_orders, trace=True).trace
+        try:
+            actual = self.engine(params, seed, max_orders, trace=True).trace
+        except Exception as error:
+            return Mismatch(params, seed, max_orders, 0, None, ("error", repr(error)))
+
+        for index, (expected_event, actual_event) in enumerate(zip(expected, actual)):
+            if expected_event != actual_event:
+                return Mismatch(params, seed, max_orders, index, expected_event, actual_event)
+        if len(expected) != len(actual):
+            index = min(len(expected), len(actual))
+            return Mismatch(params, seed, max_orders, index,
+                            expected[index] if index < len(expected) else None,
+                            actual[index] if index < len(actual) else None)
+        return None
+
+    def check_exact(self, cases: int = 200, seed: int = 0, max_orders: Tuple[int, int] = (20, 300),
+                    shrink: bool = True) -> List[Mismatch]:
+        """
+        Minimal reproducers of the failing cases: the shortest one for every kind
+        of divergence (the reference event against the engine's)
+        """
+        rng = random.Random(seed)
+        failures: Dict[Tuple, Mismatch] = {}
+        for case in range(cases):
+            mismatch = self.compare(small_configuration(rng), seed + case, rng.randint(*max_orders))
+            if mismatch is None:
+                continue
+            if shrink:
+                mismatch = self.shrink(mismatch)
+            kind = tuple(event[1] if event else None for event in (mismatch.expected, mismatch.actual))
+            if kind not in failures or mismatch.max_orders < failures[kind].max_orders:
+                failures[kind] = mismatch
+        return list(failures.values())
+
+    def shrink(self, mismatch: Mismatch) -> Mismatch:
+        mismatch = self._shrink_orders(mismatch)
+        changed = True
+        while changed:
+            changed = False
+            for name, value in sorted(mismatch.params.items()):
+                for candidate in self._simpler_values(name, value):
+                    params = dict(mismatch.params, **{name: candidate})
+                    smaller = self.compare(params, mismatch.seed, mismatch.max_orders)
+                    if smaller is not None:
+                        mismatch = self._shrink_orders(smaller)
+                        changed = True
+                        break
+        return mismatch
+
+    def _shrink_orders(self, mismatch: Mismatch) -> Mismatch:
+        # The smallest number of orders that still fails, by bisection: a
+        # divergence seen after n arrivals is also seen in every longer run
+        low, high = 1, mismatch.max_orders
+        best = mismatch
+        while low < high:
+            middle = (low + high) // 2
+            smaller = self.compare(mismatch.params, mismatch.seed, middle)
+            if smaller is not None:
+                best, high = smaller, middle
+            else:
+                low = middle + 1
+        return best
+
+    @staticmethod
+    def _simpler_values(name: str, value) -> List:
+        # Strictly simpler, so shrinking ends: smaller counts, whole means for
+        # fractional ones and smaller whole means for whole ones
+        if isinstance(value, int):
+            return list(range(1, value))
+        whole = value == round(value)
+        candidates = (1.0, float(round(value)))
+        return [candidate for candidate in dict.fromkeys(candidates)
+                if candidate > 0 and candidate != value and (not whole or candidate < value)]
+
+    def check_statistical(self, params: Dict[str, Any], seeds: List[int], max_orders: int) -> Dict[str, Any]:
+        if len(seeds) < 2:
+            raise ValueError("Confidence intervals need at least two replications")
+
+        runs = {"reference": [], "engine": []}
+        seconds = {"reference": 0.0, "engine": 0.0}
+        for seed in seeds:
+            for side, engine in (("reference", self.reference), ("engine", self.engine)):
+                started = time.perf_counter()
+                runs[side].append(engine(params, seed, max_orders).metrics)
+                seconds[side] += time.perf_counter() - started
+
+        result = {"params": params, "replications": len(seeds), "max_orders": max_orders,
+                  "metrics": {}, "reference_seconds": seconds["reference"], "engine_seconds": seconds["engine"]}
+        for name in METRICS:
+            reference_values = [metrics[name] for metrics in runs["reference"]]
+            engine_values = [metrics[name] for metrics in runs["engine"]]
+            differences = [actual - expected for actual, expected in zip(engine_values, reference_values)]
+            difference, half_width = mean_confidence_interval(differences, self.confidence)
+            result["metrics"][name] = {
+                "reference": sum(reference_values) / len(seeds),
+                "engine": sum(engine_values) / len(seeds),
+                "difference": difference,
+                "half_width": half_width,
+                "agree": abs(difference) <= half_width or max(map(abs, differences)) <= self.tolerance
+            }
+        result["agree"] = all(metric["agree"] for metric in result["metrics"].values())
+        return result
+
+
+def verify_engine(engine: Optional[Callable[..., EngineRun]] = None, cases: int = 200, seed: int = 0,
+                  replications: int = 10, large_orders: int = 20000,
+                  configurations=LARGE_CONFIGURATIONS) -> Dict[str, Any]:
+    """Exact check on small configurations and statistical check on large ones"""
+    harness = DifferentialHarness(engine)
+    mismatches = harness.check_exact(cases, seed)
+    seeds = [seed + replication for replication in range(replications)]
+    statistical = [harness.check_statistical(dict(params), seeds, large_orders) for params in configurations]
+    return {"cases": cases, "mismatches": [mismatch.summary() for mismatch in mismatches],
+            "statistical": statistical,
+            "passed": not mismatches and all(check["agree"] for check in statistical)}
@@ -1,12 +1,14 @@
 from datetime import datetime, timedelta
 import heapq
-from typing import Callable, Any
+from typing import Callable, Any, List, Optional
 from enum import Enum
 
 
 class EventType(Enum):
     ORDER_ARRIVAL = "order_arrival"
     KITCHEN_COMPLETION = "kitchen_completion"
+    DELIVERY_COMPLETION = "delivery_completion"
+    ORDER_TIMEOUT = "order_timeout"
     STATISTICS_UPDATE = "statistics_update"
     SYSTEM_CHECK = "system_check"
 
@@ -18,31 +20,73 @@ class Event:
         self.event_type = event_type
         self.data = data
         self.callback = callback
+        self.sequence = 0
+        self.cancelled = False
 
     def __lt__(self, other):
+        if self.event_time == other.event_time:
+            return self.sequence < other.sequence
         return self.event_time < other.event_time
 
 
 class EventCalendar:
+    COMPACTION_MIN_CANCELLED = 64
+
     def __init__(self):
         self.events = []
         self.current_time = datetime.now()
+        self.cancelled_count = 0
+        self.next_sequence = 0
 
-    def add_event(self, event: Event):
+    def add_event(self, event: Event) -> Event:
+        event.sequence = self.next_sequence
+        self.next_sequence += 1
         heapq.heappush(self.events, event)
+        return event
+
+    def cancel_event(self, event: Event) -> bool:
+        if event.cancelled:
+            return False
+
+        event.cancelled = True
+        self.cancelled_count += 1
+
+        if (self.cancelled_count >= self.COMPACTION_MIN_CANCELLED and
+                self.cancelled_count * 2 > len(self.events)):
+            self.compact()
+        return True
+
+    def compact(self):
+        self.events = [event for event in self.events if not event.cancelled]
+        heapq.heapify(self.events)
+        self.cancelled_count = 0
+
+    def _discard_cancelled_head(self):
+        while self.events and self.events[0].cancelled:
+            heapq.heappop(self.events)
+            self.cancelled_count -= 1
 
     def get_next_event(self) -> Event:
+        self._discard_cancelled_head()
         if self.events:
             return heapq.heappop(self.events)
         return None
 
     def peek_next_event(self) -> Event:
+        self._discard_cancelled_head()
         if self.events:
             return self.events[0]
         return None
 
+    def get_upcoming_events(self, count: int) -> List[Event]:
+        return heapq.nsmallest(count, (event for event in self.events if not event.cancelled))
+
     def is_empty(self) -> bool:
-        return len(self.events) == 0
+        return len(self.events) == self.cancelled_count
+
+    def __len__(self):
+        return len(self.events) - self.cancelled_count
 
     def clear(self):
-        self.events = []
\ No newline at end of file
+        self.events = []
+        self.cancelled_count = 0
\ No newline at end of file
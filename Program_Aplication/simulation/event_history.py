@@ -0,0 +1,101 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+DEFAULT_HISTORY_SIZE = 4096
+
+
+class EventHistory:
+    """
+    The last `capacity` model events, for the waveform diagram.
+
+    A ring of preallocated slots: recording overwrites the oldest event, so
+    memory stays the same however long the session runs. Events are recorded
+    in simulation order, so the ring read from its oldest slot is sorted by
+    time and a window is found by binary search over logical positions:
+    O(log n) to find its start plus O(k) to read its k events. Events are kept
+    as tuples and turned into the dicts display_waveform_diagram takes only
+    when read.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_HISTORY_SIZE):
+        if capacity < 1:
+            raise ValueError("Event history needs at least one slot")
+        self.capacity = capacity
+        self.times: List[Optional[datetime]] = [None] * capacity
+        self.records: List[Optional[tuple]] = [None] * capacity
+        self.head = 0
+        self.count = 0
+        self.total_recorded = 0
+
+    def record(self, time: datetime, event_type: str, order_id: str = "", kitchen: Optional[int] = None):
+        index = (self.head + self.count) % self.capacity
+        if self.count == self.capacity:
+            self.head = (self.head + 1) % self.capacity
+        else:
+            self.count += 1
+        self.times[index] = time
+        self.records[index] = (time, event_type, order_id, kitchen)
+        self.total_recorded += 1
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _time_at(self, position: int) -> datetime:
+        return self.times[(self.head + position) % self.capacity]
+
+    def _first_at_or_after(self, time: datetime) -> int:
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._time_at(middle) < time:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _first_after(self, time: datetime) -> int:
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._time_at(middle) <= time:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _read(self, first: int, last: int) -> List[Dict[str, Any]]:
+        events = []
+        for position in range(first, last):
+            time, event_type, order_id, kitchen = self.records[(self.head + position) % self.capacity]
+            events.append({"time": time, "type": event_type, "order_id": order_id, "kitchen": kitchen})
+        return events
+
+    def window(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Events with start <= time <= end, oldest first; an open bound reaches the end of the history"""
+        first = self._first_at_or_after(start) if start is not None else 0
+        last = self._first_after(end) if end is not None else self.count
+        return self._read(first, max(first, last))
+
+    def latest(self, count: int) -> List[Dict[str, Any]]:
+        return self._read(max(0, self.count - count), self.count)
+
+    def oldest_time(self) -> Optional[datetime]:
+        return self._time_at(0) if self.count else None
+
+    def truncate(self, total_recorded: int):
+        """
+        Forgets the events recorded after the first total_recorded, to go back
+        to an earlier point of the run. Events the ring had already overwritten
+        by then do not come back.
+        """
+        removed = min(self.count, max(0, self.total_recorded - total_recorded))
+        self.count -= removed
+        self.total_recorded = total_recorded
+
+    def clear(self):
+        """Forgets every event, as if none had been recorded; truncate() positions start again from 0"""
+        self.times = [None] * self.capacity
+        self.records = [None] * self.capacity
+        self.head = 0
+        self.count = 0
+        self.total_recorded = 0
@@ -0,0 +1,147 @@
+import heapq
+import random
+from collections import deque
+from datetime import timedelta
+from typing import Any, Dict, List, Tuple
+
+from .differential import EngineRun
+
+FAST_PARAMETERS = ("num_sources", "num_kitchens", "buffer_capacity", "mean_arrival_time", "mean_service_time")
+
+ARRIVAL = 0
+COMPLETION = 1
+MICROSECOND = timedelta(microseconds=1)
+
+
+def _micros(minutes: float) -> int:
+    # The rounding of timedelta, so times match the reference simulator to the microsecond
+    return timedelta(minutes=minutes) // MICROSECOND
+
+
+def run_fast(params: Dict[str, Any], seed: int, max_orders: int, trace: bool = False) -> EngineRun:
+    """
+    The base model (И32 arrivals, П31 service, Д10O3 eviction, Д1031 ring
+    placement, Д2П2 first free line, Д2Б2 FIFO selection) on integer
+    microsecond times, lists and a deque instead of model objects.
+
+    It draws from one random.Random(seed) in the order the reference simulator
+    does with shared streams, so for the same seed it must reproduce its run
+    event for event. Trace entries are (microseconds since start, event, order
+    number, value), value being the line for direct/dispatched/completed, the
+    slot for buffered and the evicting order for evicted.
+    """
+    unknown = set(params) - set(FAST_PARAMETERS)
+    if unknown:
+        raise ValueError(f"The fast engine models only {', '.join(FAST_PARAMETERS)}; got {', '.join(sorted(unknown))}")
+    num_sources = params.get("num_sources", 1)
+    num_kitchens = params.get("num_kitchens", 3)
+    capacity = params.get("buffer_capacity", 20)
+    mean_arrival_time = params.get("mean_arrival_time", 2.0)
+    mean_service_time = params.get("mean_service_time", 10.0)
+    min_interval = max(0.1, mean_arrival_time - 1)
+    max_interval = mean_arrival_time + 1
+    rate = 1.0 / mean_service_time
+
+    rng = random.Random(seed)
+    log = [] if trace else None
+    calendar: List[Tuple[int, int, int, int]] = []
+    sequence = 0
+    for source in range(num_sources):
+        calendar.append((_micros(rng.uniform(0, 5)), sequence, ARRIVAL, source))
+        sequence += 1
+    heapq.heapify(calendar)
+
+    order_times: List[int] = []
+    slots = [-1] * capacity
+    slot_of: Dict[int, int] = {}
+    waiting: deque = deque()
+    pointer = 0
+    kitchen_order = [-1] * num_kitchens
+    kitchen_start = [0] * num_kitchens
+    busy_time = 0
+
+    orders = rejected = completed = 0
+    wait_total = 0
+    events = 0
+    now = 0
+
+    def take_oldest() -> int:
+        # Oldest by order time, the lowest slot among orders of the same time
+        order = waiting[0]
+        position = 0
+        for index in range(1, len(waiting)):
+            candidate = waiting[index]
+            if order_times[candidate] != order_times[order]:
+                break
+            if slot_of[candidate] < slot_of[order]:
+                order, position = candidate, index
+        del waiting[position]
+        slots[slot_of.pop(order)] = -1
+        return order
+
+    def start_cooking(kitchen: int, order: int):
+        nonlocal sequence
+        kitchen_order[kitchen] = order
+        kitchen_start[kitchen] = now
+        heapq.heappush(calendar, (now + _micros(rng.expovariate(rate)), sequence, COMPLETION, kitchen))
+        sequence += 1
+
+    while orders < max_orders and calendar:
+        now, _, kind, subject = heapq.heappop(calendar)
+        events += 1
+
+        if kind == ARRIVAL:
+            order = orders
+            orders += 1
+            order_times.append(now)
+            if log is not None:
+                log.append((now, "arrival", order, None))
+
+            kitchen = next((line for line in range(num_kitchens) if kitchen_order[line] < 0), -1)
+            if kitchen >= 0:
+                start_cooking(kitchen, order)
+                if log is not None:
+                    log.append((now, "direct", order, kitchen))
+            else:
+                evicted = take_oldest() if len(waiting) == capacity else -1
+                slot = pointer
+                while slots[slot] >= 0:
+                    slot = (slot + 1) % capacity
+                slots[slot] = order
+                slot_of[order] = slot
+                waiting.append(order)
+                pointer = (slot + 1) % capacity
+                if log is not None:
+                    log.append((now, "buffered", order, slot))
+                if evicted >= 0:
+                    rejected += 1
+                    if log is not None:
+                        log.append((now, "evicted", evicted, order))
+
+            heapq.heappush(calendar, (now + _micros(rng.uniform(min_interval, max_interval)),
+                                      sequence, ARRIVAL, subject))
+            sequence += 1
+        else:
+            kitchen = subject
+            done = kitchen_order[kitchen]
+            kitchen_order[kitchen] = -1
+            busy_time += now - kitchen_start[kitchen]
+            wait_total += kitchen_start[kitchen] - order_times[done]
+            completed += 1
+            if log is not None:
+                log.append((now, "completed", done, kitchen))
+            if waiting:
+                order = take_oldest()
+                start_cooking(kitchen, order)
+                if log is not None:
+                    log.append((now, "dispatched", order, kitchen))
+
+    for kitchen in range(num_kitchens):
+        if kitchen_order[kitchen] >= 0:
+            busy_time += now - kitchen_start[kitchen]
+    metrics = {
+        "rejection_rate": rejected / max(1, orders),
+        "avg_wait_time": wait_total / 60e6 / max(1, completed),
+        "kitchen_utilization": busy_time / max(1, now * num_kitchens)
+    }
+    return EngineRun(metrics, log, events)
@@ -0,0 +1,143 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import List, Optional, Tuple
+
+from .simulator import SpecialEventSimulator
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+PREFIX = "restaurant_sim"
+
+
+class MetricsExporter:
+    """
+    Live counters and gauges of a running simulation in the Prometheus text
+    format, served at http://host:port/metrics from a daemon thread.
+
+    The simulation loop knows nothing about it: the server thread reads the
+    engine and the statistics collector, which takes a few microseconds per
+    kitchen line, and does so at most once per min_interval seconds. Scrapes
+    in between get the cached text, so however often it is scraped the
+    exporter holds the interpreter lock for a bounded share of the time. The
+    values are read without stopping the simulation and may mix adjacent
+    steps. attach() switches to the next simulator of a sweep; counters
+    restart with it, which Prometheus treats as a counter reset.
+    """
+
+    def __init__(self, simulator: Optional[SpecialEventSimulator] = None, port: int = 9108,
+                 host: str = "127.0.0.1", min_interval: float = 1.0):
+        self.simulator = simulator
+        self.host = host
+        self.port = port
+        self.min_interval = min_interval
+        self.runs = 1 if simulator is not None else 0
+        self.server: Optional[HTTPServer] = None
+        self.thread: Optional[threading.Thread] = None
+
+        self.lock = threading.Lock()
+        self.snapshot = b""
+        self.snapshot_time = -float("inf")
+        self.last_steps = 0
+        self.last_wall_time = time.monotonic()
+        self.events_per_second = 0.0
+
+    def attach(self, simulator: SpecialEventSimulator):
+        with self.lock:
+            self.simulator = simulator
+            self.runs += 1
+            self.last_steps = simulator.step_count
+            self.last_wall_time = time.monotonic()
+            self.snapshot_time = -float("inf")
+
+    def start(self) -> "MetricsExporter":
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = exporter.render()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = HTTPServer((self.host, self.port), Handler)
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-exporter", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def __enter__(self) -> "MetricsExporter":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def render(self) -> bytes:
+        """The cached exposition text, rebuilt when older than min_interval"""
+        with self.lock:
+            now = time.monotonic()
+            if now - self.snapshot_time >= self.min_interval:
+                self.snapshot = self._build(now).encode("utf-8")
+                self.snapshot_time = now
+            return self.snapshot
+
+    def _build(self, now: float) -> str:
+        lines: List[str] = []
+
+        def metric(name: str, kind: str, help_text: str, samples: List[Tuple[str, float]]):
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{PREFIX}_{name}{labels} {value:.10g}")
+
+        metric("runs_total", "counter", "Simulation runs started under this exporter.", [("", self.runs)])
+        simulator = self.simulator
+        if simulator is None:
+            return "\n".join(lines) + "\n"
+
+        steps = simulator.step_count
+        elapsed = now - self.last_wall_time
+        if elapsed > 0:
+            self.events_per_second = max(0, steps - self.last_steps) / elapsed
+        self.last_steps, self.last_wall_time = steps, now
+
+        collector = simulator.stats_collector
+        simulated_minutes = (simulator.current_time - simulator.start_time).total_seconds() / 60
+        busy_elapsed = max(1e-9, (collector.last_update_time - collector.start_time).total_seconds())
+
+        metric("events_total", "counter", "Special events processed.", [("", steps)])
+        metric("events_per_second", "gauge", "Events processed per wall-clock second since the last snapshot.",
+               [("", self.events_per_second)])
+        metric("simulated_minutes", "gauge", "Simulated time since the start of the run.", [("", simulated_minutes)])
+        metric("orders_total", "counter", "Orders generated.", [("", collector.total_orders)])
+        metric("completed_orders_total", "counter", "Orders cooked.", [("", collector.completed_orders)])
+        metric("rejected_orders_total", "counter", "Orders rejected.", [("", collector.rejected_orders)])
+        metric("abandoned_orders_total", "counter", "Orders abandoned in the buffer.",
+               [("", collector.abandoned_orders)])
+        metric("rejection_rate", "gauge", "Rejected share of the orders so far.",
+               [("", collector.rejected_orders / max(1, collector.total_orders))])
+        metric("buffer_occupancy", "gauge", "Orders waiting in the buffer.", [("", simulator.buffer.count)])
+        metric("buffer_capacity", "gauge", "Buffer size.", [("", simulator.buffer.capacity)])
+        metric("kitchen_busy", "gauge", "1 while a kitchen line is cooking.",
+               [(f'{{line="{kitchen.line_id}"}}', int(kitchen.is_busy)) for kitchen in simulator.kitchen_lines])
+        metric("kitchen_utilization", "gauge", "Busy share of the simulated time per kitchen line.",
+               [(f'{{line="{line}"}}', busy.total_seconds() / busy_elapsed)
+                for line, busy in enumerate(list(collector.kitchen_busy_time))])
+        metric("calendar_size", "gauge", "Pending events in the calendar.", [("", len(simulator.event_calendar))])
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,381 @@
+import bisect
+import copy
+import heapq
+import math
+import random
+import time
+import types
+from collections import deque
+from datetime import date, datetime, timedelta
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+
+from .event_calendar import EventType
+from .simulator import SpecialEventSimulator
+from ..statistics.confidence import mean_confidence_interval, sample_variance
+
+DEFAULT_BATCH_ORDERS = 20000
+# Level probabilities the calibration weighs against plain simulation
+LEVEL_PROBABILITIES = (math.exp(-1), math.exp(-2), math.exp(-3))
+
+
+def importance(simulator: SpecialEventSimulator) -> int:
+    """Orders in the system: buffer occupancy plus busy kitchen lines"""
+    return simulator.buffer.count + sum(1 for kitchen in simulator.kitchen_lines if kitchen.is_busy)
+
+
+class _StateCopier:
+    """
+    Copies the mutable state of a simulator.
+
+    Numbers, strings, times and enum members are immutable and kept, objects
+    in the memo (shared or replaced ones) are taken from it, and the rest is
+    copied once, with the references between the copies preserved. A plain
+    object copies its attribute dict in one go and visits only the attributes
+    holding objects; a retrial's copy is a few dozen such objects, several
+    times cheaper than a pickle round trip. Anything else goes to
+    copy.deepcopy with the same memo.
+    """
+
+    ATOMIC = {int, float, complex, bool, str, bytes, type(None), date, datetime, timedelta, type,
+              types.FunctionType, types.BuiltinFunctionType}
+
+    def __init__(self):
+        self.atomic = set(self.ATOMIC)
+        self.plain: Dict[type, bool] = {}
+
+    def _is_plain(self, cls: type) -> bool:
+        plain = self.plain.get(cls)
+        if plain is None:
+            plain = self.plain[cls] = (
+                "__slots__" not in dir(cls) and not issubclass(cls, random.Random) and
+                not hasattr(cls, "__deepcopy__") and cls.__reduce_ex__ is object.__reduce_ex__ and
+                cls.__reduce__ is object.__reduce__ and cls.__getstate__ is object.__getstate__)
+        return plain
+
+    def copy(self, obj, memo: Dict[int, Any]):
+        atomic = self.atomic
+        key = id(obj)
+        new = memo.get(key)
+        if new is not None:
+            return new
+        cls = type(obj)
+
+        if cls is list:
+            new = memo[key] = obj.copy()
+            for index, value in enumerate(new):
+                if type(value) not in atomic:
+                    new[index] = self.copy(value, memo)
+        elif cls is dict:
+            new = memo[key] = {k if type(k) in atomic else self.copy(k, memo):
+                               v if type(v) in atomic else self.copy(v, memo) for k, v in obj.items()}
+        elif cls is tuple:
+            new = memo[key] = tuple(v if type(v) in atomic else self.copy(v, memo) for v in obj)
+        elif cls is deque:
+            new = memo[key] = deque((v if type(v) in atomic else self.copy(v, memo) for v in obj), obj.maxlen)
+        elif cls is types.MethodType:
+            new = types.MethodType(obj.__func__, self.copy(obj.__self__, memo))
+        elif isinstance(obj, Enum):
+            atomic.add(cls)
+            new = obj
+        elif self._is_plain(cls):
+            new = memo[key] = cls.__new__(cls)
+            state = new.__dict__
+            state.update(obj.__dict__)
+            for name, value in state.items():
+                if type(value) not in atomic:
+                    state[name] = self.copy(value, memo)
+        else:
+            new = copy.deepcopy(obj, memo)
+        return new
+
+
+class RestartEstimator:
+    """
+    RESTART multilevel splitting estimate of the rejection probability.
+
+    Thresholds T1 < ... < Tm are set on the importance function. Whenever a
+    trajectory crosses Ti upwards it is split: Ri - 1 retrials continue from a
+    copy of the simulator with their own random stream, and each retrial dies
+    as soon as it falls back below Ti. The main trajectory runs a fixed number
+    of arrivals and is never killed. A rejection seen in the region above Tk
+    counts 1 / (R1 ... Rk), which keeps the estimate unbiased, while most of
+    the simulated events are spent near the buffer limit where rejections
+    happen. Batches with independent seeds give the confidence interval.
+
+    Event times are drawn when events are scheduled, so copies of the state
+    after a crossing would all replay the same next event, and mostly die
+    together. Levels are only crossed upwards by arrivals, so the simulator is
+    saved just before an arrival that is about to cross, and every retrial
+    replays that arrival with its own generator: the retrials diverge from
+    their first event, and one saved state serves all of them. Busy lines with
+    exponential cooking times get fresh remainders in each copy as well. A copy
+    takes only the mutable state (see _StateCopier) and shares the statistics
+    collector, of which only the rejection counter is read, step by step, the
+    read-only arrival profiles and service model, and the order id generator,
+    whose ids only need to be unique.
+
+    Without explicit thresholds a brute-force pilot run measures the
+    up-crossing probabilities, the events a trajectory spends above each
+    level, and what an event and a copy cost. For level probabilities
+    e^-1..e^-3 (or the given one) thresholds go where the up-crossing
+    probability has dropped by that much, with Ri its inverse, the usual
+    RESTART rule, and the balanced-splitting variance model predicts the work
+    for a given precision against plain simulation: about
+    S^2 (1/q - 1) (1 + copy / excursion) against 1/P - 1, for S segments of
+    probability q, a copy costing `copy` events and retrials living
+    `excursion` events. The cheapest setting wins; no thresholds at all, plain
+    simulation in batches, when rejections are not rare enough to pay for the
+    copies. The settings only affect the variance, not the bias.
+    """
+
+    def __init__(self, params: Dict[str, Any], thresholds: Optional[List[int]] = None,
+                 splits: Optional[List[int]] = None, pilot_orders: int = 20000,
+                 level_probability: Optional[float] = None, max_split: int = 50):
+        if params.get("arrival_trace"):
+            raise ValueError("Splitting copies the simulator and cannot replay an arrival trace")
+        if thresholds is not None and (splits is None or len(splits) != len(thresholds)):
+            raise ValueError("Need one split factor per threshold")
+
+        self.params = dict(params)
+        self.thresholds = list(thresholds) if thresholds is not None else None
+        self.splits = list(splits) if splits is not None else None
+        self.pilot_orders = pilot_orders
+        self.level_probability = level_probability
+        self.max_split = max_split
+        self.start_time = datetime.combine(datetime.now().date(), datetime.min.time())
+        self.rng = random.Random()
+        self.orders = DEFAULT_BATCH_ORDERS
+        self.weights = [1.0]
+        self.copier = _StateCopier()
+        self.predicted_cost = None
+
+    def _simulator(self, seed: int) -> SpecialEventSimulator:
+        return SpecialEventSimulator(seed=seed, verbose=False, keep_history=False,
+                                     start_time=self.start_time, **self.params)
+
+    def _levels(self, ratios: Dict[int, float], level_probability: float) -> Tuple[List[int], List[int]]:
+        thresholds, splits = [], []
+        log_probability = 0.0
+        for value in sorted(ratios):
+            log_probability += math.log(ratios[value])
+            if log_probability <= math.log(level_probability):
+                thresholds.append(value + 1)
+                splits.append(min(self.max_split, max(2, round(math.exp(-log_probability)))))
+                log_probability = 0.0
+        return thresholds, splits
+
+    def calibrate(self, seed: int) -> Tuple[List[int], List[int]]:
+        simulator = self._simulator(seed)
+        top = simulator.buffer_capacity + simulator.num_kitchens
+        crossings = [0] * (top + 1)
+        occupied = [0] * (top + 1)
+
+        events = 0
+        level = importance(simulator)
+        started = time.perf_counter()
+        while simulator.total_orders_generated < self.pilot_orders and simulator.run_step():
+            events += 1
+            new_level = importance(simulator)
+            for crossed in range(level + 1, new_level + 1):
+                crossings[crossed] += 1
+            occupied[new_level] += 1
+            level = new_level
+        event_seconds = (time.perf_counter() - started) / max(1, events)
+
+        started = time.perf_counter()
+        for _ in range(20):
+            self._restore(simulator)
+        copy_events = (time.perf_counter() - started) / 20 / event_seconds
+
+        ratios = {}
+        last_ratio = 0.5
+        for value in range(simulator.num_kitchens, top):
+            if crossings[value] and crossings[value + 1]:
+                last_ratio = min(1.0, crossings[value + 1] / crossings[value])
+            ratios[value] = max(last_ratio, 1e-9)
+        # Events a trajectory spends at or above each level per up-crossing
+        excursions = [max(1.0, sum(occupied[value:]) / crossings[value]) if crossings[value] else 1.0
+                      for value in range(top + 1)]
+
+        path_probability = math.prod(ratios.values())
+        self.thresholds, self.splits, self.predicted_cost = [], [], 1.0
+        for level_probability in ([self.level_probability] if self.level_probability else LEVEL_PROBABILITIES):
+            thresholds, splits = self._levels(ratios, level_probability)
+            if not thresholds:
+                continue
+            segments = len(thresholds) + 1
+            segment_probability = path_probability ** (1 / segments)
+            overhead = sum(1 + copy_events / excursions[value] for value in thresholds) / len(thresholds)
+            cost = (segments ** 2 * (1 / segment_probability - 1) * overhead /
+                    max(1e-12, 1 / path_probability - 1))
+            if cost < self.predicted_cost or self.level_probability:
+                self.thresholds, self.splits, self.predicted_cost = thresholds, splits, cost
+        return self.thresholds, self.splits
+
+    def run_batch(self, seed: int, orders: int = DEFAULT_BATCH_ORDERS) -> Dict[str, float]:
+        """One RESTART run whose main trajectory sees the given number of arrivals"""
+        if self.thresholds is None:
+            self.calibrate(seed ^ 0x5EED)
+
+        self.rng.seed(seed)
+        self.orders = orders
+        self.weights = [1.0]
+        for split in self.splits:
+            self.weights.append(self.weights[-1] / split)
+
+        simulator = self._simulator(seed)
+        weighted, events = self._trial(simulator, 0)
+        arrivals = simulator.total_orders_generated
+        return {"estimate": weighted / max(1, arrivals), "arrivals": arrivals, "events": events}
+
+    @staticmethod
+    def _shared(simulator: SpecialEventSimulator) -> Dict[int, Any]:
+        objects = [simulator.stats_collector, simulator.arrival_profiles, simulator.item_model, simulator.id_rng,
+                   simulator.line_service_times, simulator.line_service_laws]
+        return {id(obj): obj for obj in objects if obj is not None}
+
+    def _snapshot(self, simulator: SpecialEventSimulator) -> SpecialEventSimulator:
+        """A copy of the state to restore from later; it is never run, so it keeps the generators"""
+        memo = self._shared(simulator)
+        for rng in (simulator.rng, simulator.arrival_rng, simulator.service_rng):
+            if rng is not None:
+                memo[id(rng)] = rng
+        return self.copier.copy(simulator, memo)
+
+    def _restore(self, snapshot: SpecialEventSimulator) -> SpecialEventSimulator:
+        """A copy of the saved state with generators and order payloads of its own"""
+        memo = self._shared(snapshot)
+        memo[id(snapshot.rng)] = random.Random(self.rng.getrandbits(64))
+        if snapshot.service_rng is not None:
+            memo[id(snapshot.arrival_rng)] = random.Random(self.rng.getrandbits(64))
+            memo[id(snapshot.service_rng)] = random.Random(self.rng.getrandbits(64))
+        clone = self.copier.copy(snapshot, memo)
+        clone.payload_seed_base = self.rng.getrandbits(64)
+        return clone
+
+    @staticmethod
+    def _redraw_residuals(clone: SpecialEventSimulator):
+        """
+        Copies would share the completion times already drawn for busy lines and
+        tend to die together. An exponential cooking time is memoryless, so once
+        the copy has crossed its remainder is redrawn from the same law; other
+        laws keep it.
+        """
+        redraw = {kitchen for kitchen in clone.kitchen_lines
+                  if kitchen.is_busy and kitchen.service_law == "exponential"}
+        if not redraw:
+            return
+        calendar = clone.event_calendar
+        for event in calendar.events:
+            kitchen = event.data
+            if event.event_type == EventType.KITCHEN_COMPLETION and not event.cancelled and kitchen in redraw:
+                mean = kitchen.mean_service_time * (1 + kitchen.batch_growth * (len(kitchen.batch) - 1))
+                kitchen.completion_time = clone.current_time + timedelta(minutes=clone.rng.expovariate(1.0 / mean))
+                event.event_time = kitchen.completion_time
+        heapq.heapify(calendar.events)
+
+    def _trial(self, simulator: SpecialEventSimulator, own_level: int) -> Tuple[float, int]:
+        collector = simulator.stats_collector
+        kill_below = self.thresholds[own_level - 1] if own_level else -1
+        weighted, events = 0.0, 0
+
+        value = importance(simulator)
+        region = bisect.bisect_right(self.thresholds, value)
+        while simulator.total_orders_generated < self.orders:
+            snapshot = None
+            if region < len(self.thresholds) and value + 1 >= self.thresholds[region]:
+                upcoming = simulator.event_calendar.peek_next_event()
+                if upcoming is not None and upcoming.event_type == EventType.ORDER_ARRIVAL:
+                    snapshot = self._snapshot(simulator)
+
+            rejected_before = collector.rejected_orders
+            if not simulator.run_step():
+                break
+            events += 1
+            weighted += (collector.rejected_orders - rejected_before) * self.weights[region]
+
+            value = importance(simulator)
+            if value < kill_below:
+                break
+            new_region = bisect.bisect_right(self.thresholds, value)
+            if new_region > region:
+                split_weighted, split_events = self._split(simulator, region, new_region, snapshot)
+                weighted += split_weighted
+                events += split_events
+            region = new_region
+        return weighted, events
+
+    def _split(self, simulator: SpecialEventSimulator, region: int, new_region: int,
+               snapshot: Optional[SpecialEventSimulator]) -> Tuple[float, int]:
+        """
+        Retrials for every threshold the trajectory has just crossed, lowest first.
+        With a state saved before the crossing event each retrial replays the event;
+        otherwise it starts from a copy of the current state, which waits unchanged
+        until the retrials are done.
+        """
+        weighted, events = 0.0, 0
+        replay = snapshot is not None
+        if not replay:
+            snapshot = simulator
+
+        for level in range(region + 1, new_region + 1):
+            for _ in range(self.splits[level - 1] - 1):
+                clone = self._restore(snapshot)
+                clone_region = new_region
+                if replay:
+                    clone.run_step()
+                    events += 1
+                    clone_region = bisect.bisect_right(self.thresholds, importance(clone))
+                    if clone_region < level:
+                        continue
+                self._redraw_residuals(clone)
+                for result in (self._split(clone, level, clone_region, snapshot if replay else None),
+                               self._trial(clone, level)):
+                    weighted += result[0]
+                    events += result[1]
+        return weighted, events
+
+    def estimate(self, seed: int = 0, precision: float = 0.1, batch_orders: int = DEFAULT_BATCH_ORDERS,
+                 min_batches: int = 5, max_batches: int = 200, confidence: float = 0.9) -> Dict[str, Any]:
+        """Adds batches until the confidence half-width is within precision of the estimate"""
+        if self.thresholds is None:
+            self.calibrate(seed ^ 0x5EED)
+
+        estimates, arrivals, events = [], 0, 0
+        mean, half_width = 0.0, math.inf
+        started = time.perf_counter()
+        while len(estimates) < max_batches:
+            batch = self.run_batch(seed + len(estimates), batch_orders)
+            estimates.append(batch["estimate"])
+            arrivals += batch["arrivals"]
+            events += batch["events"]
+            mean, half_width = mean_confidence_interval(estimates, confidence)
+            if len(estimates) >= min_batches and mean > 0 and half_width <= precision * mean:
+                break
+        seconds = time.perf_counter() - started
+
+        # Relative variance of the estimate times the work spent on it: methods
+        # compare on this whatever their budgets
+        relative_variance = (sample_variance(estimates) / len(estimates) / mean ** 2
+                             if len(estimates) > 1 and mean > 0 else math.inf)
+        return {
+            "rejection_rate": mean,
+            "half_width": half_width,
+            "relative_precision": half_width / mean if mean > 0 else math.inf,
+            "confidence": confidence,
+            "batches": len(estimates),
+            "arrivals": arrivals,
+            "events": events,
+            "seconds": seconds,
+            "work_normalised_variance": relative_variance * seconds,
+            "thresholds": self.thresholds,
+            "splits": self.splits,
+            "predicted_cost": self.predicted_cost
+        }
+
+
+def estimate_rejection_probability(params: Dict[str, Any], seed: int = 0, precision: float = 0.1,
+                                   batch_orders: int = DEFAULT_BATCH_ORDERS, **settings) -> Dict[str, Any]:
+    """RESTART estimate of P_reject; settings go to RestartEstimator"""
+    return RestartEstimator(params, **settings).estimate(seed, precision, batch_orders)
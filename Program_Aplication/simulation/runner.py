@@ -0,0 +1,219 @@
+import itertools
+import math
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from .simulator import ENGINE_VERSION, SpecialEventSimulator
+from .result_cache import ResultCache, canonical_key
+from ..statistics.confidence import sample_variance, summarize_samples
+from ..statistics.quantile_sketch import merge_sketches
+from ..statistics.stats_collector import PERCENTILES
+
+
+MODEL_PARAMETERS = ("num_sources", "num_kitchens", "buffer_capacity",
+                    "mean_arrival_time", "mean_service_time", "max_wait_minutes",
+                    "arrival_profile", "line_service_times", "line_service_laws", "routing_policy",
+                    "priority_mix", "arrival_trace", "prep_stations",
+                    "batch_size", "batch_growth", "num_couriers", "courier_speed",
+                    "courier_capacity", "courier_radius", "random_streams")
+
+DEFAULT_MAX_ORDERS = 1000
+
+
+def run_simulation(params: Dict[str, Any], seed: Optional[int] = None,
+                   max_orders: Optional[int] = None, duration: Optional[float] = None,
+                   precision: Optional[float] = None, start_hour: float = 0.0,
+                   cache: Optional[ResultCache] = None, exporter=None,
+                   event_log=None) -> Dict[str, Any]:
+    """
+    Headless run of one configuration.
+    Stops after max_orders arrivals, after duration simulated minutes, or once the
+    rejection probability reaches the requested relative precision (max_orders then
+    acts as an upper bound). The clock starts at start_hour of the current day, so
+    time-of-day arrival profiles give the same results on every run.
+    Seeded runs are looked up in and stored to the cache when one is given.
+    A MetricsExporter, if given, follows the run. Runs with an EventLog skip the
+    cache, since a cached result has no events to log, and so do runs given
+    profile or routing objects (see cacheable).
+    """
+    start_time = datetime.combine(datetime.now().date(), datetime.min.time()) + timedelta(hours=start_hour)
+    simulator = SpecialEventSimulator(seed=seed, verbose=False, keep_history=False,
+                                      start_time=start_time, event_log=event_log, **params)
+
+    if precision is None and max_orders is None and duration is None:
+        max_orders = DEFAULT_MAX_ORDERS
+
+    key = None
+    if cache is not None and seed is not None and event_log is None and cacheable(params):
+        key = run_cache_key(simulator, max_orders, duration, precision, start_hour)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    if exporter is not None:
+        exporter.attach(simulator)
+    if precision is not None:
+        run_until_precision(simulator, precision, max_orders)
+    else:
+        run_headless(simulator, max_orders, duration)
+
+    result = simulator.get_results()
+    if key is not None:
+        cache.put(key, result)
+    return result
+
+
+def cacheable(params: Dict[str, Any]) -> bool:
+    """
+    Whether a run's parameters describe it fully. The key knows arrival
+    profiles and routing policies by name, which only pins down the ones
+    built from their registries; objects passed in may share a name and
+    differ in windows, factors or code.
+    """
+    profiles = params.get("arrival_profile")
+    values = list(profiles) if isinstance(profiles, (list, tuple)) else [profiles]
+    values.append(params.get("routing_policy"))
+    return all(value is None or isinstance(value, str) for value in values)
+
+
+def run_cache_key(simulator: SpecialEventSimulator, max_orders: Optional[int], duration: Optional[float],
+                  precision: Optional[float], start_hour: float) -> str:
+    """Key of a run: the simulator's normalized parameters, seed, stopping rule and engine version"""
+    payload = {
+        "params": simulator.get_params(),
+        "seed": simulator.seed,
+        "stopping": {"max_orders": max_orders, "duration": duration,
+                     "precision": precision, "start_hour": start_hour},
+        "engine": ENGINE_VERSION
+    }
+    if simulator.trace is not None:
+        payload["trace"] = simulator.trace.fingerprint()
+    return canonical_key(payload)
+
+
+def run_headless(simulator: SpecialEventSimulator, max_orders: Optional[int] = None,
+                 duration: Optional[float] = None):
+    end_time = None
+    if duration is not None:
+        end_time = simulator.start_time + timedelta(minutes=duration)
+
+    calendar = simulator.event_calendar
+    while max_orders is None or simulator.total_orders_generated < max_orders:
+        next_event = calendar.peek_next_event()
+        if next_event is None:
+            break
+        if end_time is not None and next_event.event_time > end_time:
+            break
+        simulator.run_step()
+
+
+def run_until_precision(simulator: SpecialEventSimulator, precision: float,
+                        max_orders: Optional[int] = None):
+    collector = simulator.stats_collector
+
+    while True:
+        current_p = collector.rejected_orders / max(1, collector.total_orders)
+        required_N = collector.calculate_required_iterations(current_p, delta=precision)
+        if max_orders is not None:
+            required_N = min(required_N, max_orders)
+
+        if simulator.total_orders_generated >= required_N:
+            break
+
+        orders_before = simulator.total_orders_generated
+        run_headless(simulator, required_N)
+        if simulator.total_orders_generated == orders_before:
+            break
+
+
+def run_replications(params: Dict[str, Any], seeds: List[Optional[int]],
+                     **stopping) -> List[Dict[str, Any]]:
+    """Stopping keywords and cache are passed on to run_simulation"""
+    return [run_simulation(params, seed, **stopping) for seed in seeds]
+
+
+def run_antithetic_replications(params: Dict[str, Any], seeds: List[int],
+                                **stopping) -> List[Dict[str, Any]]:
+    """
+    Two runs per seed: one on split random streams and its antithetic twin on
+    the complementary uniforms. Results come pair by pair, for
+    summarize_replications(..., antithetic=True). The twins must stop at the
+    same point, so a precision target, which each would reach after its own
+    number of orders, is refused.
+    """
+    if stopping.get("precision") is not None:
+        raise ValueError("Antithetic pairs need a fixed run length, not a precision target")
+    results = []
+    for seed in seeds:
+        results.append(run_simulation(dict(params, random_streams="split"), seed, **stopping))
+        results.append(run_simulation(dict(params, random_streams="antithetic"), seed, **stopping))
+    return results
+
+
+def expand_grid(grid: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def run_sweep(grid: Dict[str, List[Any]], seeds: List[Optional[int]],
+              **stopping) -> List[Dict[str, Any]]:
+    results = []
+    for params in expand_grid(grid):
+        results.extend(run_replications(params, seeds, **stopping))
+    return results
+
+
+def summarize_replications(results: List[Dict[str, Any]], confidence: float = 0.9,
+                           antithetic: bool = False) -> Dict[str, Any]:
+    """
+    Across-replication means and confidence half-widths of every metric.
+    Time sketches are merged exactly, so "percentiles" are those of all
+    replications pooled rather than averages of per-replication percentiles.
+
+    With antithetic=True results are consecutive antithetic pairs. The two
+    runs of a pair are not independent, so the interval is built on the pair
+    averages, and "variance_reduction" is the variance of the mean that as many
+    independent runs would give, divided by the one achieved.
+    """
+    samples: Dict[str, List[float]] = {}
+    sketches: Dict[str, List[Dict[str, Any]]] = {}
+    for result in results:
+        for name, value in result["metrics"].items():
+            samples.setdefault(name, []).append(value)
+        for name, sketch in result.get("sketches", {}).items():
+            sketches.setdefault(name, []).append(sketch)
+
+    if antithetic:
+        if len(results) % 2:
+            raise ValueError("Antithetic results must come in pairs")
+        runs = samples
+        samples = {name: [(values[i] + values[i + 1]) / 2 for i in range(0, len(values), 2)]
+                   for name, values in runs.items()}
+
+    summary = summarize_samples(samples, confidence)
+    merged = {name: merge_sketches(values) for name, values in sketches.items()}
+    report = {
+        "params": results[0]["params"] if results else {},
+        "replications": len(results),
+        "confidence": confidence,
+        "metrics": {name: values["mean"] for name, values in summary.items()},
+        "half_width": {name: values["half_width"] for name, values in summary.items()},
+        "percentiles": {name: sketch.quantiles(PERCENTILES) for name, sketch in merged.items()},
+        "sketches": {name: sketch.to_dict() for name, sketch in merged.items()}
+    }
+    if antithetic:
+        report["antithetic_pairs"] = len(results) // 2
+        report["variance_reduction"] = {name: _variance_reduction(runs[name], samples[name]) for name in runs}
+    return report
+
+
+def _variance_reduction(runs: List[float], pair_means: List[float]) -> Optional[float]:
+    """Var(run) / (2 Var(pair mean)): independent against antithetic variance of the mean"""
+    if len(pair_means) < 2:
+        return None
+    run_variance = sample_variance(runs)
+    pair_variance = sample_variance(pair_means)
+    if pair_variance == 0:
+        return None if run_variance == 0 else math.inf
+    return run_variance / (2 * pair_variance)
+
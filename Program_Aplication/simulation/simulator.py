@@ -1,13 +1,43 @@
+import bisect
+import pickle
 import random
+import uuid
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence
 
-from models.order import Order
-from models.kitchen import KitchenLine
-from models.buffer import CircularBuffer
-from models.dispatcher import PlacementDispatcher, SelectionDispatcher
-from simulation.event_calendar import EventCalendar, EventType, Event
-from statistics.stats_collector import StatisticsCollector
+from .._log_levels import DEBUG, INFO
+from ..models.order import Order, OrderStatus, parse_priority_mix
+from ..models.kitchen import KitchenLine
+from ..models.buffer import CircularBuffer, MultiLevelBuffer
+from ..models.dispatcher import PlacementDispatcher, SelectionDispatcher
+from ..models.routing import make_routing_policy
+from ..models.service_model import ItemServiceModel
+from ..models.delivery import DeliveryStage
+from .event_calendar import EventCalendar, EventType, Event
+from .event_history import EventHistory, DEFAULT_HISTORY_SIZE
+from .breakpoints import Breakpoint, Condition, EventCount
+from .arrival_profiles import make_arrival_profile
+from .trace_arrivals import open_trace
+from ..statistics.stats_collector import StatisticsCollector
+
+
+# Bump whenever a change alters results for the same parameters and seed:
+# cached results are keyed on it.
+ENGINE_VERSION = 3
+
+RANDOM_STREAMS = ("shared", "split", "antithetic")
+
+
+class AntitheticRandom(random.Random):
+    """
+    Generator returning 1 - U for every uniform U of random.Random with the same
+    seed; uniform and expovariate draws go through random() and follow suit.
+    U = 0 would map outside [0, 1) and is kept as is.
+    """
+
+    def random(self) -> float:
+        value = super().random()
+        return 1.0 - value if value else value
 
 
 class SimulationMode:
@@ -18,23 +48,115 @@ class SimulationMode:
 class SpecialEventSimulator:
     def __init__(self, num_sources: int = 1, num_kitchens: int = 3,
                  buffer_capacity: int = 20, mean_arrival_time: float = 2.0,
-                 mean_service_time: float = 10.0):
+                 mean_service_time: float = 10.0, seed: Optional[int] = None,
+                 verbose: bool = True, keep_history: bool = True,
+                 max_wait_minutes: Optional[float] = None, arrival_profile=None,
+                 start_time: Optional[datetime] = None, line_service_times=None,
+                 line_service_laws=None, routing_policy=None, priority_mix=None,
+                 arrival_trace: Optional[str] = None, prep_stations: int = 2,
+                 batch_size: int = 1, batch_growth: float = 0.25,
+                 num_couriers: Optional[int] = None, courier_speed: float = 20.0,
+                 courier_capacity: int = 1, courier_radius: float = 1.0,
+                 random_streams: str = "shared", event_log=None,
+                 history_size: int = DEFAULT_HISTORY_SIZE):
 
         self.num_sources = num_sources
         self.num_kitchens = num_kitchens
         self.buffer_capacity = buffer_capacity
         self.mean_arrival_time = mean_arrival_time
         self.mean_service_time = mean_service_time
+        self.max_wait_minutes = max_wait_minutes
+        self.seed = seed
+        self.verbose = verbose
+        self.rng = random.Random(seed)
+        self.payload_seed_base = (seed if seed is not None else random.getrandbits(32)) << 32
+        # Order ids come from a generator of their own, so a run replayed from a
+        # checkpoint gives its orders the same ids and model draws are unchanged
+        self.id_rng = random.Random(self.payload_seed_base)
+
+        # "split" gives arrivals a stream of their own and has every order draw its
+        # service uniforms on arrival, so runs of neighbouring configurations with
+        # the same seed see the same orders with the same cooking requirements.
+        # "antithetic" is split with every uniform U replaced by 1 - U
+        if random_streams not in RANDOM_STREAMS:
+            raise ValueError(f"Unknown random streams mode: {random_streams}")
+        self.random_streams = random_streams
+        self.arrival_rng = self.rng
+        self.service_rng = None
+        if random_streams != "shared":
+            stream = AntitheticRandom if random_streams == "antithetic" else random.Random
+            self.arrival_rng = stream(self.rng.getrandbits(64))
+            self.service_rng = stream(self.rng.getrandbits(64))
+
+        self.current_time = start_time or datetime.now()
+        self.start_time = self.current_time
 
-        self.kitchen_lines = [KitchenLine(i, mean_service_time) for i in range(num_kitchens)]
-        self.buffer = CircularBuffer(buffer_capacity)
-        self.placement_dispatcher = PlacementDispatcher()
-        self.selection_dispatcher = SelectionDispatcher()
+        if isinstance(arrival_profile, str) and "," in arrival_profile:
+            profiles = arrival_profile.split(",")
+        elif isinstance(arrival_profile, (list, tuple)):
+            profiles = list(arrival_profile)
+        else:
+            profiles = [arrival_profile] * num_sources
+        if len(profiles) != num_sources:
+            raise ValueError("Need one arrival profile per source")
+        self.arrival_profiles = [make_arrival_profile(profile, mean_arrival_time) for profile in profiles]
+        for profile in self.arrival_profiles:
+            profile.anchor(self.start_time)
+        time_windows = next((p.get_windows() for p in self.arrival_profiles if p.get_windows()), [])
+
+        self.arrival_trace = arrival_trace
+        self.trace = open_trace(arrival_trace) if arrival_trace else None
+        self.trace_records = self.trace.records() if self.trace else None
+        self.trace_position = 0
+        # Timestamp logs count from midnight, so they replay from midnight of the first day
+        self.trace_origin = self.start_time
+        if self.trace is not None and self.trace.from_midnight:
+            self.trace_origin = datetime.combine(self.start_time.date(), datetime.min.time())
+
+        self.line_service_times = self._per_line_values(line_service_times, mean_service_time, float)
+        self.line_service_laws = self._per_line_values(line_service_laws, "exponential", str)
+        self.prep_stations = prep_stations
+        self.item_model = None
+        if "items" in self.line_service_laws:
+            self.item_model = ItemServiceModel(stations=prep_stations)
+        if batch_size < 1:
+            raise ValueError("Batch size must be at least 1")
+        self.batch_size = batch_size
+        self.batch_growth = batch_growth
+        self.kitchen_lines = [KitchenLine(i, self.line_service_times[i], self.rng, self.line_service_laws[i],
+                                          self.item_model, batch_growth)
+                              for i in range(num_kitchens)]
+
+        self.priority_mix = parse_priority_mix(priority_mix) if priority_mix else None
+        if self.priority_mix:
+            self.priority_classes = [priority for priority, _ in self.priority_mix]
+            self.priority_cumulative = []
+            for _, share in self.priority_mix:
+                self.priority_cumulative.append((self.priority_cumulative or [0.0])[-1] + share)
+            self.buffer = MultiLevelBuffer(buffer_capacity, batch_index=batch_size > 1)
+        else:
+            self.buffer = CircularBuffer(buffer_capacity, batch_index=batch_size > 1)
+
+        self.num_couriers = num_couriers
+        self.delivery = None
+        if num_couriers:
+            self.delivery = DeliveryStage(num_couriers, courier_speed, courier_capacity, courier_radius,
+                                          start_time=self.start_time)
+
+        self.routing_policy = make_routing_policy(routing_policy)
+        self.routing_policy.attach(self.kitchen_lines, self.current_time)
+        # The last history_size events for the waveform diagram of the interactive modes
+        self.event_history = EventHistory(history_size) if keep_history else None
+        self.event_log = event_log
+        if event_log is not None:
+            event_log.attach(self.start_time, seed)
+        self.placement_dispatcher = PlacementDispatcher(verbose, self.routing_policy, event_log)
+        self.selection_dispatcher = SelectionDispatcher(self._on_order_dispatched_from_buffer, batch_size, event_log)
         self.event_calendar = EventCalendar()
-        self.stats_collector = StatisticsCollector()
+        self.stats_collector = StatisticsCollector(self.start_time, buffer_capacity, keep_history, time_windows,
+                                                   priority_classes=self.priority_mix is not None,
+                                                   delivery=self.delivery is not None)
 
-        self.current_time = datetime.now()
-        self.start_time = self.current_time
         self.is_running = False
         self.simulation_mode = SimulationMode.STEP_BY_STEP
         self.step_count = 0
@@ -42,9 +164,24 @@ class SpecialEventSimulator:
 
         self._generate_initial_events()
 
+    def _per_line_values(self, values, default, value_type) -> List:
+        if values is None:
+            return [default] * self.num_kitchens
+        if isinstance(values, str):
+            values = values.split(",")
+        values = [value_type(value) for value in values]
+        if len(values) == 1:
+            values = values * self.num_kitchens
+        if len(values) != self.num_kitchens:
+            raise ValueError(f"Expected {self.num_kitchens} per-line values, got {len(values)}")
+        return values
+
     def _generate_initial_events(self):
+        if self.trace_records is not None:
+            self._schedule_next_trace_arrival()
+            return
         for source_id in range(self.num_sources):
-            arrival_time = self.current_time + timedelta(minutes=random.uniform(0, 5))
+            arrival_time = self.current_time + timedelta(minutes=self.arrival_rng.uniform(0, 5))
             self._schedule_order_arrival(source_id, arrival_time)
 
     def _schedule_order_arrival(self, source_id: int, arrival_time: datetime):
@@ -55,40 +192,97 @@ class SpecialEventSimulator:
             self._handle_order_arrival
         ))
 
+    def _schedule_next_trace_arrival(self):
+        # Orders logged before the simulation start are skipped
+        while True:
+            record = next(self.trace_records, None)
+            if record is None:
+                return
+            self.trace_position += 1
+            arrival_time = self.trace_origin + timedelta(minutes=record.minutes)
+            if arrival_time >= self.start_time:
+                break
+        arrival_time = max(self.current_time, arrival_time)
+        self.event_calendar.add_event(Event(
+            arrival_time,
+            EventType.ORDER_ARRIVAL,
+            {"source_id": record.source_id, "record": record},
+            self._handle_trace_arrival
+        ))
+
     def _generate_next_arrival_time(self, source_id: int) -> datetime:
-        min_time = max(0.1, self.mean_arrival_time - 1)
-        max_time = self.mean_arrival_time + 1
-        interval = random.uniform(min_time, max_time)
-        return self.current_time + timedelta(minutes=interval)
+        return self.arrival_profiles[source_id].next_arrival_time(self.current_time, self.arrival_rng)
+
+    def _draw_priority(self):
+        index = bisect.bisect_right(self.priority_cumulative, self.arrival_rng.random() * self.priority_cumulative[-1])
+        return self.priority_classes[min(index, len(self.priority_classes) - 1)]
 
     def _handle_order_arrival(self, source_id: int):
-        items = [f"Item_{random.randint(1, 10)}" for _ in range(random.randint(1, 3))]
-        address = f"Address_{random.randint(1, 100)}"
-        order = Order(source_id, items, address)
+        self._accept_order(Order(source_id, order_time=self.current_time,
+                                 payload_seed=self.payload_seed_base + self.total_orders_generated,
+                                 order_id=self._next_order_id()))
+
+        next_arrival = self._generate_next_arrival_time(source_id)
+        self._schedule_order_arrival(source_id, next_arrival)
+
+    def _handle_trace_arrival(self, source_id: int, record):
+        self._accept_order(Order(source_id, address=record.address, order_time=self.current_time,
+                                 payload_seed=self.payload_seed_base + self.total_orders_generated,
+                                 item_count=record.item_count, order_id=self._next_order_id()))
+        self._schedule_next_trace_arrival()
+
+    def _next_order_id(self) -> str:
+        return str(uuid.UUID(int=self.id_rng.getrandbits(128), version=4))
+
+    def _accept_order(self, order: Order):
+        if self.priority_mix:
+            order.priority = self._draw_priority()
+        if self.service_rng is not None:
+            order.service_uniforms = (self.service_rng.random(), self.service_rng.random())
 
         self.total_orders_generated += 1
         self.stats_collector.record_order_arrival(order)
 
-        print(f"SPECIAL EVENT: Order arrival - {order}")
+        if self.verbose:
+            print(f"SPECIAL EVENT: Order arrival - {order}")
+        if self.event_log is not None:
+            self.event_log.emit(DEBUG, self.current_time, "arrival", order, source=order.source_id)
+        self._record_history("order_arrival", order)
 
-        placed, assigned_kitchen = self.placement_dispatcher.process_incoming_order(
-            order, self.buffer, self.kitchen_lines
+        placed, assigned_kitchen, rejected_order = self.placement_dispatcher.process_incoming_order(
+            order, self.buffer, self.kitchen_lines, self.current_time
         )
 
         if placed:
             if assigned_kitchen:
-                print(f"  Direct to kitchen {assigned_kitchen.line_id}")
+                if self.verbose:
+                    print(f"  Direct to kitchen {assigned_kitchen.line_id}")
+                self._record_history("kitchen_start", order, assigned_kitchen)
                 self.stats_collector.record_order_dispatched(order, assigned_kitchen)
                 self._schedule_kitchen_completion(assigned_kitchen)
             else:
-                print(f"  Placed in buffer (position: {self.buffer.count})")
+                if self.verbose:
+                    print(f"  Placed in buffer (position: {self.buffer.count})")
+                self._record_history("buffer_add", order)
                 self.stats_collector.record_order_buffered(order)
+                self._schedule_order_timeout(order)
         else:
-            print(f"  Order rejected")
+            if self.verbose:
+                print(f"  Order rejected")
+            self._record_history("rejection", order)
             self.stats_collector.record_order_rejected(order)
 
-        next_arrival = self._generate_next_arrival_time(source_id)
-        self._schedule_order_arrival(source_id, next_arrival)
+        if rejected_order is not None:
+            if self.verbose:
+                print(f"  Oldest order rejected: {rejected_order}")
+            self._cancel_order_timeout(rejected_order)
+            self._record_history("rejection", rejected_order)
+            self.stats_collector.record_order_rejected(rejected_order)
+
+    def _record_history(self, event_type: str, order: Order, kitchen: Optional[KitchenLine] = None):
+        if self.event_history is not None:
+            self.event_history.record(self.current_time, event_type, order.order_id,
+                                      kitchen.line_id if kitchen is not None else None)
 
     def _schedule_kitchen_completion(self, kitchen: KitchenLine):
         if kitchen.completion_time:
@@ -99,24 +293,127 @@ class SpecialEventSimulator:
                 self._handle_kitchen_completion
             ))
 
-    def _handle_kitchen_completion(self, kitchen: KitchenLine):
-        print(f"SPECIAL EVENT: Kitchen {kitchen.line_id} completion")
+    def _schedule_order_timeout(self, order: Order):
+        if self.max_wait_minutes is None:
+            return
+        order.timeout_event = self.event_calendar.add_event(Event(
+            order.order_time + timedelta(minutes=self.max_wait_minutes),
+            EventType.ORDER_TIMEOUT,
+            order,
+            self._handle_order_timeout
+        ))
+
+    def _cancel_order_timeout(self, order: Order):
+        if order.timeout_event is not None:
+            self.event_calendar.cancel_event(order.timeout_event)
+            order.timeout_event = None
+
+    def _on_order_dispatched_from_buffer(self, order: Order, kitchen: KitchenLine):
+        self._cancel_order_timeout(order)
+        self._record_history("buffer_remove", order)
+        self._record_history("kitchen_start", order, kitchen)
+        if order is kitchen.current_order:
+            self.placement_dispatcher.kitchen_acquired(kitchen, self.current_time)
+        elif self.verbose:
+            print(f"  {order} joins the batch on kitchen {kitchen.line_id}")
+
+    def _handle_order_timeout(self, order: Order):
+        order.timeout_event = None
+        if not self.buffer.remove_item(order):
+            return
+
+        order.status = OrderStatus.CANCELLED
+        if self.verbose:
+            print(f"SPECIAL EVENT: Customer abandoned {order} after {self.max_wait_minutes} min in buffer")
+        if self.event_log is not None:
+            self.event_log.emit(INFO, self.current_time, "abandoned", order)
+        self._record_history("abandon", order)
+        self.stats_collector.record_order_abandoned(order, self.current_time)
 
-        completed_order = kitchen.complete_order()
-        if completed_order:
-            print(f"  Order completed: {completed_order}")
+    def _handle_kitchen_completion(self, kitchen: KitchenLine):
+        if self.verbose:
+            print(f"SPECIAL EVENT: Kitchen {kitchen.line_id} completion")
+
+        completed_orders = kitchen.complete_batch(self.current_time)
+        self.placement_dispatcher.kitchen_released(kitchen, self.current_time)
+        for completed_order in completed_orders:
+            self._cancel_order_timeout(completed_order)
+            if self.verbose:
+                print(f"  Order completed: {completed_order}")
+            if self.event_log is not None:
+                self.event_log.emit(INFO, self.current_time, "completed", completed_order, kitchen=kitchen.line_id)
+            self._record_history("kitchen_complete", completed_order, kitchen)
             self.stats_collector.record_order_completed(completed_order)
+            if self.delivery is not None:
+                self.delivery.order_ready(completed_order)
 
         completed_orders = self.selection_dispatcher.process_available_kitchens(
-            self.buffer, [kitchen]
+            self.buffer, [kitchen], self.current_time
         )
 
         if kitchen.is_busy:
             self._schedule_kitchen_completion(kitchen)
 
+        if self.delivery is not None:
+            self._dispatch_couriers()
+
+    def _dispatch_couriers(self):
+        for courier in self.delivery.dispatch(self.current_time):
+            if self.verbose:
+                print(f"  {courier} takes {len(courier.trip)} order(s), free at "
+                      f"{courier.free_time.strftime('%H:%M:%S')}")
+            self.event_calendar.add_event(Event(
+                courier.free_time,
+                EventType.DELIVERY_COMPLETION,
+                courier,
+                self._handle_delivery_completion
+            ))
+
+    def _handle_delivery_completion(self, courier):
+        if self.verbose:
+            print(f"SPECIAL EVENT: {courier} finished a trip")
+
+        for order in self.delivery.complete_trip(courier):
+            if self.verbose:
+                print(f"  Order delivered: {order}")
+            if self.event_log is not None:
+                self.event_log.emit(INFO, self.current_time, "delivered", order)
+            self.stats_collector.record_order_delivered(order)
+
+        self._dispatch_couriers()
+
+    def add_kitchen_line(self) -> KitchenLine:
+        """Opens one more line like the last one, which takes work from the buffer at once"""
+        kitchen = KitchenLine(len(self.kitchen_lines), self.line_service_times[-1], self.rng,
+                              self.line_service_laws[-1], self.item_model, self.batch_growth)
+        self.kitchen_lines.append(kitchen)
+        self.line_service_times.append(kitchen.mean_service_time)
+        self.line_service_laws.append(kitchen.service_law)
+        self.num_kitchens += 1
+        self.routing_policy.add_line(kitchen, self.current_time)
+
+        self.selection_dispatcher.process_available_kitchens(self.buffer, [kitchen], self.current_time)
+        if kitchen.is_busy:
+            self._schedule_kitchen_completion(kitchen)
+        return kitchen
+
+    def grow_buffer(self, slots: int = 1):
+        self.buffer.grow(slots)
+        self.buffer_capacity += slots
+        self.stats_collector.buffer_capacity = self.buffer_capacity
+
+    def set_mean_arrival_time(self, mean_arrival_time: float):
+        """Takes effect from the next drawn interval; arrivals already scheduled keep their time"""
+        if self.trace is not None:
+            raise ValueError("Arrivals come from a trace")
+        self.mean_arrival_time = mean_arrival_time
+        for profile in self.arrival_profiles:
+            profile.set_mean(mean_arrival_time)
+
     def run_step(self) -> bool:
         if self.event_calendar.is_empty():
-            print("No more events in calendar")
+            if self.verbose:
+                print("No more events in calendar")
             return False
 
         next_event = self.event_calendar.get_next_event()
@@ -130,16 +427,18 @@ class SpecialEventSimulator:
         return True
 
     def _process_special_event(self, event: Event):
-        print(f"\n{'=' * 60}")
-        print(f"STEP {self.step_count} - SPECIAL EVENT PROCESSING")
-        print(f"Time: {self.current_time.strftime('%H:%M:%S')}")
-        print(f"Event Type: {event.event_type.value}")
-        print(f"{'=' * 60}")
+        if self.verbose:
+            print(f"\n{'=' * 60}")
+            print(f"STEP {self.step_count} - SPECIAL EVENT PROCESSING")
+            print(f"Time: {self.current_time.strftime('%H:%M:%S')}")
+            print(f"Event Type: {event.event_type.value}")
+            print(f"{'=' * 60}")
 
         if event.callback:
             if event.event_type == EventType.ORDER_ARRIVAL:
                 event.callback(**event.data)
-            elif event.event_type == EventType.KITCHEN_COMPLETION:
+            elif event.event_type in (EventType.KITCHEN_COMPLETION, EventType.ORDER_TIMEOUT,
+                                      EventType.DELIVERY_COMPLETION):
                 event.callback(event.data)
 
     def _update_system_state(self):
@@ -147,10 +446,105 @@ class SpecialEventSimulator:
         self.stats_collector.update_system_state(
             self.buffer.count,
             busy_kitchens,
-            self.kitchen_lines
+            self.kitchen_lines,
+            self.current_time
         )
 
-        self.display_current_state()
+        if self.verbose:
+            self.display_current_state()
+
+    def checkpoint(self) -> bytes:
+        """
+        The state of the run for restore(). The append-only statistics histories,
+        the event history and the event log are left out: restore() cuts the
+        live histories back to their lengths at this point instead, so a
+        checkpoint stays small however long the session has run. An arrival
+        trace is kept as the number of records read; restore() reopens it there.
+        """
+        history = self.stats_collector.detach_history()
+        event_history, event_log = self.event_history, self.event_log
+        trace_records = self.trace_records
+        self.event_history = self.trace_records = None
+        self._set_event_log(None)
+        try:
+            lengths = {name: len(values) for name, values in history.items()}
+            recorded = event_history.total_recorded if event_history is not None else 0
+            return pickle.dumps((self, lengths, recorded), pickle.HIGHEST_PROTOCOL)
+        finally:
+            self.stats_collector.attach_history(history)
+            self.event_history = event_history
+            self.trace_records = trace_records
+            self._set_event_log(event_log)
+
+    def restore(self, checkpoint: bytes):
+        """
+        Returns this simulator to a checkpoint taken earlier in the same run.
+        The state is swapped in place, so references to the simulator stay valid;
+        output settings are kept, since a checkpoint may be taken mid run_until.
+        """
+        restored, lengths, recorded = pickle.loads(checkpoint)
+        history = self.stats_collector.detach_history()
+        event_history, event_log = self.event_history, self.event_log
+        verbose = self.verbose, self.placement_dispatcher.verbose
+
+        self.__dict__.clear()
+        self.__dict__.update(restored.__dict__)
+        # Callbacks were pickled bound to the copy; bind them to this object
+        for event in self.event_calendar.events:
+            if getattr(event.callback, "__self__", None) is restored:
+                event.callback = getattr(self, event.callback.__name__)
+        self.selection_dispatcher.on_dispatch = self._on_order_dispatched_from_buffer
+        if self.trace is not None:
+            self.trace_records = self.trace.records(self.trace_position)
+
+        self.stats_collector.attach_history(history, lengths)
+        if event_history is not None:
+            event_history.truncate(recorded)
+        self.event_history = event_history
+        self._set_event_log(event_log)
+        self.verbose, self.placement_dispatcher.verbose = verbose
+
+    def _set_event_log(self, event_log):
+        self.event_log = event_log
+        self.placement_dispatcher.event_log = event_log
+        self.selection_dispatcher.event_log = event_log
+
+    def run_until(self, until=None, breakpoints: Sequence[Breakpoint] = ()) -> Optional[str]:
+        """
+        Processes events without printing anything until `until` or a breakpoint
+        stops it, and returns what stopped it (None when the calendar ran out).
+        until is a predicate of the simulator checked after every event, a
+        number of events, or a datetime: the run then stops before the first
+        event after that time, leaving the clock at the last processed event.
+        """
+        conditions = list(breakpoints)
+        end_time = None
+        if isinstance(until, datetime):
+            end_time = until
+        elif isinstance(until, int):
+            conditions.append(EventCount(until))
+        elif callable(until):
+            conditions.append(Condition(until))
+        elif until is not None:
+            raise ValueError(f"Cannot run until {until!r}")
+        for condition in conditions:
+            condition.arm(self)
+
+        verbose = self.verbose
+        self.verbose = self.placement_dispatcher.verbose = False
+        try:
+            while True:
+                next_event = self.event_calendar.peek_next_event()
+                if next_event is None:
+                    return None
+                if end_time is not None and next_event.event_time > end_time:
+                    return f"time {end_time.strftime('%H:%M:%S')}"
+                self.run_step()
+                for condition in conditions:
+                    if condition.hit(self):
+                        return condition.describe(self)
+        finally:
+            self.verbose = self.placement_dispatcher.verbose = verbose
 
     def run_automatic(self, max_orders: int = 1000, target_precision: bool = True):
         print(f"\nAUTOMATIC SIMULATION STARTED")
@@ -202,7 +596,7 @@ class SpecialEventSimulator:
 
     def _display_event_calendar(self):
         print(f"\nEVENT CALENDAR (next 5 events):")
-        events_to_show = sorted(self.event_calendar.events)[:5]
+        events_to_show = self.event_calendar.get_upcoming_events(5)
         for i, event in enumerate(events_to_show):
             time_str = event.event_time.strftime('%H:%M:%S')
             print(f"  {i + 1}. {time_str} - {event.event_type.value}")
@@ -212,7 +606,7 @@ class SpecialEventSimulator:
         for kitchen in self.kitchen_lines:
             status = "FREE" if not kitchen.is_busy else "BUSY"
             if kitchen.is_busy and kitchen.current_order:
-                remaining = kitchen.get_remaining_time()
+                remaining = kitchen.get_remaining_time(self.current_time)
                 if remaining:
                     rem_sec = max(0, remaining.total_seconds())
                     print(f"  K{kitchen.line_id}: {status} - {kitchen.current_order.order_id[:8]} "
@@ -236,14 +630,110 @@ class SpecialEventSimulator:
             print(f"  Completed: {stats['completed_orders']}")
             print(f"  In Buffer: {stats['buffered_orders']}")
             print(f"  Rejected: {stats['rejected_orders']}")
+            if self.max_wait_minutes is not None:
+                print(f"  Abandoned: {stats['abandoned_orders']}")
             print(f"  Kitchen Utilization: {stats.get('kitchen_utilization', 0):.1%}")
             print(f"  Buffer Utilization: {stats.get('buffer_utilization', 0):.1%}")
             print(f"  Rejection Rate: {stats.get('rejection_rate', 0):.1%}")
+            if self.max_wait_minutes is not None:
+                print(f"  Abandonment Rate: {stats.get('abandonment_rate', 0):.1%}")
             print(f"  Avg Wait Time: {stats.get('avg_wait_time', 0):.1f} min")
+            if self.delivery is not None:
+                print(f"  Delivered: {stats['delivered_orders']} "
+                      f"(avg order-to-door {stats['avg_total_time']:.1f} min)")
         except Exception as e:
             print(f"\nError displaying statistics: {e}")
             print("  Statistics temporarily unavailable")
 
+    def get_results(self, include_history: bool = False) -> Dict[str, Any]:
+        stats = self.stats_collector.get_current_stats()
+        simulation_time = (self.current_time - self.start_time).total_seconds() / 60
+        result = {
+            "params": self.get_params(),
+            "seed": self.seed,
+            "metrics": {
+                "total_orders": stats['total_orders'],
+                "completed_orders": stats['completed_orders'],
+                "throughput_per_hour": stats['completed_orders'] / max(1e-9, simulation_time / 60),
+                "rejected_orders": stats['rejected_orders'],
+                "kitchen_utilization": stats['kitchen_utilization'],
+                "rejection_rate": stats['rejection_rate'],
+                "abandoned_orders": stats['abandoned_orders'],
+                "abandonment_rate": stats['abandonment_rate'],
+                "avg_abandon_wait": stats['avg_abandon_wait'],
+                "avg_wait_time": stats['avg_wait_time'],
+                "wait_p50": stats['wait_p50'],
+                "wait_p95": stats['wait_p95'],
+                "wait_p99": stats['wait_p99'],
+                "avg_batch_size": (sum(k.batch_orders_served for k in self.kitchen_lines) /
+                                   max(1, sum(k.batches_served for k in self.kitchen_lines))),
+                "system_load": self.calculate_system_load(),
+                "simulation_time": simulation_time,
+                "events": self.step_count
+            },
+            "sketches": self.stats_collector.get_sketches()
+        }
+
+        if self.delivery is not None:
+            delivery_stats = self.stats_collector.get_delivery_stats()
+            delivery_stats.update(self.delivery.get_stats(self.current_time))
+            result["metrics"].update(delivery_stats)
+
+        windows = self.stats_collector.get_window_stats()
+        if windows:
+            result["windows"] = windows
+
+        classes = self.stats_collector.get_class_stats()
+        if classes:
+            result["classes"] = classes
+
+        if include_history:
+            collector = self.stats_collector
+            result["history"] = {
+                "time": [(t - collector.start_time).total_seconds() / 60 for t in collector.timestamps],
+                "utilization": list(collector.utilization_history),
+                "buffer_usage": list(collector.buffer_usage_history),
+                "wait_time": list(collector.wait_time_history),
+                "rejections": list(collector.rejection_history)
+            }
+
+        return result
+
+    def get_params(self) -> Dict[str, Any]:
+        return {
+            "num_sources": self.num_sources,
+            "num_kitchens": self.num_kitchens,
+            "buffer_capacity": self.buffer_capacity,
+            "mean_arrival_time": self.mean_arrival_time,
+            "mean_service_time": self.mean_service_time,
+            "max_wait_minutes": self.max_wait_minutes,
+            "arrival_profile": self._arrival_profile_name(),
+            "line_service_times": ",".join(repr(value) for value in self.line_service_times),
+            "line_service_laws": ",".join(self.line_service_laws),
+            "routing_policy": self.routing_policy.name,
+            "priority_mix": self._priority_mix_name(),
+            "arrival_trace": self.arrival_trace,
+            "prep_stations": self.prep_stations,
+            "batch_size": self.batch_size,
+            "batch_growth": self.batch_growth,
+            "num_couriers": self.num_couriers,
+            "courier_speed": self.delivery.speed_kmh if self.delivery else None,
+            "courier_capacity": self.delivery.capacity if self.delivery else None,
+            "courier_radius": self.delivery.batch_radius if self.delivery else None,
+            "random_streams": self.random_streams
+        }
+
+    def _arrival_profile_name(self) -> str:
+        names = [profile.name for profile in self.arrival_profiles]
+        if len(set(names)) == 1:
+            return names[0]
+        return ",".join(names)
+
+    def _priority_mix_name(self) -> Optional[str]:
+        if not self.priority_mix:
+            return None
+        return ",".join(f"{priority.name.lower()}={share!r}" for priority, share in self.priority_mix)
+
     def calculate_system_load(self) -> float:
         total_time = (self.current_time - self.start_time).total_seconds() / 60
 
@@ -0,0 +1,242 @@
+import csv
+import itertools
+import os
+import struct
+from datetime import datetime, timezone
+from typing import Iterator, NamedTuple, Optional, Tuple
+
+BINARY_MAGIC = b"ODTRACE3"
+# Magic, record count, address table size and whether the minutes count from
+# midnight (a timestamp log); the record count stays UNFINISHED until
+# conversion completes
+BINARY_HEADER = struct.Struct("<8sQQ?")
+BINARY_RECORD = struct.Struct("<dIII")
+UNFINISHED = 2 ** 64 - 1
+NO_ADDRESS = 2 ** 32 - 1
+# Address numbers with this bit set index the address table after the records;
+# below it a number N stands for "Address_N"
+NAMED_ADDRESS = 2 ** 31
+ADDRESS_LENGTH = struct.Struct("<H")
+# The file offset of every address in the table, stored at the end of the file
+ADDRESS_OFFSET = struct.Struct("<Q")
+
+
+class TraceRecord(NamedTuple):
+    minutes: float
+    source_id: int
+    item_count: int
+    address: Optional[str]
+
+
+class CsvTrace:
+    """
+    Order log in CSV with a header row, read as a stream.
+
+    The time column is either "minutes" (offset from the simulation start) or
+    "timestamp" (ISO-8601 or Unix seconds), measured from midnight of the first
+    record's day; the simulator replays such a log from midnight of its own
+    first day, so the start hour, time-of-day profiles and windows line up
+    with the log.
+    Timestamps are read in the first record's UTC offset, or in UTC if it has
+    none: stamps with another offset are converted to it, and Unix seconds
+    and stamps without an offset are taken as UTC or as in that zone.
+    Optional columns: "source", "items" (item count) and "address".
+    Records must be sorted by time.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @property
+    def from_midnight(self) -> bool:
+        """Whether record minutes count from midnight rather than from the simulation start"""
+        with open(self.path, newline="", encoding="utf-8") as trace_file:
+            fieldnames = next(csv.reader(trace_file), [])
+        return "minutes" not in fieldnames and "timestamp" in fieldnames
+
+    def __iter__(self) -> Iterator[TraceRecord]:
+        with open(self.path, newline="", encoding="utf-8") as trace_file:
+            reader = csv.DictReader(trace_file)
+            if "minutes" in reader.fieldnames:
+                to_minutes = float
+            elif "timestamp" in reader.fieldnames:
+                to_minutes = self._timestamp_reader()
+            else:
+                raise ValueError(f"{self.path}: need a 'minutes' or 'timestamp' column")
+
+            time_column = "minutes" if "minutes" in reader.fieldnames else "timestamp"
+            previous = None
+            for row in reader:
+                minutes = to_minutes(row[time_column])
+                if previous is not None and minutes < previous:
+                    raise ValueError(f"{self.path}:{reader.line_num}: records are not sorted by time")
+                previous = minutes
+                yield TraceRecord(minutes, int(row.get("source") or 0), int(row.get("items") or 1),
+                                  row.get("address") or None)
+
+    def records(self, start: int = 0) -> Iterator[TraceRecord]:
+        """Records from number start on; the ones before are read and skipped"""
+        return itertools.islice(iter(self), start, None)
+
+    @staticmethod
+    def _timestamp_reader():
+        origin = zone = None
+
+        def to_minutes(value: str) -> float:
+            nonlocal origin, zone
+            try:
+                moment = datetime.fromtimestamp(float(value), timezone.utc)
+            except ValueError:
+                moment = datetime.fromisoformat(value)
+            if zone is None:
+                zone = moment.tzinfo or timezone.utc
+            if moment.tzinfo is None:
+                moment = moment.replace(tzinfo=zone)
+            moment = moment.astimezone(zone).replace(tzinfo=None)
+            if origin is None:
+                origin = datetime.combine(moment.date(), datetime.min.time())
+            return (moment - origin).total_seconds() / 60
+
+        return to_minutes
+
+    def fingerprint(self):
+        return trace_fingerprint(self.path)
+
+
+class BinaryTrace:
+    """
+    Fixed-size binary records (minutes, source, item count, address number)
+    after a header of magic and record count, walked through mmap: millions
+    of orders stay on disk and only the current record is decoded. Address
+    numbers below NAMED_ADDRESS are "Address_N", the model's own addresses;
+    other addresses are stored once in a table after the records, followed
+    by an index of their offsets, so a name is decoded only when a record
+    refers to it; NO_ADDRESS marks a record without one. Built from CSV by
+    convert_trace.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __iter__(self) -> Iterator[TraceRecord]:
+        return self.records()
+
+    def _check(self, header: bytes, size: int) -> Tuple[int, int]:
+        """Returns the record and address counts, or raises ValueError for a damaged or incomplete file"""
+        if len(header) < BINARY_HEADER.size:
+            raise ValueError(f"{self.path}: truncated binary order trace")
+        magic, count, address_count, _ = BINARY_HEADER.unpack_from(header)
+        if magic != BINARY_MAGIC:
+            raise ValueError(f"{self.path}: not a binary order trace")
+        if count == UNFINISHED:
+            raise ValueError(f"{self.path}: conversion of the trace did not finish")
+        if size < BINARY_HEADER.size + count * BINARY_RECORD.size + address_count * ADDRESS_OFFSET.size:
+            raise ValueError(f"{self.path}: truncated binary order trace")
+        return count, address_count
+
+    def record_count(self) -> int:
+        with open(self.path, "rb") as trace_file:
+            return self._check(trace_file.read(BINARY_HEADER.size), os.fstat(trace_file.fileno()).st_size)[0]
+
+    @property
+    def from_midnight(self) -> bool:
+        """Whether record minutes count from midnight rather than from the simulation start"""
+        with open(self.path, "rb") as trace_file:
+            return BINARY_HEADER.unpack(trace_file.read(BINARY_HEADER.size))[3]
+
+    def _address(self, data, table: int, index: int, number: int, address_count: int) -> str:
+        """Decodes address number of the table starting at table, through the offset index at index"""
+        if number >= address_count:
+            raise ValueError(f"{self.path}: address number out of the address table")
+        offset, = ADDRESS_OFFSET.unpack_from(data, index + number * ADDRESS_OFFSET.size)
+        if offset < table or offset + ADDRESS_LENGTH.size > index:
+            raise ValueError(f"{self.path}: damaged address table")
+        length, = ADDRESS_LENGTH.unpack_from(data, offset)
+        offset += ADDRESS_LENGTH.size
+        if offset + length > index:
+            raise ValueError(f"{self.path}: damaged address table")
+        return data[offset:offset + length].decode("utf-8")
+
+    def records(self, start: int = 0) -> Iterator[TraceRecord]:
+        """Records from number start on, found by offset"""
+        import mmap
+
+        with open(self.path, "rb") as trace_file:
+            if os.fstat(trace_file.fileno()).st_size < BINARY_HEADER.size:
+                raise ValueError(f"{self.path}: truncated binary order trace")
+            with mmap.mmap(trace_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                count, address_count = self._check(data[:BINARY_HEADER.size], len(data))
+                end = BINARY_HEADER.size + count * BINARY_RECORD.size
+                index = len(data) - address_count * ADDRESS_OFFSET.size
+                for offset in range(BINARY_HEADER.size + start * BINARY_RECORD.size, end, BINARY_RECORD.size):
+                    minutes, source_id, item_count, number = BINARY_RECORD.unpack_from(data, offset)
+                    if number == NO_ADDRESS:
+                        address = None
+                    elif number >= NAMED_ADDRESS:
+                        address = self._address(data, end, index, number - NAMED_ADDRESS, address_count)
+                    else:
+                        address = f"Address_{number}"
+                    yield TraceRecord(minutes, source_id, item_count, address)
+
+    def fingerprint(self):
+        return trace_fingerprint(self.path)
+
+
+def trace_fingerprint(path: str):
+    """Identifies the file contents for result caching without reading them"""
+    stat = os.stat(path)
+    return [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+
+
+def open_trace(path: str):
+    with open(path, "rb") as trace_file:
+        head = trace_file.read(len(BINARY_MAGIC))
+    if not head:
+        raise ValueError(f"{path}: empty order trace")
+    if BINARY_MAGIC.startswith(head):
+        trace = BinaryTrace(path)
+        trace.record_count()
+        return trace
+    if head[:-1] == BINARY_MAGIC[:-1]:
+        raise ValueError(f"{path}: binary order trace of another version; convert the CSV log again")
+    return CsvTrace(path)
+
+
+def _address_number(address: Optional[str], names: dict) -> int:
+    if address is None:
+        return NO_ADDRESS
+    digits = address[len("Address_"):]
+    if address.startswith("Address_") and digits.isdigit() and str(int(digits)) == digits and \
+            int(digits) < NAMED_ADDRESS:
+        return int(digits)
+    if address not in names:
+        if len(names) >= NO_ADDRESS - NAMED_ADDRESS:
+            raise ValueError("Too many distinct addresses for the binary trace format")
+        names[address] = len(names)
+    return NAMED_ADDRESS + names[address]
+
+
+def convert_trace(csv_path: str, binary_path: str) -> int:
+    """Streams a CSV trace into the binary format; returns the number of records"""
+    names = {}
+    count = 0
+    trace = CsvTrace(csv_path)
+    from_midnight = trace.from_midnight
+    with open(binary_path, "wb") as output:
+        output.write(BINARY_HEADER.pack(BINARY_MAGIC, UNFINISHED, 0, from_midnight))
+        for record in trace:
+            output.write(BINARY_RECORD.pack(record.minutes, record.source_id, record.item_count,
+                                            _address_number(record.address, names)))
+            count += 1
+        offsets = []
+        for name in names:
+            encoded = name.encode("utf-8")
+            if len(encoded) >= 2 ** 16:
+                raise ValueError(f"Address too long for the binary trace format: {name[:40]}...")
+            offsets.append(output.tell())
+            output.write(ADDRESS_LENGTH.pack(len(encoded)) + encoded)
+        for offset in offsets:
+            output.write(ADDRESS_OFFSET.pack(offset))
+        output.seek(0)
+        output.write(BINARY_HEADER.pack(BINARY_MAGIC, count, len(names), from_midnight))
+    return count
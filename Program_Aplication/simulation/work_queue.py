@@ -0,0 +1,254 @@
+import json
+import os
+import socket
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from .result_cache import canonical_key
+from .runner import expand_grid, run_simulation
+
+DEFAULT_LEASE_SECONDS = 600
+
+
+class SweepQueue:
+    """
+    Work queue of sweep points in one SQLite file.
+
+    Every point (parameters, seed, stopping rule) is an item that a worker
+    leases for lease_seconds, runs and completes. Submitting the same grid
+    again adds only missing points, and a base seed drawn for the first
+    submission is kept in the file so later ones find the same points.
+    Finished points are never leased again. A worker renews its lease while
+    the run goes on, so only a lease whose worker died expires, and it is
+    then handed to the next worker. The file uses the rollback journal rather than WAL, so workers on
+    several hosts can share it over a network directory that supports file
+    locks.
+    """
+
+    def __init__(self, path: str, max_attempts: int = 3):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._connection = None
+
+    def _connect(self):
+        if self._connection is None:
+            import sqlite3
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS items ("
+                "id INTEGER PRIMARY KEY, key TEXT UNIQUE NOT NULL, params TEXT NOT NULL, "
+                "seed INTEGER, stopping TEXT NOT NULL, status TEXT NOT NULL DEFAULT 'pending', "
+                "worker TEXT, lease_expires REAL, attempts INTEGER NOT NULL DEFAULT 0, "
+                "result TEXT, error TEXT)"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS items_status ON items (status, lease_expires)")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS settings (name TEXT PRIMARY KEY, value TEXT)")
+        return self._connection
+
+    def _transaction(self, statements):
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            value = statements(connection)
+            connection.execute("COMMIT")
+            return value
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def base_seed(self, seed: int) -> int:
+        """The base seed of the queue: the one stored by an earlier submission, else seed, now stored"""
+        def read_or_store(connection):
+            connection.execute("INSERT OR IGNORE INTO settings (name, value) VALUES ('base_seed', ?)", (str(seed),))
+            return int(connection.execute("SELECT value FROM settings WHERE name = 'base_seed'").fetchone()[0])
+
+        return self._transaction(read_or_store)
+
+    def submit(self, grid: Dict[str, List[Any]], seeds: List[int], **stopping) -> int:
+        """Adds every grid point and seed; returns how many items were new"""
+        rows = []
+        for params in expand_grid(grid):
+            for seed in seeds:
+                key = canonical_key({"params": params, "seed": seed, "stopping": stopping})
+                rows.append((key, json.dumps(params), seed, json.dumps(stopping)))
+
+        def insert(connection):
+            before = connection.total_changes
+            connection.executemany(
+                "INSERT OR IGNORE INTO items (key, params, seed, stopping) VALUES (?, ?, ?, ?)", rows)
+            return connection.total_changes - before
+
+        return self._transaction(insert)
+
+    def lease(self, worker: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Optional[Dict[str, Any]]:
+        def take(connection):
+            now = time.time()
+            row = connection.execute(
+                "SELECT id, params, seed, stopping FROM items "
+                "WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?) "
+                "ORDER BY id LIMIT 1", (now,)
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE items SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1 "
+                "WHERE id = ?", (worker, now + lease_seconds, row[0])
+            )
+            return {"id": row[0], "params": json.loads(row[1]), "seed": row[2], "stopping": json.loads(row[3])}
+
+        return self._transaction(take)
+
+    def renew(self, item_id: int, worker: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        """Extends a lease the worker still holds; False once it has lost it"""
+        return self._transaction(lambda connection: connection.execute(
+            "UPDATE items SET lease_expires = ? WHERE id = ? AND status = 'leased' AND worker = ?",
+            (time.time() + lease_seconds, item_id, worker)
+        ).rowcount) > 0
+
+    def complete(self, item_id: int, result: Dict[str, Any]):
+        """Runs are deterministic, so a late duplicate completion is harmless and ignored"""
+        self._transaction(lambda connection: connection.execute(
+            "UPDATE items SET status = 'done', result = ?, error = NULL, lease_expires = NULL "
+            "WHERE id = ? AND status != 'done'", (json.dumps(result, ensure_ascii=False), item_id)
+        ))
+
+    def fail(self, item_id: int, error: str):
+        self._transaction(lambda connection: connection.execute(
+            "UPDATE items SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "error = ?, lease_expires = NULL WHERE id = ? AND status = 'leased'",
+            (self.max_attempts, error, item_id)
+        ))
+
+    def reset_failed(self) -> int:
+        return self._transaction(lambda connection: connection.execute(
+            "UPDATE items SET status = 'pending', attempts = 0 WHERE status = 'failed'").rowcount)
+
+    def progress(self) -> Dict[str, int]:
+        counts = {"pending": 0, "leased": 0, "expired": 0, "done": 0, "failed": 0}
+        rows = self._connect().execute(
+            "SELECT CASE WHEN status = 'leased' AND lease_expires < ? THEN 'expired' ELSE status END, COUNT(*) "
+            "FROM items GROUP BY 1", (time.time(),)
+        )
+        for status, count in rows:
+            counts[status] = count
+        return counts
+
+    def results(self) -> Iterator[Dict[str, Any]]:
+        for (result,) in self._connect().execute("SELECT result FROM items WHERE status = 'done' ORDER BY id"):
+            yield json.loads(result)
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+def default_worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LeaseKeeper:
+    """
+    Renews a lease every third of lease_seconds from a background thread while
+    the item runs, so runs longer than the lease are not handed to a second
+    worker. The thread has its own connection, since SQLite connections stay
+    in the thread that opened them.
+    """
+
+    def __init__(self, path: str, item_id: int, worker: str, lease_seconds: float):
+        self.path = path
+        self.item_id = item_id
+        self.worker = worker
+        self.lease_seconds = lease_seconds
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._renew, name="lease-keeper", daemon=True)
+
+    def __enter__(self) -> "LeaseKeeper":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopping.set()
+        self.thread.join()
+
+    def _renew(self):
+        queue = SweepQueue(self.path)
+        try:
+            while not self.stopping.wait(self.lease_seconds / 3):
+                if not queue.renew(self.item_id, self.worker, self.lease_seconds):
+                    return
+        finally:
+            queue.close()
+
+
+def run_worker(path: str, worker: Optional[str] = None, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+               wait: bool = True, poll_seconds: float = 1.0, cache_dir: Optional[str] = None) -> int:
+    """
+    Leases and runs items until none are left; returns how many this worker finished.
+    With wait, a worker that finds only leases held by others keeps polling so it can
+    take over the ones that expire.
+    """
+    queue = SweepQueue(path)
+    worker = worker or default_worker_name()
+
+    cache = None
+    if cache_dir is not None:
+        from .result_cache import ResultCache
+        cache = ResultCache(cache_dir or None)
+
+    finished = 0
+    try:
+        while True:
+            item = queue.lease(worker, lease_seconds)
+            if item is None:
+                progress = queue.progress()
+                if not wait or progress["leased"] + progress["expired"] == 0:
+                    return finished
+                time.sleep(poll_seconds)
+                continue
+
+            try:
+                if cache is not None:
+                    item["stopping"]["cache"] = cache
+                with LeaseKeeper(path, item["id"], worker, lease_seconds):
+                    result = run_simulation(item["params"], item["seed"], **item["stopping"])
+            except Exception as error:
+                queue.fail(item["id"], f"{type(error).__name__}: {error}")
+                continue
+            queue.complete(item["id"], result)
+            finished += 1
+    finally:
+        queue.close()
+        if cache is not None:
+            cache.close()
+
+
+def run_queue_sweep(path: str, grid: Dict[str, List[Any]], seeds: List[int], workers: int = 1,
+                    lease_seconds: float = DEFAULT_LEASE_SECONDS, cache_dir: Optional[str] = None,
+                    **stopping) -> List[Dict[str, Any]]:
+    """Submits the grid and drains the queue with local worker processes"""
+    queue = SweepQueue(path)
+    queue.submit(grid, seeds, **stopping)
+    queue.close()
+    drain_queue(path, workers, lease_seconds, cache_dir=cache_dir)
+
+    queue = SweepQueue(path)
+    try:
+        return list(queue.results())
+    finally:
+        queue.close()
+
+
+def drain_queue(path: str, workers: int = 1, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                wait: bool = True, cache_dir: Optional[str] = None) -> int:
+    if workers <= 1:
+        return run_worker(path, lease_seconds=lease_seconds, wait=wait, cache_dir=cache_dir)
+
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_worker, path, None, lease_seconds, wait, 1.0, cache_dir)
+                   for _ in range(workers)]
+        return sum(future.result() for future in futures)
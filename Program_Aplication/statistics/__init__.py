@@ -1,6 +1,13 @@
-from .stats_collector import StatisticsCollector, SourceStatistics
+from .._lazy import lazy_exports
 
-__all__ = [
-    'StatisticsCollector',
-    'SourceStatistics'
-]
\ No newline at end of file
+__getattr__, __dir__, __all__ = lazy_exports(__name__, {
+    'StatisticsCollector': '.stats_collector',
+    'SourceStatistics': '.stats_collector',
+    'ClassStatistics': '.stats_collector',
+    'LogHistogram': '.quantile_sketch',
+    'merge_sketches': '.quantile_sketch',
+    'RunningMoments': '.confidence',
+    'mean_confidence_interval': '.confidence',
+    'sample_variance': '.confidence',
+    't_quantile': '.confidence'
+})
\ No newline at end of file
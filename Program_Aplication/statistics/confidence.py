@@ -0,0 +1,81 @@
+import math
+from typing import Dict, List, Tuple
+
+
+T_QUANTILES = {
+    0.9: [6.314, 2.920, 2.353, 2.132, 2.015, 1.943, 1.895, 1.860, 1.833, 1.812,
+          1.796, 1.782, 1.771, 1.761, 1.753, 1.746, 1.740, 1.734, 1.729, 1.725,
+          1.721, 1.717, 1.714, 1.711, 1.708, 1.706, 1.703, 1.701, 1.699, 1.697],
+    0.95: [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+           2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+           2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042],
+    0.99: [63.657, 9.925, 5.841, 4.604, 4.032, 3.707, 3.499, 3.355, 3.250, 3.169,
+           3.106, 3.055, 3.012, 2.977, 2.947, 2.921, 2.898, 2.878, 2.861, 2.845,
+           2.831, 2.819, 2.807, 2.797, 2.787, 2.779, 2.771, 2.763, 2.756, 2.750]
+}
+
+NORMAL_QUANTILES = {0.9: 1.643, 0.95: 1.960, 0.99: 2.576}
+
+
+def t_quantile(degrees_of_freedom: int, confidence: float = 0.9) -> float:
+    if confidence not in T_QUANTILES:
+        raise ValueError(f"Unsupported confidence level: {confidence}")
+    if degrees_of_freedom < 1:
+        return math.inf
+
+    table = T_QUANTILES[confidence]
+    if degrees_of_freedom <= len(table):
+        return table[degrees_of_freedom - 1]
+
+    z = NORMAL_QUANTILES[confidence]
+    return z + (z ** 3 + z) / (4 * degrees_of_freedom)
+
+
+def sample_variance(values: List[float]) -> float:
+    mean = sum(values) / len(values)
+    return sum((x - mean) ** 2 for x in values) / (len(values) - 1)
+
+
+class RunningMoments:
+    """
+    Welford's running mean and sum of squared deviations. Unlike sum and sum
+    of squares, it does not lose the variance to cancellation when the mean
+    is large against the spread.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def variance(self) -> float:
+        """Sample variance, 0 below two values"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+
+def mean_confidence_interval(values: List[float], confidence: float = 0.9) -> Tuple[float, float]:
+    """Returns (mean, half_width) of the Student confidence interval."""
+    n = len(values)
+    if n == 0:
+        return 0.0, math.inf
+
+    mean = sum(values) / n
+    if n < 2:
+        return mean, math.inf
+
+    variance = sum((x - mean) ** 2 for x in values) / (n - 1)
+    return mean, t_quantile(n - 1, confidence) * math.sqrt(variance / n)
+
+
+def summarize_samples(samples: Dict[str, List[float]], confidence: float = 0.9) -> Dict[str, Dict[str, float]]:
+    summary = {}
+    for name, values in samples.items():
+        mean, half_width = mean_confidence_interval(values, confidence)
+        summary[name] = {"mean": mean, "half_width": half_width, "n": len(values)}
+    return summary
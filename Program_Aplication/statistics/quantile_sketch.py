@@ -0,0 +1,137 @@
+import math
+from typing import Any, Dict, Iterable, Optional
+
+
+class LogHistogram:
+    """
+    HDR-style quantile sketch with logarithmic buckets.
+
+    Bucket i holds the values in (gamma^(i-1), gamma^i] with
+    gamma = (1 + a) / (1 - a), so every quantile comes back within relative
+    error a. Values below min_value go to a zero bucket and values above
+    max_value are clamped, which fixes the number of buckets in advance.
+    add is O(1), quantile walks the buckets, and two sketches with the same
+    settings merge exactly by adding their counts.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-3,
+                 max_value: float = 1e5):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("Relative accuracy must be between 0 and 1")
+        if not 0 < min_value < max_value:
+            raise ValueError("Need 0 < min_value < max_value")
+
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.max_value = max_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.offset = self._index(min_value)
+        self.counts = [0] * (self._index(max_value) - self.offset + 1)
+
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def _index(self, value: float) -> int:
+        return math.ceil(math.log(value) / self.log_gamma)
+
+    def _bucket_value(self, index: int) -> float:
+        return 2 * self.gamma ** (index + self.offset) / (self.gamma + 1)
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+        if value < self.min_value:
+            self.zero_count += 1
+        else:
+            self.counts[self._index(min(value, self.max_value)) - self.offset] += 1
+
+    def quantile(self, q: float) -> float:
+        if not 0 <= q <= 1:
+            raise ValueError("Quantile must be between 0 and 1")
+        if self.count == 0:
+            return 0.0
+
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return max(0.0, self.min)
+
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen > rank:
+                return min(max(self._bucket_value(index), self.min), self.max)
+        return self.max
+
+    def quantiles(self, qs: Iterable[float] = (0.5, 0.95, 0.99)) -> Dict[str, float]:
+        return {f"p{round(q * 100):g}": self.quantile(q) for q in qs}
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def merge(self, other: "LogHistogram") -> "LogHistogram":
+        if (other.relative_accuracy, other.min_value, other.max_value) != \
+                (self.relative_accuracy, self.min_value, self.max_value):
+            raise ValueError("Only sketches with the same accuracy and range can be merged")
+
+        for index, bucket_count in enumerate(other.counts):
+            if bucket_count:
+                self.counts[index] += bucket_count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Compact form for JSON results: only the occupied bucket range is stored"""
+        occupied = [index for index, bucket_count in enumerate(self.counts) if bucket_count]
+        first = occupied[0] if occupied else 0
+        last = occupied[-1] + 1 if occupied else 0
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "min_value": self.min_value,
+            "max_value": self.max_value,
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+            "first_bucket": first,
+            "counts": self.counts[first:last]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LogHistogram":
+        sketch = cls(data["relative_accuracy"], data["min_value"], data["max_value"])
+        first = data["first_bucket"]
+        sketch.counts[first:first + len(data["counts"])] = data["counts"]
+        sketch.zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        sketch.total = data["total"]
+        sketch.min = data["min"]
+        sketch.max = data["max"]
+        return sketch
+
+
+def merge_sketches(sketches: Iterable[Any]) -> Optional[LogHistogram]:
+    """Merges sketches or their to_dict forms into a new sketch"""
+    merged = None
+    for sketch in sketches:
+        if isinstance(sketch, dict):
+            sketch = LogHistogram.from_dict(sketch)
+        if merged is None:
+            merged = LogHistogram(sketch.relative_accuracy, sketch.min_value, sketch.max_value)
+        merged.merge(sketch)
+    return merged
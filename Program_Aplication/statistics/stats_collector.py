@@ -1,34 +1,95 @@
+import bisect
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
-from models.order import Order
-from models.kitchen import KitchenLine
+from typing import List, Dict, Any, Optional, Tuple
+from ..models.order import Order
+from ..models.kitchen import KitchenLine
+from .confidence import RunningMoments
+from .quantile_sketch import LogHistogram
+
+PERCENTILES = (0.5, 0.95, 0.99)
+HISTORY_FIELDS = ("utilization_history", "buffer_usage_history", "wait_time_history",
+                  "rejection_history", "load_history", "timestamps")
 
 
 class SourceStatistics:
     def __init__(self, source_id: int):
         self.source_id = source_id
         self.generated_orders = 0
+        self.direct_orders = 0
         self.completed_orders = 0
         self.rejected_orders = 0
+        self.abandoned_orders = 0
         self.buffered_orders = 0
         self.total_wait_time = timedelta(0)
+        self.total_abandon_wait = timedelta(0)
+        self.total_service_time = timedelta(0)
+        self.wait_moments = RunningMoments()
+        self.service_moments = RunningMoments()
+
+
+class WindowStatistics:
+    def __init__(self, label: str, start_minute: float, end_minute: float):
+        self.label = label
+        self.start_minute = start_minute
+        self.end_minute = end_minute
+        self.generated_orders = 0
+        self.completed_orders = 0
+        self.rejected_orders = 0
+        self.abandoned_orders = 0
+        self.total_wait_time = timedelta(0)
+
+
+class ClassStatistics:
+    def __init__(self, priority):
+        self.priority = priority
+        self.generated_orders = 0
+        self.completed_orders = 0
+        self.rejected_orders = 0
+        self.abandoned_orders = 0
+        self.total_wait_time = timedelta(0)
         self.total_service_time = timedelta(0)
-        self.wait_times: List[float] = []
-        self.service_times: List[float] = []
+        self.max_wait_time = timedelta(0)
+        self.wait_sketch = LogHistogram()
 
 
 class StatisticsCollector:
-    def __init__(self):
-        self.start_time = datetime.now()
+    def __init__(self, start_time: Optional[datetime] = None, buffer_capacity: int = 20,
+                 keep_history: bool = True, time_windows: Optional[List[Tuple[str, float, float]]] = None,
+                 window_period: float = 24 * 60, priority_classes: bool = False,
+                 delivery: bool = False):
+        self.start_time = start_time or datetime.now()
         self.sources: Dict[int, SourceStatistics] = {}
+        self.buffer_capacity = buffer_capacity
+        self.keep_history = keep_history
 
-        self.kitchen_busy_time = [timedelta(0) for _ in range(10)]
+        self.windows = [WindowStatistics(*window) for window in (time_windows or [])]
+        self.window_starts = [window.start_minute for window in self.windows]
+        self.window_period = window_period
+        self.window_origin = datetime.combine(self.start_time.date(), datetime.min.time())
+
+        self.wait_sketch = LogHistogram()
+        self.service_sketch = LogHistogram()
+        self.system_sketch = LogHistogram()
+
+        self.priority_classes = priority_classes
+        self.classes: Dict[int, ClassStatistics] = {}
+
+        self.delivery = delivery
+        self.delivered_orders = 0
+        self.total_pickup_wait = timedelta(0)
+        self.delivery_sketch = LogHistogram()
+        self.total_sketch = LogHistogram()
+
+        self.kitchen_busy_time: List[timedelta] = []
         self.last_update_time = self.start_time
-        self.kitchen_states = [False] * 10
+        self.kitchen_states: List[bool] = []
+        self.last_buffer_occupancy = 0
 
         self.total_orders = 0
+        self.direct_orders = 0
         self.completed_orders = 0
         self.rejected_orders = 0
+        self.abandoned_orders = 0
         self.buffered_orders = 0
 
         self.utilization_history: List[float] = []
@@ -38,18 +99,55 @@ class StatisticsCollector:
         self.load_history: List[float] = []
         self.timestamps: List[datetime] = []
 
+    def detach_history(self) -> Dict[str, List]:
+        """Takes the append-only histories out, leaving empty ones in their place"""
+        history = {name: getattr(self, name) for name in HISTORY_FIELDS}
+        for name in HISTORY_FIELDS:
+            setattr(self, name, [])
+        return history
+
+    def attach_history(self, history: Dict[str, List], lengths: Optional[Dict[str, int]] = None):
+        """Puts histories back, cut to the lengths they had at an earlier point of the same run"""
+        for name, values in history.items():
+            if lengths is not None:
+                del values[lengths[name]:]
+            setattr(self, name, values)
+
     def _get_source_stats(self, source_id: int) -> SourceStatistics:
         if source_id not in self.sources:
             self.sources[source_id] = SourceStatistics(source_id)
         return self.sources[source_id]
 
+    def _get_window_stats(self, order: Order) -> Optional[WindowStatistics]:
+        if not self.windows:
+            return None
+        minutes = (order.order_time - self.window_origin).total_seconds() / 60 % self.window_period
+        return self.windows[bisect.bisect_right(self.window_starts, minutes) - 1]
+
+    def _get_class_stats(self, order: Order) -> Optional[ClassStatistics]:
+        if not self.priority_classes:
+            return None
+        if order.priority not in self.classes:
+            self.classes[order.priority] = ClassStatistics(order.priority)
+        return self.classes[order.priority]
+
     def record_order_arrival(self, order: Order):
         self.total_orders += 1
         source_stats = self._get_source_stats(order.source_id)
         source_stats.generated_orders += 1
 
+        window_stats = self._get_window_stats(order)
+        if window_stats:
+            window_stats.generated_orders += 1
+
+        class_stats = self._get_class_stats(order)
+        if class_stats:
+            class_stats.generated_orders += 1
+
     def record_order_dispatched(self, order: Order, kitchen: KitchenLine):
-        self.record_order_arrival(order)
+        self.direct_orders += 1
+        source_stats = self._get_source_stats(order.source_id)
+        source_stats.direct_orders += 1
 
     def record_order_buffered(self, order: Order):
         self.buffered_orders += 1
@@ -65,28 +163,85 @@ class StatisticsCollector:
             wait_time = order.start_cooking_time - order.order_time
             service_time = order.completion_time - order.start_cooking_time
 
+            wait_minutes = wait_time.total_seconds() / 60
+            service_minutes = service_time.total_seconds() / 60
+
             source_stats.total_wait_time += wait_time
             source_stats.total_service_time += service_time
-            source_stats.wait_times.append(wait_time.total_seconds() / 60)
-            source_stats.service_times.append(service_time.total_seconds() / 60)
+            source_stats.wait_moments.add(wait_minutes)
+            source_stats.service_moments.add(service_minutes)
+
+            self.wait_sketch.add(wait_minutes)
+            self.service_sketch.add(service_minutes)
+            self.system_sketch.add(wait_minutes + service_minutes)
+
+            window_stats = self._get_window_stats(order)
+            if window_stats:
+                window_stats.completed_orders += 1
+                window_stats.total_wait_time += wait_time
+
+            class_stats = self._get_class_stats(order)
+            if class_stats:
+                class_stats.completed_orders += 1
+                class_stats.total_wait_time += wait_time
+                class_stats.total_service_time += service_time
+                class_stats.max_wait_time = max(class_stats.max_wait_time, wait_time)
+                class_stats.wait_sketch.add(wait_minutes)
+
+    def record_order_delivered(self, order: Order):
+        """Delivery runs from the end of cooking to the door, the total from the order to the door"""
+        self.delivered_orders += 1
+        self.total_pickup_wait += order.pickup_time - order.completion_time
+        self.delivery_sketch.add((order.delivered_time - order.completion_time).total_seconds() / 60)
+        self.total_sketch.add((order.delivered_time - order.order_time).total_seconds() / 60)
 
     def record_order_rejected(self, order: Order):
         self.rejected_orders += 1
         source_stats = self._get_source_stats(order.source_id)
         source_stats.rejected_orders += 1
 
+        window_stats = self._get_window_stats(order)
+        if window_stats:
+            window_stats.rejected_orders += 1
+
+        class_stats = self._get_class_stats(order)
+        if class_stats:
+            class_stats.rejected_orders += 1
+
+    def record_order_abandoned(self, order: Order, abandon_time: datetime):
+        self.abandoned_orders += 1
+        source_stats = self._get_source_stats(order.source_id)
+        source_stats.abandoned_orders += 1
+        source_stats.total_abandon_wait += abandon_time - order.order_time
+
+        window_stats = self._get_window_stats(order)
+        if window_stats:
+            window_stats.abandoned_orders += 1
+
+        class_stats = self._get_class_stats(order)
+        if class_stats:
+            class_stats.abandoned_orders += 1
+
     def update_system_state(self, buffer_occupancy: int, busy_kitchens: int,
-                            kitchen_lines: List[KitchenLine]):
-        current_time = datetime.now()
+                            kitchen_lines: List[KitchenLine],
+                            current_time: Optional[datetime] = None):
+        current_time = current_time or datetime.now()
         time_delta = current_time - self.last_update_time
 
+        while len(self.kitchen_states) < len(kitchen_lines):
+            self.kitchen_states.append(False)
+            self.kitchen_busy_time.append(timedelta(0))
+
         for i, kitchen in enumerate(kitchen_lines):
-            if i < len(self.kitchen_states):
-                if kitchen.is_busy:
-                    self.kitchen_busy_time[i] += time_delta
-                self.kitchen_states[i] = kitchen.is_busy
+            if self.kitchen_states[i]:
+                self.kitchen_busy_time[i] += time_delta
+            self.kitchen_states[i] = kitchen.is_busy
 
         self.last_update_time = current_time
+        self.last_buffer_occupancy = buffer_occupancy
+
+        if not self.keep_history:
+            return
 
         self.timestamps.append(current_time)
         self.buffer_usage_history.append(buffer_occupancy)
@@ -104,11 +259,11 @@ class StatisticsCollector:
         self.rejection_history.append(self.rejected_orders)
 
     def get_current_stats(self) -> Dict[str, Any]:
-        total_time = datetime.now() - self.start_time
+        total_time = self.last_update_time - self.start_time
         total_seconds = max(1, total_time.total_seconds())
 
         kitchen_utilization = 0.0
-        if total_seconds > 0:
+        if self.kitchen_busy_time:
             total_busy_seconds = 0.0
             for busy_time in self.kitchen_busy_time:
                 total_busy_seconds += busy_time.total_seconds()
@@ -120,38 +275,117 @@ class StatisticsCollector:
                                      for stats in self.sources.values())
             avg_wait_time = total_wait_seconds / 60 / self.completed_orders
 
-        buffer_utilization = 0.0
-        if self.buffer_usage_history:
-            buffer_utilization = self.buffer_usage_history[-1] / 20.0
+        buffer_utilization = self.last_buffer_occupancy / max(1, self.buffer_capacity)
 
         rejection_rate = self.rejected_orders / max(1, self.total_orders)
+        abandonment_rate = self.abandoned_orders / max(1, self.total_orders)
+
+        avg_abandon_wait = 0
+        if self.abandoned_orders > 0:
+            total_abandon_seconds = sum(stats.total_abandon_wait.total_seconds()
+                                        for stats in self.sources.values())
+            avg_abandon_wait = total_abandon_seconds / 60 / self.abandoned_orders
 
         total_minutes = total_seconds / 60
         orders_per_minute = self.total_orders / max(1, total_minutes)
 
-        return {
+        wait_percentiles = self.wait_sketch.quantiles(PERCENTILES)
+
+        stats = {
             "total_orders": self.total_orders,
             "completed_orders": self.completed_orders,
             "rejected_orders": self.rejected_orders,
+            "abandoned_orders": self.abandoned_orders,
             "buffered_orders": self.buffered_orders,
             "kitchen_utilization": kitchen_utilization,
             "buffer_utilization": buffer_utilization,
             "avg_wait_time": avg_wait_time,
             "rejection_rate": rejection_rate,
+            "abandonment_rate": abandonment_rate,
+            "avg_abandon_wait": avg_abandon_wait,
+            "wait_p50": wait_percentiles["p50"],
+            "wait_p95": wait_percentiles["p95"],
+            "wait_p99": wait_percentiles["p99"],
             "orders_per_minute": orders_per_minute
         }
+        if self.delivery:
+            stats.update(self.get_delivery_stats())
+        return stats
+
+    def get_delivery_stats(self) -> Dict[str, float]:
+        total_percentiles = self.total_sketch.quantiles(PERCENTILES)
+        return {
+            "delivered_orders": self.delivered_orders,
+            "avg_pickup_wait": self.total_pickup_wait.total_seconds() / 60 / max(1, self.delivered_orders),
+            "avg_delivery_time": self.delivery_sketch.mean(),
+            "delivery_p95": self.delivery_sketch.quantile(0.95),
+            "avg_total_time": self.total_sketch.mean(),
+            "total_p50": total_percentiles["p50"],
+            "total_p95": total_percentiles["p95"],
+            "total_p99": total_percentiles["p99"]
+        }
+
+    def get_percentiles(self) -> Dict[str, Dict[str, float]]:
+        return {name: sketch.quantiles(PERCENTILES) for name, sketch in self.get_sketches(False).items()}
+
+    def get_sketches(self, serialize: bool = True) -> Dict[str, Any]:
+        sketches = {"wait": self.wait_sketch, "service": self.service_sketch, "system": self.system_sketch}
+        if self.delivery:
+            sketches["delivery"] = self.delivery_sketch
+            sketches["total"] = self.total_sketch
+        if serialize:
+            return {name: sketch.to_dict() for name, sketch in sketches.items()}
+        return sketches
+
+    def get_window_stats(self) -> Dict[str, Dict[str, float]]:
+        window_reports = {}
+        for window in self.windows:
+            t_wait = 0
+            if window.completed_orders > 0:
+                t_wait = window.total_wait_time.total_seconds() / 60 / window.completed_orders
+            window_reports[window.label] = {
+                'generated': window.generated_orders,
+                'p_reject': window.rejected_orders / max(1, window.generated_orders),
+                'p_abandon': window.abandoned_orders / max(1, window.generated_orders),
+                't_wait': t_wait
+            }
+        return window_reports
+
+    def get_class_stats(self) -> Dict[str, Dict[str, float]]:
+        class_reports = {}
+        for priority, stats in sorted(self.classes.items()):
+            t_wait = t_system = 0
+            if stats.completed_orders > 0:
+                t_wait = stats.total_wait_time.total_seconds() / 60 / stats.completed_orders
+                t_system = t_wait + stats.total_service_time.total_seconds() / 60 / stats.completed_orders
+            class_reports[priority.name.lower()] = {
+                'generated': stats.generated_orders,
+                'p_reject': stats.rejected_orders / max(1, stats.generated_orders),
+                'p_abandon': stats.abandoned_orders / max(1, stats.generated_orders),
+                't_wait': t_wait,
+                't_wait_p95': stats.wait_sketch.quantile(0.95),
+                't_wait_p99': stats.wait_sketch.quantile(0.99),
+                't_wait_max': stats.max_wait_time.total_seconds() / 60,
+                't_system': t_system
+            }
+        return class_reports
 
     def generate_final_report(self, system_load: float) -> Dict[str, Any]:
-        print("\n" + "=" * 80)
+        print("\n" + "=" * 102)
         print("FINAL SIMULATION REPORT - TABLE 1: SOURCE CHARACTERISTICS")
-        print("=" * 80)
-        print(f"{'Source':<8} {'Generated':<10} {'P_reject':<10} {'T_system':<10} {'T_wait':<10} {'T_service':<10} {'D_wait':<10} {'D_service':<10}")
-        print("-" * 80)
+        print("=" * 102)
+        print(f"{'Source':<8} {'Generated':<10} {'P_reject':<10} {'P_abandon':<10} {'T_abandon':<10} {'T_system':<10} {'T_wait':<10} {'T_service':<10} {'D_wait':<10} {'D_service':<10}")
+        print("-" * 102)
 
         source_reports = {}
 
         for source_id, stats in sorted(self.sources.items()):
             p_reject = stats.rejected_orders / max(1, stats.generated_orders)
+            p_abandon = stats.abandoned_orders / max(1, stats.generated_orders)
+
+            t_abandon = 0
+            if stats.abandoned_orders > 0:
+                t_abandon = stats.total_abandon_wait.total_seconds() / 60 / stats.abandoned_orders
 
             t_system = 0
             if stats.completed_orders > 0:
@@ -166,16 +400,18 @@ class StatisticsCollector:
             if stats.completed_orders > 0:
                 t_service = stats.total_service_time.total_seconds() / 60 / stats.completed_orders
 
-            d_wait = self._calculate_variance(stats.wait_times) if stats.wait_times else 0
-            d_service = self._calculate_variance(stats.service_times) if stats.service_times else 0
+            d_wait = stats.wait_moments.variance()
+            d_service = stats.service_moments.variance()
 
             print(f"{f'S{source_id}':<8} {stats.generated_orders:<10} {p_reject:<10.3f} "
-                  f"{t_system:<10.2f} {t_wait:<10.2f} {t_service:<10.2f} "
+                  f"{p_abandon:<10.3f} {t_abandon:<10.2f} {t_system:<10.2f} {t_wait:<10.2f} {t_service:<10.2f} "
                   f"{d_wait:<10.2f} {d_service:<10.2f}")
 
             source_reports[source_id] = {
                 'generated': stats.generated_orders,
                 'p_reject': p_reject,
+                'p_abandon': p_abandon,
+                't_abandon': t_abandon,
                 't_system': t_system,
                 't_wait': t_wait,
                 't_service': t_service,
@@ -189,7 +425,7 @@ class StatisticsCollector:
         print(f"{'Kitchen':<10} {'Utilization':<12}")
         print("-" * 25)
 
-        total_time = (datetime.now() - self.start_time).total_seconds()
+        total_time = (self.last_update_time - self.start_time).total_seconds()
         kitchen_reports = {}
 
         for i, busy_time in enumerate(self.kitchen_busy_time):
@@ -198,21 +434,67 @@ class StatisticsCollector:
                 print(f"{f'K{i}':<10} {utilization:<12.3f}")
                 kitchen_reports[i] = utilization
 
+        percentile_reports = self.get_percentiles()
+        print("\n" + "=" * 60)
+        print("TABLE 3: TIME PERCENTILES, MIN")
+        print("=" * 60)
+        print(f"{'Time':<10} {'Mean':<10} {'P50':<10} {'P95':<10} {'P99':<10} {'Max':<10}")
+        print("-" * 60)
+        for name, sketch in self.get_sketches(False).items():
+            report = percentile_reports[name]
+            print(f"{f'T_{name}':<10} {sketch.mean():<10.2f} {report['p50']:<10.2f} {report['p95']:<10.2f} "
+                  f"{report['p99']:<10.2f} {(sketch.max or 0):<10.2f}")
+
+        window_reports = self.get_window_stats()
+        if window_reports:
+            print("\n" + "=" * 70)
+            print("TABLE 4: TIME-OF-DAY WINDOWS")
+            print("=" * 70)
+            print(f"{'Window':<12} {'Hours':<14} {'Generated':<10} {'P_reject':<10} {'P_abandon':<10} {'T_wait':<10}")
+            print("-" * 70)
+            for window in self.windows:
+                report = window_reports[window.label]
+                hours = (f"{int(window.start_minute // 60):02d}:{int(window.start_minute % 60):02d}-"
+                         f"{int(window.end_minute // 60):02d}:{int(window.end_minute % 60):02d}")
+                print(f"{window.label:<12} {hours:<14} {report['generated']:<10} {report['p_reject']:<10.3f} "
+                      f"{report['p_abandon']:<10.3f} {report['t_wait']:<10.2f}")
+
+        class_reports = self.get_class_stats()
+        if class_reports:
+            print("\n" + "=" * 100)
+            print("TABLE 5: PRIORITY CLASSES")
+            print("=" * 100)
+            print(f"{'Class':<12} {'Generated':<10} {'P_reject':<10} {'P_abandon':<10} {'T_wait':<10} {'T_wait_p95':<10} {'T_wait_p99':<10} {'T_wait_max':<10} {'T_system':<10}")
+            print("-" * 100)
+            for name, report in class_reports.items():
+                print(f"{name:<12} {report['generated']:<10} {report['p_reject']:<10.3f} {report['p_abandon']:<10.3f} "
+                      f"{report['t_wait']:<10.2f} {report['t_wait_p95']:<10.2f} {report['t_wait_p99']:<10.2f} "
+                      f"{report['t_wait_max']:<10.2f} {report['t_system']:<10.2f}")
+
+        delivery_report = self.get_delivery_stats() if self.delivery else {}
+        if delivery_report:
+            print("\n" + "=" * 70)
+            print("TABLE 6: DELIVERY")
+            print("=" * 70)
+            print(f"{'Delivered':<10} {'T_pickup':<10} {'T_delivery':<11} {'P95':<10} {'T_total':<10} {'P95':<10} {'P99':<10}")
+            print("-" * 70)
+            print(f"{delivery_report['delivered_orders']:<10} {delivery_report['avg_pickup_wait']:<10.2f} "
+                  f"{delivery_report['avg_delivery_time']:<11.2f} {delivery_report['delivery_p95']:<10.2f} "
+                  f"{delivery_report['avg_total_time']:<10.2f} {delivery_report['total_p95']:<10.2f} "
+                  f"{delivery_report['total_p99']:<10.2f}")
+
         print(f"\nSYSTEM LOAD (ρ): {system_load:.3f}")
 
         return {
             'sources': source_reports,
             'kitchens': kitchen_reports,
+            'percentiles': percentile_reports,
+            'windows': window_reports,
+            'classes': class_reports,
+            'delivery': delivery_report,
             'system_load': system_load
         }
 
-    def _calculate_variance(self, values: List[float]) -> float:
-        if len(values) < 2:
-            return 0.0
-        mean = sum(values) / len(values)
-        variance = sum((x - mean) ** 2 for x in values) / (len(values) - 1)
-        return variance
-
     def calculate_required_iterations(self, current_p: float, alpha: float = 0.9,
                                       delta: float = 0.1) -> int:
         if current_p == 0:
@@ -0,0 +1,69 @@
+"""
+Buffer operation benchmark: CircularBuffer against MultiLevelBuffer.
+
+Keeps each buffer full and replays the simulator's access pattern (evicting
+insert, select-and-remove, abandonment of a random order) at growing
+capacities, reporting microseconds per operation.
+
+    python benchmarks/buffer_operations.py [--operations 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Program_Aplication.models.buffer import CircularBuffer, MultiLevelBuffer
+from Program_Aplication.models.order import Order, OrderPriority
+
+CAPACITIES = (5, 20, 100, 500, 2000)
+
+
+def replay(buffer, operations: int, rng: random.Random, priorities) -> float:
+    clock = datetime(2024, 1, 1)
+    orders = []
+
+    def next_order():
+        nonlocal clock
+        clock += timedelta(seconds=1)
+        order = Order(0, [], "", clock, rng.choice(priorities))
+        orders.append(order)
+        return order
+
+    while not buffer.is_full():
+        buffer.add_item(next_order())
+
+    started = time.perf_counter()
+    for step in range(operations):
+        action = step % 3
+        if action == 0:
+            buffer.add_item(next_order())
+        elif action == 1:
+            buffer.remove_oldest_item()
+            buffer.add_item(next_order())
+        else:
+            buffer.remove_item(orders[rng.randrange(max(0, len(orders) - buffer.capacity), len(orders))])
+            buffer.add_item(next_order())
+    return (time.perf_counter() - started) / operations * 1e6
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--operations", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    print(f"{'Capacity':>9} {'Circular us/op':>15} {'Multi-level us/op':>18}")
+    print("-" * 44)
+    for capacity in CAPACITIES:
+        circular = replay(CircularBuffer(capacity), args.operations, random.Random(1),
+                          [OrderPriority.STANDARD])
+        multi_level = replay(MultiLevelBuffer(capacity), args.operations, random.Random(1), list(OrderPriority))
+        print(f"{capacity:>9} {circular:>15.2f} {multi_level:>18.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
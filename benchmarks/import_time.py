@@ -0,0 +1,81 @@
+"""
+Import-time benchmark for the package startup paths.
+
+Runs every scenario in a fresh interpreter with ``-X importtime`` and reports
+the cumulative import time, the number of project modules loaded and whether
+heavy optional dependencies were pulled in.
+
+    python benchmarks/import_time.py [--repeat 5]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = "Program_Aplication"
+
+SCENARIOS = {
+    "package": f"import {PACKAGE}",
+    "library (runner)": f"from {PACKAGE}.simulation.runner import run_simulation",
+    "library (simulator)": f"from {PACKAGE} import SpecialEventSimulator",
+    "cli --help": f"from {PACKAGE}.cli import build_parser; build_parser()",
+    "cli run": f"import {PACKAGE}.cli, {PACKAGE}.simulation.runner",
+    "cli report": f"import {PACKAGE}.cli, {PACKAGE}.display.report_generator",
+}
+
+HEAVY_MODULES = ("matplotlib", "numpy", "sqlite3", "concurrent.futures.process")
+
+
+def measure(code: str):
+    env = dict(os.environ, PYTHONPATH=PROJECT_ROOT, PYTHONDONTWRITEBYTECODE="")
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, check=True
+    )
+
+    total_us = 0
+    modules = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append(name.strip())
+        if len(name) - len(name.lstrip()) == 1:
+            total_us += int(cumulative_us)
+
+    return total_us, modules
+
+
+def best_of(code: str, repeat: int):
+    best_us, modules = None, []
+    for _ in range(repeat):
+        total_us, modules = measure(code)
+        best_us = total_us if best_us is None else min(best_us, total_us)
+    return best_us, modules
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="runs per scenario, the best is reported")
+    args = parser.parse_args(argv)
+
+    baseline_us, baseline_modules = best_of("pass", args.repeat)
+    print(f"Interpreter startup imports: {baseline_us / 1000:.2f} ms ({len(baseline_modules)} modules), "
+          f"subtracted below")
+    print(f"{'Scenario':<22} {'Import ms':>10} {'Modules':>8} {'Project':>8}  Heavy imports")
+    print("-" * 72)
+
+    for name, code in SCENARIOS.items():
+        best_us, modules = best_of(code, args.repeat)
+        added = [m for m in modules if m not in baseline_modules]
+        project = [m for m in added if m.startswith(PACKAGE)]
+        heavy = sorted(h for h in HEAVY_MODULES if h in added)
+        print(f"{name:<22} {(best_us - baseline_us) / 1000:>10.2f} {len(added):>8} {len(project):>8}  "
+              f"{', '.join(heavy) or '-'}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+Rare rejections: RESTART splitting against brute-force simulation.
+
+For every buffer size estimates P_reject both by plain simulation of a fixed
+number of orders and by RestartEstimator, and prints the estimates with their
+90% relative half-widths, the simulated events, the wall time and the
+work-normalised variance: the relative variance of the estimate times the
+seconds spent, which compares the methods whatever their budgets (lower is
+better). At moderate probabilities the two must agree, and RESTART's
+calibration falls back to plain simulation when splitting would not pay; at
+small ones only splitting gets a usable interval within the same budget.
+
+    python benchmarks/rare_event_splitting.py [--buffers 4 8] [--brute-orders 200000] [--precision 0.2]
+"""
+import argparse
+import math
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Program_Aplication.simulation.rare_event import RestartEstimator
+from Program_Aplication.simulation.simulator import SpecialEventSimulator
+from Program_Aplication.statistics.confidence import sample_variance
+
+Z90 = 1.6449
+
+
+def brute_force(params, seed, orders, batches=20):
+    """
+    One long run cut into batches; rejections cluster in busy periods, so the
+    variance comes from the batch means, as RESTART's does, not from the
+    binomial formula
+    """
+    simulator = SpecialEventSimulator(seed=seed, verbose=False, keep_history=False,
+                                      start_time=datetime.combine(datetime.now().date(), datetime.min.time()),
+                                      **params)
+    collector = simulator.stats_collector
+    events, estimates = 0, []
+    for batch in range(1, batches + 1):
+        rejected_before, arrivals_before = collector.rejected_orders, simulator.total_orders_generated
+        while simulator.total_orders_generated < orders * batch // batches and simulator.run_step():
+            events += 1
+        estimates.append((collector.rejected_orders - rejected_before) /
+                         max(1, simulator.total_orders_generated - arrivals_before))
+    p = sum(estimates) / len(estimates)
+    relative_variance = sample_variance(estimates) / len(estimates) / p ** 2 if p > 0 else math.inf
+    return p, Z90 * math.sqrt(relative_variance), relative_variance, events
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--buffers", type=int, nargs="+", default=[4, 8])
+    parser.add_argument("--kitchens", type=int, default=3)
+    parser.add_argument("--arrival", type=float, default=4.0)
+    parser.add_argument("--service", type=float, default=8.0)
+    parser.add_argument("--brute-orders", type=int, default=200000)
+    parser.add_argument("--precision", type=float, default=0.2, help="target relative half-width for RESTART")
+    parser.add_argument("--batch-orders", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    print(f"{'Buffer':>6} {'Method':>8} {'P_reject':>11} {'+-rel':>7} {'Events':>10} {'Time, s':>8} {'WNV':>9}  Levels")
+    print("-" * 82)
+    disagree = False
+    for buffer in args.buffers:
+        params = {"num_kitchens": args.kitchens, "buffer_capacity": buffer,
+                  "mean_arrival_time": args.arrival, "mean_service_time": args.service}
+
+        started = time.perf_counter()
+        brute_p, brute_relative, brute_variance, brute_events = brute_force(params, args.seed, args.brute_orders)
+        brute_time = time.perf_counter() - started
+        print(f"{buffer:>6} {'brute':>8} {brute_p:>11.3e} {brute_relative:>7.2f} {brute_events:>10} {brute_time:>8.1f} "
+              f"{brute_variance * brute_time:>9.2e}")
+
+        started = time.perf_counter()
+        estimate = RestartEstimator(params).estimate(args.seed, args.precision, args.batch_orders)
+        restart_time = time.perf_counter() - started
+        levels = ", ".join(f"{threshold}x{split}"
+                           for threshold, split in zip(estimate["thresholds"], estimate["splits"])) or "none"
+        print(f"{buffer:>6} {'RESTART':>8} {estimate['rejection_rate']:>11.3e} {estimate['relative_precision']:>7.2f} "
+              f"{estimate['events']:>10} {restart_time:>8.1f} {estimate['work_normalised_variance']:>9.2e}  {levels}")
+
+        if brute_relative < 0.5:
+            gap = abs(estimate["rejection_rate"] - brute_p)
+            limit = math.hypot(brute_relative * brute_p, estimate["half_width"]) * 2
+            if gap > limit:
+                print(f"buffer {buffer}: estimates differ by {gap:.3e}, more than {limit:.3e}", file=sys.stderr)
+                disagree = True
+
+    return 1 if disagree else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Courier matching benchmark: grid index against a linear scan.
+
+Places couriers at random points of the city and times nearest-courier and
+within-radius queries through GridIndex and through a scan of every courier,
+checking that both return the same answers.
+
+    python benchmarks/spatial_index.py [--couriers 50 200 1000] [--queries 20000]
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Program_Aplication.models.delivery import CITY_SIZE_KM, GridIndex
+
+
+def scan_nearest(points, x, y):
+    best, best_distance = None, math.inf
+    for item, (px, py) in points.items():
+        distance = math.hypot(px - x, py - y)
+        if distance < best_distance:
+            best, best_distance = item, distance
+    return best
+
+
+def scan_within(points, x, y, radius):
+    return [item for item, (px, py) in points.items() if math.hypot(px - x, py - y) <= radius]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--couriers", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--cell", type=float, default=0.5, help="grid cell size, km")
+    parser.add_argument("--radius", type=float, default=1.0, help="within-radius query, km")
+    args = parser.parse_args(argv)
+
+    print(f"{'Couriers':>9} {'Nearest grid':>13} {'Nearest scan':>13} {'Within grid':>12} {'Within scan':>12}  (us/query)")
+    print("-" * 72)
+    for count in args.couriers:
+        rng = random.Random(count)
+        points = {i: (rng.uniform(0, CITY_SIZE_KM), rng.uniform(0, CITY_SIZE_KM)) for i in range(count)}
+        index = GridIndex(args.cell, CITY_SIZE_KM)
+        for item, (x, y) in points.items():
+            index.insert(item, x, y)
+        queries = [(rng.uniform(0, CITY_SIZE_KM), rng.uniform(0, CITY_SIZE_KM)) for _ in range(args.queries)]
+
+        timings = []
+        for query in (lambda x, y: index.nearest(x, y), lambda x, y: scan_nearest(points, x, y),
+                      lambda x, y: index.within(x, y, args.radius),
+                      lambda x, y: scan_within(points, x, y, args.radius)):
+            started = time.perf_counter()
+            answers = [query(x, y) for x, y in queries]
+            timings.append(((time.perf_counter() - started) / len(queries) * 1e6, answers))
+
+        if timings[0][1] != timings[1][1] or \
+                [sorted(found) for found in timings[2][1]] != [sorted(found) for found in timings[3][1]]:
+            print(f"grid and scan disagree for {count} couriers", file=sys.stderr)
+            return 1
+        print(f"{count:>9} {timings[0][0]:>13.1f} {timings[1][0]:>13.1f} {timings[2][0]:>12.1f} {timings[3][0]:>12.1f}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())